@@ -0,0 +1,47 @@
+"""add workflow dependencies
+
+Revision ID: 3f1c2a9d7b10
+Revises:
+Create Date: 2026-10-17 09:12:04.318552
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2a9d7b10'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'workflow_dependencies',
+        sa.Column('dependency_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('project_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('source_workflow_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('target_path', sa.String(), nullable=False),
+        sa.Column('target_workflow_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.project_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['source_workflow_id'], ['workflows.workflow_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['target_workflow_id'], ['workflows.workflow_id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('dependency_id'),
+    )
+    op.create_index(op.f('ix_workflow_dependencies_project_id'), 'workflow_dependencies', ['project_id'], unique=False)
+    op.create_index(op.f('ix_workflow_dependencies_source_workflow_id'), 'workflow_dependencies', ['source_workflow_id'], unique=False)
+    op.create_index(op.f('ix_workflow_dependencies_target_workflow_id'), 'workflow_dependencies', ['target_workflow_id'], unique=False)
+    op.add_column('workflows', sa.Column('transitive_complexity_score', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('workflows', 'transitive_complexity_score')
+    op.drop_index(op.f('ix_workflow_dependencies_target_workflow_id'), table_name='workflow_dependencies')
+    op.drop_index(op.f('ix_workflow_dependencies_source_workflow_id'), table_name='workflow_dependencies')
+    op.drop_index(op.f('ix_workflow_dependencies_project_id'), table_name='workflow_dependencies')
+    op.drop_table('workflow_dependencies')
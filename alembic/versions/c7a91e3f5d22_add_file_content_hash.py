@@ -0,0 +1,29 @@
+"""add file content hash
+
+Revision ID: c7a91e3f5d22
+Revises: 8b4e6d2c0a57
+Create Date: 2026-10-17 09:16:52.447390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7a91e3f5d22'
+down_revision: Union[str, Sequence[str], None] = '8b4e6d2c0a57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('files', sa.Column('content_hash', sa.String(), nullable=True))
+    op.create_index(op.f('ix_files_content_hash'), 'files', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_files_content_hash'), table_name='files')
+    op.drop_column('files', 'content_hash')
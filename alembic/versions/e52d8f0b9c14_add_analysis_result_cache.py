@@ -0,0 +1,36 @@
+"""add analysis result cache
+
+Revision ID: e52d8f0b9c14
+Revises: c7a91e3f5d22
+Create Date: 2026-10-17 09:19:21.085613
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e52d8f0b9c14'
+down_revision: Union[str, Sequence[str], None] = 'c7a91e3f5d22'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'analysis_result_cache',
+        sa.Column('content_hash', sa.String(), nullable=False),
+        sa.Column('platform', sa.String(), nullable=False),
+        sa.Column('mode', sa.String(), nullable=False),
+        sa.Column('analyzer_version', sa.String(), nullable=False),
+        sa.Column('result', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('content_hash', 'platform', 'mode', 'analyzer_version'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('analysis_result_cache')
@@ -9,6 +9,78 @@ class Settings(BaseSettings):
     jwt_expire_minutes: int = 60
     google_api_key: Optional[str] = None
 
+    # Files at or above this size are parsed in bounded-memory streaming mode
+    parse_streaming_threshold_mb: int = 20
+
+    # Parse result cache (in-process LRU + on-disk tier)
+    parse_cache_enabled: bool = True
+    parse_cache_max_entries: int = 256
+    parse_cache_dir: Optional[str] = "data/parse_cache"
+
+    # Cross-tenant cache of deterministic analysis results, keyed by
+    # content hash and analyzer version
+    analysis_result_cache_enabled: bool = True
+
+    # Threads running the independent analysis stages (rules, mappings,
+    # element data) of an upload side by side
+    analysis_stage_workers: int = 4
+
+    # Process pool for parsing and rule evaluation (0 workers = run inline)
+    parse_workers: int = 2
+    parse_max_tasks_per_child: int = 50
+    parse_cpu_timeout_seconds: int = 30
+    parse_wall_timeout_seconds: int = 60
+
+    # Hard caps checked while a document streams in. Node and text budgets
+    # scale with the plan's max_file_size_mb; this size applies to plans
+    # without one
+    parse_max_file_size_mb: int = 100
+    parse_max_nodes_per_mb: int = 50_000
+    parse_max_depth: int = 256
+    parse_max_attribute_kb: int = 2048
+
+    # Content-addressed upload store. Uploads up to the spool size are
+    # hashed in memory, so duplicates never touch the disk; unreferenced
+    # blobs are collected once they are older than the grace period
+    # (an interval of 0 disables the collector)
+    upload_store_dir: str = "data/upload_store"
+    upload_store_spool_mb: int = 8
+    upload_store_gc_interval_minutes: int = 60
+    upload_store_gc_grace_minutes: int = 60
+
+    # Single-flight for concurrent uploads of the same content: one request
+    # analyzes, the others wait for it (in-process, and across nodes through
+    # a Redis lock) and then read its result from the caches. The lock
+    # expires after lock_seconds in case its holder dies; a follower stops
+    # waiting after wait_seconds and analyzes on its own. A local follower
+    # blocks a worker thread while it waits, so only max_followers per
+    # content wait in each process and any further copies analyze at once
+    upload_coalescing_enabled: bool = True
+    upload_coalescing_lock_seconds: int = 300
+    upload_coalescing_wait_seconds: int = 120
+    upload_coalescing_max_followers: int = 4
+
+    # Async uploads run as in-process background tasks and are lost on a
+    # restart; at startup, analyses left pending or in progress for longer
+    # than this are marked failed so clients stop polling them
+    stale_analysis_minutes: int = 30
+
+    # Send per-stage timings to clients (the Server-Timing header, and
+    # serverTiming on batch lines); they expose server internals, so this
+    # is for debugging and off by default
+    server_timing_enabled: bool = False
+
+    # Multi-file uploads (/analyze/batch): files accepted per request, and
+    # threads running detect through mappings for the files side by side
+    batch_upload_max_files: int = 50
+    batch_upload_workers: int = 4
+
+    # Project archives (/analyze/project): entries in the central directory,
+    # and the uncompressed size they declare in total, checked before any
+    # workflow is extracted. The archive itself is held to the plan's file size
+    project_archive_max_entries: int = 10_000
+    project_archive_max_uncompressed_mb: int = 1024
+
     class Config:
         env_file = ".env"
         case_sensitive = False
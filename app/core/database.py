@@ -1,8 +1,16 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import DATABASE_URL
+from app.core import json_codec
 
-engine = create_engine(DATABASE_URL, echo=True)
+# JSON columns are written compact by json_codec, so a stored result can
+# be served as-is (see find_cached_response)
+engine = create_engine(
+    DATABASE_URL,
+    echo=True,
+    json_serializer=json_codec.dumps_str,
+    json_deserializer=json_codec.loads,
+)
 
 SessionLocal = sessionmaker(
     autocommit=False,
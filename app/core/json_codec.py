@@ -0,0 +1,17 @@
+# Results with large suggestion lists are encoded several times faster
+# than with the standard library
+import orjson
+
+
+def dumps(value) -> bytes:
+    """Compact UTF-8 JSON."""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+
+def dumps_str(value) -> str:
+    """dumps() as text, for the database engine's JSON columns."""
+    return dumps(value).decode()
+
+
+def loads(data):
+    return orjson.loads(data)
@@ -6,7 +6,8 @@ from sqlalchemy import func
 from app.models.usage_tracking import UsageTracking
 from app.models.subscription_plan import SubscriptionPlan
 
-def check_quota(subscription, api_key, db: Session):
+def check_quota(subscription, api_key, db: Session, requested: int = 1):
+    """Raise 403 unless `requested` more analyses fit in today's quota."""
     plan: SubscriptionPlan = subscription.plan
 
     # Unlimited plan
@@ -27,7 +28,7 @@ def check_quota(subscription, api_key, db: Session):
         .scalar()
     )
 
-    if usage_count >= plan.max_analyses_per_month:
+    if usage_count + requested > plan.max_analyses_per_month:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Subscription quota exceeded"
@@ -26,18 +26,20 @@ def track_usage(
     db.add(usage)
     db.commit()
 
-def increment_ai_calls(db, user_id):
-    usage = _get_or_create_usage(db, user_id)
-    usage.ai_calls_count = (usage.ai_calls_count or 0) + 1
-    db.commit()
+def increment_ai_calls(db, user_id, commit: bool = True, count: int = 1):
+    usage = _get_or_create_usage(db, user_id, commit)
+    usage.ai_calls_count = (usage.ai_calls_count or 0) + count
+    if commit:
+        db.commit()
 
-def increment_ai_calls(db, user_id):
-    usage = _get_or_create_usage(db, user_id)
-    usage.api_calls_count = (usage.api_calls_count or 0) + 1
-    db.commit()
+def increment_ai_calls(db, user_id, commit: bool = True, count: int = 1):
+    usage = _get_or_create_usage(db, user_id, commit)
+    usage.api_calls_count = (usage.api_calls_count or 0) + count
+    if commit:
+        db.commit()
 
-def _get_or_create_usage(db: Session, user_id):
-    """Get or create usage tracking record for a user."""
+def _get_or_create_usage(db: Session, user_id, commit: bool = True):
+    """Get or create usage tracking record for a user; commit=False leaves a new record to the caller's transaction."""
     usage = db.query(UsageTracking).filter(UsageTracking.user_id == user_id).first()
     
     if not usage:
@@ -46,7 +48,8 @@ def _get_or_create_usage(db: Session, user_id):
             ai_calls_count=0
         )
         db.add(usage)
-        db.commit()
-        db.refresh(usage)
+        if commit:
+            db.commit()
+            db.refresh(usage)
     
     return usage
@@ -1,16 +1,95 @@
 from typing import Any
-from dataclasses import dataclass
+from collections import Counter
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass
+
+from app.domain.compact_workflow import (
+    CompactWorkflow,
+    ActivityView,
+    RawActivityView,
+    VariableView,
+)
 
 
 @dataclass
 class ParsedWorkflow:
     platform: str
-    activities: list[str]
-    variables: list[str]
+    activities: Sequence[str]
+    variables: Sequence[str]
     nesting_depth: int
-    raw_activities: list[dict] = None
-    raw_variables: list[dict] = None
+    raw_activities: Sequence = None
+    raw_variables: Sequence = None
     raw_tree: Any = None  # lxml root, never persisted
+    compact: CompactWorkflow = None  # array-backed source of the sequences above
+
+    @classmethod
+    def from_compact(cls, compact: CompactWorkflow, raw_tree: Any = None) -> "ParsedWorkflow":
+        return cls(
+            platform=compact.platform,
+            activities=ActivityView(compact),
+            variables=VariableView(compact, "listed", names=True),
+            nesting_depth=compact.nesting_depth,
+            raw_activities=RawActivityView(compact),
+            raw_variables=VariableView(compact, "raw", names=False),
+            raw_tree=raw_tree,
+            compact=compact,
+        )
+
+    def activity_counts(self) -> dict[str, int]:
+        if self.compact is not None:
+            return self.compact.activity_counts()
+        return dict(Counter(self.activities))
+
+    def raw_activity_dicts(self) -> list[dict]:
+        """raw_activities in the JSON shape stored on Workflow and returned by the API."""
+        if self.compact is not None:
+            return self.compact.to_raw_activities()
+        return list(self.raw_activities or [])
+
+    def invoked_workflow_files(self) -> list[str]:
+        """Workflow files invoked by literal path (InvokeWorkflowFile)."""
+        if self.compact is not None:
+            return list(self.compact.invoked_files)
+        return []
+
+    def selector_entries(self) -> list[tuple[str, str, str, str]]:
+        """(activity type, display name, attribute, raw selector) for every UI selector."""
+        if self.compact is None:
+            return []
+        compact = self.compact
+        entries = []
+        for owner, attribute, value in compact.selectors:
+            if owner < 0:
+                entries.append(("", "", attribute, value))
+            else:
+                entries.append((
+                    compact.type_names[compact.type_ids[owner]],
+                    compact.label(owner),
+                    attribute,
+                    value,
+                ))
+        return entries
+
+    def raw_variable_dicts(self) -> list[dict]:
+        if self.compact is not None:
+            return self.compact.to_raw_variables()
+        return list(self.raw_variables or [])
+
+
+@dataclass
+class WorkflowSummary:
+    """Counts-only parse result from the metrics-only parser; no per-node data."""
+    platform: str
+    activity_totals: dict[str, int]
+    variable_count: int
+    nesting_depth: int
+
+    @property
+    def activity_count(self) -> int:
+        return sum(self.activity_totals.values())
+
+    def activity_counts(self) -> dict[str, int]:
+        return self.activity_totals
 
 
 @dataclass
@@ -26,3 +105,34 @@ class DeterministicMetrics:
 class ComplexityScore:
     score: int
     level: str  # Low | Medium | High | Very High
+
+
+@dataclass
+class WorkflowAnalysis:
+    """
+    The content-only part of an upload analysis: everything derived from
+    the workflow file itself and nothing about who uploaded it. Shared
+    across tenants through the analysis result cache.
+    """
+    metrics: DeterministicMetrics
+    complexity: ComplexityScore
+    activity_counts: dict[str, int]
+    activity_breakdown: dict[str, int]
+    migration_stats: dict
+    invoked_files: list[str]
+    # Full mode only
+    raw_activities: list[dict] | None = None
+    raw_variables: list[dict] | None = None
+    selector_index: list[dict] | None = None
+    review: dict | None = None  # CodeReview column values
+
+    def to_state(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_state(cls, state: dict) -> "WorkflowAnalysis":
+        return cls(**{
+            **state,
+            "metrics": DeterministicMetrics(**state["metrics"]),
+            "complexity": ComplexityScore(**state["complexity"]),
+        })
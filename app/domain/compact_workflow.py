@@ -0,0 +1,373 @@
+import sys
+from array import array
+from collections import Counter
+from collections.abc import Sequence
+
+
+class ActivityRecord:
+    """
+    One raw activity node. Supports the read-only dict protocol
+    (get / [] / keys) so rule functions written against the JSON shape
+    {"type": ..., "displayName": ...} run over it unchanged.
+    """
+    __slots__ = ("type", "displayName")
+
+    _KEYS = ("type", "displayName")
+
+    def __init__(self, type: str, displayName: str):
+        self.type = type
+        self.displayName = displayName
+
+    def get(self, key, default=None):
+        if key in self._KEYS:
+            return getattr(self, key)
+        return default
+
+    def __getitem__(self, key):
+        if key in self._KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def keys(self):
+        return self._KEYS
+
+    def to_dict(self) -> dict:
+        return {"type": self.type, "displayName": self.displayName}
+
+    def __repr__(self):
+        return f"ActivityRecord({self.type!r}, {self.displayName!r})"
+
+
+class VariableRecord:
+    """
+    One named element. `listed` marks names reported in
+    ParsedWorkflow.variables, `raw` marks entries of raw_variables; the
+    two sets overlap but are not identical for every platform.
+    value_key is the JSON key the value is exposed under
+    ("defaultValue" for UiPath, "type" for Blue Prism).
+    """
+    __slots__ = ("name", "value", "value_key", "listed", "raw")
+
+    def __init__(self, name, value, value_key: str, listed: bool, raw: bool):
+        self.name = name
+        self.value = value
+        self.value_key = value_key
+        self.listed = listed
+        self.raw = raw
+
+    def get(self, key, default=None):
+        if key == "name":
+            return self.name
+        if key == self.value_key:
+            return self.value
+        return default
+
+    def __getitem__(self, key):
+        if key == "name":
+            return self.name
+        if key == self.value_key:
+            return self.value
+        raise KeyError(key)
+
+    def keys(self):
+        return ("name", self.value_key)
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, self.value_key: self.value}
+
+    def __repr__(self):
+        return f"VariableRecord({self.name!r}, {self.value_key}={self.value!r})"
+
+
+class CompactWorkflow:
+    """
+    Array-backed parse result.
+
+    Every recorded node stores an interned type id (array('H')), the index
+    of its nearest recorded ancestor (array('i'), -1 for none) and its
+    element depth (array('H')). Display names are only kept when they differ
+    from the type name. Per-type flags decide which nodes count as
+    activities, so metrics and mappings can work from per-type counts
+    instead of one string per node.
+    """
+    __slots__ = (
+        "platform",
+        "type_names",
+        "type_index",
+        "activity_types",
+        "type_ids",
+        "parents",
+        "depths",
+        "labels",
+        "variables",
+        "nesting_depth",
+        "activity_from_label",
+        "raw_type_order",
+        "emit_raw_activities",
+        "invoked_files",
+        "selectors",
+        "_activity_positions",
+    )
+
+    def __init__(
+        self,
+        platform: str,
+        activity_from_label: bool = False,
+        raw_type_order: tuple[str, ...] | None = None,
+        emit_raw_activities: bool = True,
+    ):
+        self.platform = platform
+        self.type_names: list[str] = []
+        self.type_index: dict[str, int] = {}
+        self.activity_types = bytearray()
+        self.type_ids = array("H")
+        self.parents = array("i")
+        self.depths = array("H")
+        self.labels: list[str | None] = []
+        self.variables: list[VariableRecord] = []
+        self.nesting_depth = 0
+        # Blue Prism reports display names as activities, UiPath reports types
+        self.activity_from_label = activity_from_label
+        # Blue Prism lists all stages before all actions
+        self.raw_type_order = raw_type_order
+        self.emit_raw_activities = emit_raw_activities
+        # Literal WorkflowFileName targets of InvokeWorkflowFile, in document order
+        self.invoked_files: list[str] = []
+        # (owning node index, attribute, raw value) per UI selector attribute
+        self.selectors: list[tuple[int, str, str]] = []
+        self._activity_positions = None
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    def intern_type(self, type_name: str, is_activity: bool = True) -> int:
+        type_id = self.type_index.get(type_name)
+        if type_id is None:
+            type_id = len(self.type_names)
+            if type_id > 0xFFFF and self.type_ids.typecode == "H":
+                self.type_ids = array("I", self.type_ids)
+            type_name = sys.intern(type_name)
+            self.type_names.append(type_name)
+            self.type_index[type_name] = type_id
+            self.activity_types.append(1 if is_activity else 0)
+        return type_id
+
+    def add_node(self, type_id: int, label: str | None, parent: int, depth: int) -> int:
+        index = len(self.type_ids)
+        self.type_ids.append(type_id)
+        self.parents.append(parent)
+        self.depths.append(depth)
+        self.labels.append(None if label == self.type_names[type_id] else label)
+        return index
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        return len(self.type_ids)
+
+    def label(self, index: int) -> str:
+        label = self.labels[index]
+        return self.type_names[self.type_ids[index]] if label is None else label
+
+    def is_activity(self, index: int) -> bool:
+        return bool(self.activity_types[self.type_ids[index]])
+
+    def activity_name(self, index: int) -> str:
+        if self.activity_from_label:
+            return self.label(index)
+        return self.type_names[self.type_ids[index]]
+
+    def ordered_positions(self):
+        """Node positions in reporting order (document order unless raw_type_order is set)."""
+        if self.raw_type_order is None:
+            yield from range(len(self.type_ids))
+            return
+        for type_name in self.raw_type_order:
+            type_id = self.type_index.get(type_name)
+            if type_id is None:
+                continue
+            for i, t in enumerate(self.type_ids):
+                if t == type_id:
+                    yield i
+
+    def activity_positions(self) -> array:
+        if self._activity_positions is None:
+            mask = self.activity_types
+            type_ids = self.type_ids
+            self._activity_positions = array(
+                "I", (i for i in self.ordered_positions() if mask[type_ids[i]])
+            )
+        return self._activity_positions
+
+    def type_counts(self) -> dict[str, int]:
+        """Node count per type name, in first-seen order."""
+        names = self.type_names
+        return {names[t]: n for t, n in Counter(self.type_ids).items()}
+
+    def activity_counts(self) -> dict[str, int]:
+        """Occurrences per activity name, in first-seen reporting order."""
+        mask = self.activity_types
+        if self.activity_from_label or self.raw_type_order is not None:
+            return dict(Counter(
+                self.activity_name(i) for i in self.activity_positions()
+            ))
+        names = self.type_names
+        return {
+            names[t]: n
+            for t, n in Counter(self.type_ids).items()
+            if mask[t]
+        }
+
+    def raw_positions(self):
+        if self.emit_raw_activities:
+            yield from self.ordered_positions()
+
+    def raw_activity_count(self) -> int:
+        if not self.emit_raw_activities:
+            return 0
+        if self.raw_type_order is None:
+            return len(self.type_ids)
+        counts = self.type_counts()
+        return sum(counts.get(name, 0) for name in self.raw_type_order)
+
+    # ------------------------------------------------------------------
+    # Lossless adapters back to the JSON shape
+    # ------------------------------------------------------------------
+
+    def activity_record(self, index: int) -> ActivityRecord:
+        return ActivityRecord(self.type_names[self.type_ids[index]], self.label(index))
+
+    def to_raw_activities(self) -> list[dict]:
+        return [self.activity_record(i).to_dict() for i in self.raw_positions()]
+
+    def to_raw_variables(self) -> list[dict]:
+        return [v.to_dict() for v in self.variables if v.raw]
+
+    # ------------------------------------------------------------------
+    # Serialization (marshal-friendly tuples of builtins)
+    # ------------------------------------------------------------------
+
+    def to_state(self) -> tuple:
+        return (
+            self.platform,
+            self.type_names,
+            bytes(self.activity_types),
+            self.type_ids.typecode,
+            self.type_ids.tobytes(),
+            self.parents.tobytes(),
+            self.depths.tobytes(),
+            self.labels,
+            [(v.name, v.value, v.value_key, v.listed, v.raw) for v in self.variables],
+            self.nesting_depth,
+            self.activity_from_label,
+            self.raw_type_order,
+            self.emit_raw_activities,
+            self.invoked_files,
+            self.selectors,
+        )
+
+    @classmethod
+    def from_state(cls, state: tuple) -> "CompactWorkflow":
+        (
+            platform, type_names, activity_types, typecode, type_ids, parents,
+            depths, labels, variables, nesting_depth, activity_from_label,
+            raw_type_order, emit_raw_activities, invoked_files, selectors,
+        ) = state
+        compact = cls(
+            platform,
+            activity_from_label=activity_from_label,
+            raw_type_order=raw_type_order,
+            emit_raw_activities=emit_raw_activities,
+        )
+        compact.type_names = [sys.intern(name) for name in type_names]
+        compact.type_index = {name: i for i, name in enumerate(compact.type_names)}
+        compact.activity_types = bytearray(activity_types)
+        compact.type_ids = array(typecode)
+        compact.type_ids.frombytes(type_ids)
+        compact.parents.frombytes(parents)
+        compact.depths.frombytes(depths)
+        compact.labels = labels
+        compact.variables = [VariableRecord(*v) for v in variables]
+        compact.nesting_depth = nesting_depth
+        compact.invoked_files = invoked_files
+        compact.selectors = [tuple(s) for s in selectors]
+        return compact
+
+
+class ActivityView(Sequence):
+    """ParsedWorkflow.activities backed by a CompactWorkflow."""
+    __slots__ = ("_compact",)
+
+    def __init__(self, compact: CompactWorkflow):
+        self._compact = compact
+
+    def __len__(self):
+        return len(self._compact.activity_positions())
+
+    def __getitem__(self, index):
+        positions = self._compact.activity_positions()
+        if isinstance(index, slice):
+            return [self._compact.activity_name(i) for i in positions[index]]
+        return self._compact.activity_name(positions[index])
+
+    def __iter__(self):
+        compact = self._compact
+        if compact.activity_from_label or compact.raw_type_order is not None:
+            for i in compact.activity_positions():
+                yield compact.activity_name(i)
+            return
+
+        mask = compact.activity_types
+        names = compact.type_names
+        for t in compact.type_ids:
+            if mask[t]:
+                yield names[t]
+
+
+class RawActivityView(Sequence):
+    """ParsedWorkflow.raw_activities as ActivityRecords over a CompactWorkflow."""
+    __slots__ = ("_compact", "_positions")
+
+    def __init__(self, compact: CompactWorkflow):
+        self._compact = compact
+        self._positions = None
+
+    def _all_positions(self) -> array:
+        if self._positions is None:
+            self._positions = array("I", self._compact.raw_positions())
+        return self._positions
+
+    def __len__(self):
+        return self._compact.raw_activity_count()
+
+    def __getitem__(self, index):
+        positions = self._all_positions()
+        if isinstance(index, slice):
+            return [self._compact.activity_record(i) for i in positions[index]]
+        return self._compact.activity_record(positions[index])
+
+    def __iter__(self):
+        compact = self._compact
+        for i in compact.raw_positions():
+            yield compact.activity_record(i)
+
+
+class VariableView(Sequence):
+    """Names or records of the variables matching a flag ("listed" / "raw")."""
+    __slots__ = ("_records",)
+
+    def __init__(self, compact: CompactWorkflow, flag: str, names: bool):
+        records = [v for v in compact.variables if getattr(v, flag)]
+        self._records = [v.name for v in records] if names else records
+
+    def __len__(self):
+        return len(self._records)
+
+    def __getitem__(self, index):
+        return self._records[index]
+
+    def __iter__(self):
+        return iter(self._records)
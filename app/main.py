@@ -2,8 +2,11 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes import health, Auth, user, api_key, analysis, analysis_history, analysis_result, analysis_upload, analysis_worker
 from app.routes import admin_users, admin_subscription, admin_api_keys, admin_usage, admin_analytics, admin_ai_analytics, subscription, migrate
-from app.routes import projects, files, workflows, batch, code_review, compare, export, custom_rules, variable_analysis
+from app.routes import projects, files, workflows, batch, code_review, compare, export, custom_rules, variable_analysis, analysis_project
 from app.routes.test import core_test
+from app.services.analysis.parse_executor import parse_executor
+from app.services.analysis.upload_pipeline import recover_stale_analyses
+from app.services.analysis.upload_store import upload_store_collector
 app = FastAPI()
 # Configure CORS - FIXED VERSION
 app.add_middleware(
@@ -27,6 +30,7 @@ app.include_router(analysis.router)
 app.include_router(analysis_history.router)
 app.include_router(analysis_result.router)
 app.include_router(analysis_upload.router)
+app.include_router(analysis_project.router)
 # app.include_router(analysis_worker.router)
 app.include_router(admin_users.router)
 app.include_router(admin_subscription.router)
@@ -44,4 +48,9 @@ app.include_router(batch.router)
 app.include_router(code_review.router)
 app.include_router(custom_rules.router)
 app.include_router(compare.router)
-app.include_router(export.router)
\ No newline at end of file
+app.include_router(export.router)
+
+app.router.add_event_handler("startup", upload_store_collector.start)
+app.router.add_event_handler("startup", recover_stale_analyses)
+app.router.add_event_handler("shutdown", upload_store_collector.shutdown)
+app.router.add_event_handler("shutdown", parse_executor.shutdown)
\ No newline at end of file
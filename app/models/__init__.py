@@ -8,8 +8,10 @@ from .analysis_history import AnalysisHistory
 from .project import Project
 from .file import File
 from .workflow import Workflow
+from .workflow_dependency import WorkflowDependency
 from .activity_mapping import ActivityMapping
 from .batch_job import BatchJob
 from .code_review import CodeReview
 from .custom_rules import CustomRule
 from .variable_analysis import VariableAnalysis
+from .analysis_result_cache import AnalysisResultCache
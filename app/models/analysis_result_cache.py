@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, DateTime, JSON
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class AnalysisResultCache(Base):
+    """
+    Deterministic analysis of one workflow content, shared by every tenant.
+    Holds nothing user-specific; rows of another analyzer_version are
+    never read and are left for a cleanup job to delete.
+    """
+    __tablename__ = "analysis_result_cache"
+
+    content_hash = Column(String, primary_key=True)
+    platform = Column(String, primary_key=True)
+    mode = Column(String, primary_key=True)  # full | metrics
+    analyzer_version = Column(String, primary_key=True)
+
+    # WorkflowAnalysis.to_state()
+    result = Column(JSON, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -16,6 +16,8 @@ class File(Base):
     file_name = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
     file_size = Column(Integer)
+    # SHA-256 of the stored blob; the upload store's reference count
+    content_hash = Column(String, nullable=True, index=True)
 
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
 
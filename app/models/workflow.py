@@ -9,6 +9,8 @@ from app.core.database import Base
 
 class Workflow(Base):
     __tablename__ = "workflows"
+    # Server defaults (analyzed_at) come back in the INSERT's RETURNING
+    __mapper_args__ = {"eager_defaults": True}
 
     workflow_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     project_id = Column(UUID(as_uuid=True), ForeignKey("projects.project_id", ondelete="CASCADE"))
@@ -24,9 +26,13 @@ class Workflow(Base):
     nesting_depth = Column(Integer)
     variable_count = Column(Integer)
     invoked_workflows = Column(Integer, default=0)
+    # Complexity including every workflow reachable through InvokeWorkflowFile
+    transitive_complexity_score = Column(Integer, nullable=True)
     has_custom_code = Column(JSON, nullable=True)
     raw_activities = Column(JSON, nullable=True)
     raw_variables = Column(JSON, nullable=True)
+    # Tokenized UI selectors per activity (see services/analysis/selectors.py)
+    selector_index = Column(JSON, nullable=True)
 
     # Migration Analysis Fields
     estimated_effort_hours = Column(Integer, nullable=True)
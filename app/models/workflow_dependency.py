@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+
+from app.core.database import Base
+
+
+class WorkflowDependency(Base):
+    """One InvokeWorkflowFile edge of a project's invoke graph."""
+    __tablename__ = "workflow_dependencies"
+
+    dependency_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    project_id = Column(UUID(as_uuid=True), ForeignKey("projects.project_id", ondelete="CASCADE"), index=True)
+    source_workflow_id = Column(UUID(as_uuid=True), ForeignKey("workflows.workflow_id", ondelete="CASCADE"), index=True)
+
+    # WorkflowFileName as written in the caller
+    target_path = Column(String, nullable=False)
+    # Null while no workflow in the project matches target_path
+    target_workflow_id = Column(UUID(as_uuid=True), ForeignKey("workflows.workflow_id", ondelete="SET NULL"), nullable=True, index=True)
@@ -0,0 +1,218 @@
+import uuid
+import logging
+import zipfile
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.core_context import get_core_context
+from app.core.database import SessionLocal
+from app.core.deps import get_db
+from app.core.quota_check import check_quota
+from app.core.usage_tracker import increment_ai_calls
+from app.domain.analysis_contracts import WorkflowAnalysis
+from app.models.analysis_history import AnalysisHistory, AnalysisStatus
+from app.models.project import Project
+from app.models.file import File as FileModel
+from app.services.analysis.parse_limits import ParseLimitExceeded, ParseLimits, parse_limits_for_plan
+from app.services.analysis.upload_pipeline import (
+    UploadAnalysisPipeline,
+    add_workflow_rows,
+    ndjson_line,
+    workflow_result,
+)
+from app.services.analysis.upload_store import upload_store
+from app.services.analysis.project_archive import (
+    PROJECT_ARCHIVE_EXTENSIONS,
+    copy_and_hash,
+    extract_project_workflows,
+    inspect_project_archive,
+)
+from app.services.projects.project_service import link_new_workflows
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/api/v1/analyze",
+    tags=["Analysis APIs"]
+)
+
+
+def _analyze_file(pipeline: UploadAnalysisPipeline, item, limits: ParseLimits) -> WorkflowAnalysis:
+    """
+    Parse through mappings for one extracted workflow; runs on a feeder
+    thread with a short-lived session of its own. The shared result cache
+    holds only content-derived data, so a new entry is committed here
+    rather than with the project.
+    """
+    worker_db = SessionLocal()
+    try:
+        workflow_analysis = pipeline.analyze_content(worker_db, item.file_path, "UiPath", item.content_hash, limits)
+        worker_db.commit()
+        return workflow_analysis
+    finally:
+        worker_db.close()
+
+
+@router.post("/project")
+def upload_and_analyze_project(
+    file: UploadFile = File(...),
+    context=Depends(get_core_context),
+    db: Session = Depends(get_db)
+):
+    """
+    Analyze a whole UiPath project archive (.zip or .nupkg).
+
+    Every .xaml in the archive is parsed in parallel and the response is
+    streamed as NDJSON: a "project" line, one "workflow" line per file in
+    completion order, then a "summary" line. The Project, File, Workflow,
+    CodeReview and invoke-graph rows are written in a single transaction
+    once all files are done; the summary line reports whether that commit
+    succeeded.
+    """
+    user = context["user"]
+    api_key = context["api_key"]
+    subscription = context["subscription"]
+
+    file_ext = Path(file.filename).suffix.lower()
+    if file_ext not in PROJECT_ARCHIVE_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail="Only .zip and .nupkg project archives are supported."
+        )
+
+    analysis_id = uuid.uuid4()
+
+    # Save the archive without reading it into memory
+    upload_dir = Path("uploads")
+    upload_dir.mkdir(exist_ok=True)
+    archive_path = upload_dir / f"{analysis_id}_{file.filename}"
+
+    limits = parse_limits_for_plan(subscription.plan)
+    try:
+        archive_size, archive_hash = copy_and_hash(file.file, archive_path, limits)
+        project_archive = inspect_project_archive(str(archive_path))
+        # Every workflow in the archive is one analysis; checked before anything is stored
+        check_quota(subscription, api_key, db, requested=len(project_archive.members))
+        extract_project_workflows(str(archive_path), project_archive, upload_store, limits)
+    except (zipfile.BadZipFile, ValueError, ParseLimitExceeded) as e:
+        status_code = 413 if isinstance(e, ParseLimitExceeded) else 400
+        raise HTTPException(status_code=status_code, detail=f"Invalid project archive: {str(e)}")
+    finally:
+        # The extracted workflows live in the upload store; the archive is not kept
+        archive_path.unlink(missing_ok=True)
+
+    analysis = AnalysisHistory(
+        analysis_id=analysis_id,
+        user_id=user.user_id,
+        api_key_id=api_key.api_key_id,
+        subscription_id=subscription.subscription_id,
+        file_name=file.filename,
+        file_hash=archive_hash,
+        status=AnalysisStatus.IN_PROGRESS
+    )
+    db.add(analysis)
+    db.commit()
+
+    pipeline = UploadAnalysisPipeline("full")
+
+    def stream():
+        platform = "UiPath"
+        project = Project(
+            project_id=uuid.uuid4(),
+            user_id=user.user_id,
+            name=project_archive.name,
+            platform=platform,
+            description=project_archive.description,
+        )
+        db.add(project)
+
+        yield ndjson_line({
+            "type": "project",
+            "projectId": str(project.project_id),
+            "name": project_archive.name,
+            "main": project_archive.main,
+            "fileCount": len(project_archive.workflows),
+        })
+
+        results = []
+        new_workflows = []
+        failed = 0
+
+        # Feeder threads read the result cache and wait on the parse process pool
+        with ThreadPoolExecutor(max_workers=max(1, settings.parse_workers)) as feeders:
+            futures = {
+                feeders.submit(_analyze_file, pipeline, item, limits): item
+                for item in project_archive.workflows
+            }
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    workflow_analysis = future.result()
+                except Exception as e:
+                    failed += 1
+                    logger.warning(f"Project {project_archive.name!r}: failed to analyze {item.relative_path}: {e}")
+                    yield ndjson_line({
+                        "type": "workflow",
+                        "workflowName": item.relative_path,
+                        "status": "failed",
+                        "error": str(e),
+                        "error_type": type(e).__name__,
+                    })
+                    continue
+
+                db_file = FileModel(
+                    file_id=uuid.uuid4(),
+                    project_id=project.project_id,
+                    file_name=item.relative_path,
+                    file_path=item.file_path,
+                    file_size=item.file_size,
+                    content_hash=item.content_hash,
+                )
+                db.add(db_file)
+                workflow = add_workflow_rows(
+                    db, db_file, platform, pipeline.mode, uuid.uuid4(), workflow_analysis,
+                    workflow_name=item.relative_path,
+                )
+                new_workflows.append((workflow, workflow_analysis.invoked_files))
+
+                result = {
+                    **workflow_result(workflow, item.relative_path, pipeline.mode),
+                    "isMain": item.relative_path == project_archive.main,
+                }
+                results.append(result)
+                yield ndjson_line({"type": "workflow", "status": "completed", **result})
+
+        summary = {
+            "type": "summary",
+            "projectId": str(project.project_id),
+            "completed": len(results),
+            "failed": failed,
+            "analyzedAt": datetime.utcnow().isoformat(),
+        }
+
+        try:
+            link_new_workflows(db, project, new_workflows)
+            analysis.status = AnalysisStatus.COMPLETED
+            analysis.result = {**summary, "workflows": results}
+            db.commit()
+            summary["committed"] = True
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to persist project {project_archive.name!r}: {str(e)}")
+            analysis.status = AnalysisStatus.FAILED
+            analysis.result = {"error": str(e), "error_type": type(e).__name__}
+            db.commit()
+            summary["committed"] = False
+            summary["error"] = str(e)
+        else:
+            increment_ai_calls(db, user.user_id, count=len(results))
+
+        yield ndjson_line(summary)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
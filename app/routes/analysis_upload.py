@@ -1,29 +1,16 @@
-import uuid
-import shutil
-import hashlib
-import json
-import re
 from pathlib import Path
-from datetime import datetime
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, Response, UploadFile, File, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from dataclasses import asdict
 import logging
-from collections import Counter
 
+from app.core.config import settings
 from app.core.core_context import get_core_context
 from app.core.deps import get_db
+from app.core.quota_check import check_quota
 from app.models.analysis_history import AnalysisHistory, AnalysisStatus
-from app.models.project import Project
-from app.models.file import File as FileModel
-from app.models.workflow import Workflow
-from app.models.code_review import CodeReview
-from app.services.analysis.parser import parse_workflow
-from app.services.analysis.metrics import calculate_metrics
-from app.services.analysis.complexity import calculate_complexity
-from app.services.code_review.engine import run_code_review as run_engine_review
-from app.services.code_review.code_review_service import run_code_review as run_service_review
-from app.services.analysis.activity_mappings import calculate_migration_stats, categorize_activity
+from app.services.analysis.parse_limits import ParseLimitExceeded
+from app.services.analysis.upload_pipeline import AnalysisRun, UnsupportedUpload, UploadAnalysisPipeline
 
 logger = logging.getLogger(__name__)
 
@@ -32,260 +19,86 @@ router = APIRouter(
     tags=["Analysis APIs"]
 )
 
-@router.post("/upload")
-def upload_file_for_analysis(
-    file: UploadFile = File(...),
-    context=Depends(get_core_context),
-    db: Session = Depends(get_db)
-):
-    user = context["user"]
-    api_key = context["api_key"]
-    subscription = context["subscription"]
-
-    analysis_id = uuid.uuid4()
-
-    # Read file for hashing
-    file_bytes = file.file.read()
-    file.file.seek(0)
-
-    file_hash = hashlib.sha256(file_bytes).hexdigest()
-
-    # Check cache
-    existing_analysis = (
-        db.query(AnalysisHistory)
-        .filter(
-            AnalysisHistory.user_id == user.user_id,
-            AnalysisHistory.file_hash == file_hash,
-            AnalysisHistory.status == AnalysisStatus.COMPLETED
-        )
-        .order_by(AnalysisHistory.created_at.desc())
-        .first()
-    )
-
-    if existing_analysis:
-        cached_result = existing_analysis.result.copy() if existing_analysis.result else {}
-        cached_result["cached"] = True
-        # Ensure 'id' exists for frontend compatibility if it was stored as 'workflow_id'
-        if "workflow_id" in cached_result and "id" not in cached_result:
-            cached_result["id"] = cached_result["workflow_id"]
-        return cached_result
-
-    # Save file
-    upload_dir = Path("uploads")
-    upload_dir.mkdir(exist_ok=True)
-
-    file_path = upload_dir / f"{analysis_id}_{file.filename}"
-
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    analysis = AnalysisHistory(
-        analysis_id=analysis_id,
-        user_id=user.user_id,
-        api_key_id=api_key.api_key_id,
-        subscription_id=subscription.subscription_id,
-        file_name=file.filename,
-        file_path=str(file_path),
-        file_hash=file_hash,
-        status=AnalysisStatus.IN_PROGRESS
-    )
-
-    db.add(analysis)
-    db.commit()
 
+def _ingest(pipeline: UploadAnalysisPipeline, file: UploadFile, context, db: Session) -> AnalysisRun:
     try:
-        # Detect platform
-        file_ext = Path(file.filename).suffix.lower()
-        if file_ext == ".xaml":
-            platform = "UiPath"
-        elif file_ext in [".bprelease", ".xml"]:
-            platform = "Blue Prism"
-        else:
-            platform = "Unknown"
-
-        # 1. Ensure a Project exists
-        project = db.query(Project).filter(Project.user_id == user.user_id).first()
-        if not project:
-            project = Project(
-                user_id=user.user_id,
-                name="Default Project",
-                platform=platform
-            )
-            db.add(project)
-            db.commit()
-            db.refresh(project)
-
-        # 2. Create File entry
-        db_file = FileModel(
-            project_id=project.project_id,
-            file_name=file.filename,
-            file_path=str(file_path),
-            file_size=len(file_bytes)
+        return pipeline.ingest(db, file.file, file.filename, context)
+    except UnsupportedUpload as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ParseLimitExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+def _analyze(pipeline: UploadAnalysisPipeline, run: AnalysisRun, response: Response, db: Session):
+    """Run the pipeline to completion; stage timings go out in the Server-Timing header if enabled."""
+    # A cached result is sent as the stored JSON bytes, without re-encoding
+    if run.cached_response:
+        return Response(
+            content=run.cached_response,
+            media_type="application/json",
+            headers=run.timing_headers(),
         )
-        db.add(db_file)
-        db.commit()
-        db.refresh(db_file)
-
-        # 3. Parse workflow
-        parsed_workflow = parse_workflow(str(file_path), platform)
-
-        # 4. Calculate deterministic metrics
-        metrics = calculate_metrics(parsed_workflow)
-
-        # 5. Complexity scoring
-        complexity = calculate_complexity(metrics)
-
-        # 6. Create Workflow entry
-        workflow = Workflow(
-            project_id=project.project_id,
-            file_id=db_file.file_id,
-            platform=platform,
-            complexity_score=complexity.score,
-            complexity_level=complexity.level,
-            activity_count=metrics.activity_count,
-            nesting_depth=metrics.nesting_depth,
-            variable_count=metrics.variable_count,
-            invoked_workflows=metrics.invoked_workflows,
-            has_custom_code=metrics.has_custom_code,
-            raw_activities=parsed_workflow.raw_activities,
-            raw_variables=parsed_workflow.raw_variables
-        )
-        db.add(workflow)
-        db.commit()
-        db.refresh(workflow)
-
-        # 7. Run code review (this service saves to DB internally)
-        review = run_service_review(db, workflow, user.user_id)
-
-        # 12. Build frontend-expected response
-        # Calculate categorized activity breakdown
-        categorized = Counter()
-        for activity in parsed_workflow.activities:
-            categorized[categorize_activity(activity)] += 1
-        activity_breakdown = dict(categorized)
-        
-        # Detect issues from metrics and review
-        detected_issues = []
-        if metrics.nesting_depth > 3:
-            detected_issues.append(f"High nesting depth (level {metrics.nesting_depth})")
-        if review.total_issues > 0:
-            for finding in review.findings:
-                if isinstance(finding, dict):
-                    detected_issues.append(finding.get("message", "Unknown issue"))
-        if metrics.has_custom_code:
-            detected_issues.append("Contains custom code/scripts")
-        
-        # Generate suggestions from code review findings
-        suggestions = []
-        if review.findings:
-            for idx, finding in enumerate(review.findings, 1):
-                if isinstance(finding, dict):
-                    suggestions.append({
-                        "id": idx,
-                        "priority": finding.get("severity", "medium").lower(),
-                        "title": finding.get("message", "Code Quality Issue"),
-                        "description": finding.get("recommendation", "Review and refactor"),
-                        "impact": finding.get("impact", "Medium"),
-                        "effort": finding.get("effort", "Medium"),
-                        "benefits": ["Improved maintainability", "Better code quality"],
-                        "implementation_steps": [finding.get("recommendation", "Review code")]
-                    })
-        
-        # Estimate migration effort using the comprehensive mapping service
-        stats = calculate_migration_stats(parsed_workflow.activities)
-        effort_hours = stats["totalEffortHours"]
-        compatibility_score = stats["compatibilityScore"]
-
-        # 12. Update Workflow entry with analysis results
-        workflow.activity_breakdown = activity_breakdown
-        workflow.risk_indicators = detected_issues if detected_issues else ["No major issues detected"]
-        workflow.estimated_effort_hours = effort_hours
-        workflow.compatibility_score = compatibility_score
-        workflow.suggestions = suggestions
-        db.commit()
-
-        result = {
-            "id": str(workflow.workflow_id),
-            "workflowName": file.filename,
-            "platform": platform,
-
-            # Flattened fields (VERY IMPORTANT)
-            "complexityScore": float(complexity.score),
-            "complexityLevel": complexity.level,
-            "totalActivities": metrics.activity_count,
-            "estimatedEffortHours": effort_hours,
-            "compatibilityScore": compatibility_score,
-
-            "riskIndicators": workflow.risk_indicators,
-            "activityBreakdown": activity_breakdown,
-
-            "analyzedAt": workflow.analyzed_at.isoformat() if workflow.analyzed_at else datetime.utcnow().isoformat(),
-
-            # Optional (detail page use)
-            "suggestions": suggestions,
-        }
-
-        analysis.result = result
-        analysis.status = AnalysisStatus.COMPLETED
-        db.commit()
-
-        return result
 
+    try:
+        result = pipeline.analyze(db, run)
+    except ParseLimitExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
-        logger.error(f"Analysis failed: {str(e)}")
-        print(e)
-        analysis.status = AnalysisStatus.FAILED
-        analysis.result = {
-            "error": str(e),
-            "error_type": type(e).__name__
-        }
-        db.commit()
-
         raise HTTPException(
             status_code=400,
             detail=f"Analysis failed: {str(e)}"
         )
+    response.headers.update(run.timing_headers())
+    return result
 
-@router.post("/uipath")
-def upload_and_analyze_uipath(
+
+@router.post("/upload")
+def upload_file_for_analysis(
+    background_tasks: BackgroundTasks,
+    response: Response,
     file: UploadFile = File(...),
+    mode: str = Query(
+        "full",
+        pattern="^(full|metrics)$",
+        description="'metrics' skips the element tree and code review and only computes counts, complexity and migration estimates",
+    ),
+    run_async: bool = Query(
+        False,
+        alias="async",
+        description="Return 202 with the analysis_id as soon as the file is stored and analyze it in the background; poll GET /api/v1/analyze/{analysis_id}. Best effort: an analysis interrupted by a server restart is reported as failed",
+    ),
     context=Depends(get_core_context),
     db: Session = Depends(get_db)
 ):
-    user = context["user"]
-    api_key = context["api_key"]
-    subscription = context["subscription"]
-
-    analysis_id = uuid.uuid4()
-
-    # Read file & compute hash
-    file_bytes = file.file.read()
-    file.file.seek(0)
-
-    file_hash = hashlib.sha256(file_bytes).hexdigest()
-
-    # Check cache
-    existing_analysis = (
-        db.query(AnalysisHistory)
-        .filter(
-            AnalysisHistory.user_id == user.user_id,
-            AnalysisHistory.file_hash == file_hash,
-            AnalysisHistory.status == AnalysisStatus.COMPLETED
+    pipeline = UploadAnalysisPipeline(mode)
+    run = _ingest(pipeline, file, context, db)
+
+    # A cached result is returned right away, in async mode too; an async
+    # analysis must be visible while it is pending
+    if run_async and not run.cached_response:
+        pipeline.submit(db, run)
+        background_tasks.add_task(pipeline.run_in_background, run)
+        return JSONResponse(
+            status_code=202,
+            content={
+                "analysis_id": str(run.analysis_id),
+                "status": AnalysisStatus.PENDING.value,
+                "statusUrl": f"/api/v1/analyze/{run.analysis_id}",
+            },
+            headers=run.timing_headers(),
         )
-        .order_by(AnalysisHistory.created_at.desc())
-        .first()
-    )
-
-    if existing_analysis:
-        cached_result = existing_analysis.result.copy() if existing_analysis.result else {}
-        cached_result["cached"] = True
 
-        if "workflow_id" in cached_result and "id" not in cached_result:
-            cached_result["id"] = cached_result["workflow_id"]
+    return _analyze(pipeline, run, response, db)
 
-        return cached_result
 
-    # Validate extension
+@router.post("/uipath")
+def upload_and_analyze_uipath(
+    response: Response,
+    file: UploadFile = File(...),
+    context=Depends(get_core_context),
+    db: Session = Depends(get_db)
+):
+    # Validate extension; the content is checked by the pipeline
     file_ext = Path(file.filename).suffix.lower()
     if file_ext != ".xaml":
         raise HTTPException(
@@ -293,183 +106,45 @@ def upload_and_analyze_uipath(
             detail="Only .xaml files are supported for UiPath analysis."
         )
 
-    # Save file
-    upload_dir = Path("uploads")
-    upload_dir.mkdir(exist_ok=True)
-
-    file_path = upload_dir / f"{analysis_id}_{file.filename}"
-
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    analysis = AnalysisHistory(
-        analysis_id=analysis_id,
-        user_id=user.user_id,
-        api_key_id=api_key.api_key_id,
-        subscription_id=subscription.subscription_id,
-        file_name=file.filename,
-        file_path=str(file_path),
-        file_hash=file_hash,
-        status=AnalysisStatus.IN_PROGRESS
-    )
+    pipeline = UploadAnalysisPipeline("full", expected_platform="UiPath")
+    run = _ingest(pipeline, file, context, db)
+    return _analyze(pipeline, run, response, db)
 
-    db.add(analysis)
-    db.commit()
-
-    try:
-        platform = "UiPath"
-
-        # Ensure project exists
-        project = db.query(Project).filter(Project.user_id == user.user_id).first()
-        if not project:
-            project = Project(
-                user_id=user.user_id,
-                name="Default Project",
-                platform=platform
-            )
-            db.add(project)
-            db.commit()
-            db.refresh(project)
-
-        # Create file record
-        db_file = FileModel(
-            project_id=project.project_id,
-            file_name=file.filename,
-            file_path=str(file_path),
-            file_size=len(file_bytes)
-        )
-        db.add(db_file)
-        db.commit()
-        db.refresh(db_file)
-
-        # Parse workflow
-        parsed_workflow = parse_workflow(str(file_path), platform)
-
-        # Metrics & complexity
-        metrics = calculate_metrics(parsed_workflow)
-        complexity = calculate_complexity(metrics)
-        # Create workflow DB record
-
-        workflow = Workflow(
-            project_id=project.project_id,
-            file_id=db_file.file_id,
-            platform=platform,
-            complexity_score=complexity.score,
-            complexity_level=complexity.level,
-            activity_count=len(parsed_workflow.activities),
-            nesting_depth=metrics.nesting_depth,
-            variable_count=metrics.variable_count,
-            invoked_workflows=metrics.invoked_workflows,
-            has_custom_code=metrics.has_custom_code,
-            raw_activities=parsed_workflow.raw_activities,
-            raw_variables=parsed_workflow.raw_variables
-        )
-
-        db.add(workflow)
-        db.commit()
-        db.refresh(workflow)
-        # Code review
-        review = run_service_review(db, workflow, user.user_id)
-
-        # Categorized Activity Breakdown using mapping service
-        categorized = Counter()
-        for activity in parsed_workflow.activities:
-            categorized[categorize_activity(activity)] += 1
-
-        activity_breakdown = dict(categorized)
-
-        # Detect Issues
-        detected_issues = []
-
-        if metrics.nesting_depth > 3:
-            detected_issues.append(f"High nesting depth (level {metrics.nesting_depth})")
-
-        if review.total_issues > 0:
-            for finding in review.findings:
-                if isinstance(finding, dict):
-                    detected_issues.append(finding.get("message", "Unknown issue"))
-
-        try:
-            if hasattr(metrics.has_custom_code, '__call__'):
-                # If it's a function, call it
-                has_custom_code_result = metrics.has_custom_code()
-            else:
-                # If it's already a boolean value
-                has_custom_code_result = bool(metrics.has_custom_code)
-                
-            if has_custom_code_result:
-                detected_issues.append("Contains custom code/scripts")
-        except Exception:
-            # Skip custom code check if it fails
-            pass
-        # Suggestions
-        suggestions = []
-        if review.findings:
-            for idx, finding in enumerate(review.findings, 1):
-                if isinstance(finding, dict):
-                    suggestions.append({
-                        "id": idx,
-                        "priority": finding.get("severity", "medium").lower(),
-                        "title": finding.get("message", "Code Quality Issue"),
-                        "description": finding.get("recommendation", "Review and refactor"),
-                        "impact": finding.get("impact", "Medium"),
-                        "effort": finding.get("effort", "Medium"),
-                        "benefits": ["Improved maintainability", "Better code quality"],
-                        "implementation_steps": [finding.get("recommendation", "Review code")]
-                    })
-
-        # Effort Estimation using the comprehensive mapping service
-        stats = calculate_migration_stats(parsed_workflow.activities)
-        effort_hours = stats["totalEffortHours"]
-        compatibility_score = stats["compatibilityScore"]
-        # Final Response & Persist to Workflow Table
-        workflow.activity_breakdown = activity_breakdown
-        workflow.risk_indicators = detected_issues or ["No major issues detected"]
-        workflow.estimated_effort_hours = effort_hours
-        workflow.compatibility_score = compatibility_score
-        workflow.suggestions = suggestions
-        db.commit()
-
-        result = {
-            "id": str(workflow.workflow_id),
-            "workflowName": file.filename,
-            "platform": platform,
-            "complexityScore": float(complexity.score),
-            "complexityLevel": complexity.level,
-            "totalActivities": len(parsed_workflow.activities),
-            "estimatedEffortHours": effort_hours,
-            "compatibilityScore": compatibility_score,
-            "riskIndicators": workflow.risk_indicators,
-            "activityBreakdown": activity_breakdown,
-            "analyzedAt": workflow.analyzed_at.isoformat()
-                if workflow.analyzed_at
-                else datetime.utcnow().isoformat(),
-            "suggestions": suggestions
-        }
-
-        analysis.result = result
-        analysis.status = AnalysisStatus.COMPLETED
-        db.commit()
-
-        return result
-
-    except Exception as e:
-        import traceback
-        analysis.status = AnalysisStatus.FAILED
-        analysis.result = {
-            "error": str(e),
-            "error_type": type(e).__name__,
-            "traceback": traceback.format_exc()
-        }
-        db.commit()
-        print("Full traceback:")
-        print(traceback.format_exc())
 
+@router.post("/batch")
+def upload_and_analyze_batch(
+    files: list[UploadFile] = File(...),
+    mode: str = Query(
+        "full",
+        pattern="^(full|metrics)$",
+        description="'metrics' skips the element tree and code review and only computes counts, complexity and migration estimates",
+    ),
+    context=Depends(get_core_context),
+    db: Session = Depends(get_db)
+):
+    """
+    Analyze several workflow files in one request.
+
+    The API key, subscription and quota are checked once for the whole
+    batch; the files are analyzed in parallel and the response is streamed
+    as NDJSON: a "batch" line, one "file" line per file as soon as it is
+    done (completed with its result, or failed with the error), then a
+    "summary" line. Each file is stored as its own analysis, exactly as if
+    it had been sent to /upload.
+    """
+    if len(files) > settings.batch_upload_max_files:
         raise HTTPException(
             status_code=400,
-            detail=f"Analysis failed: {str(e)}"
+            detail=f"At most {settings.batch_upload_max_files} files can be analyzed per batch."
         )
 
+    # Every file counts against the quota
+    check_quota(context["subscription"], context["api_key"], db, requested=len(files))
+
+    pipeline = UploadAnalysisPipeline(mode)
+    uploads = [(file.filename, file.file) for file in files]
+    return StreamingResponse(pipeline.stream_batch(db, uploads, context), media_type="application/x-ndjson")
+
 
 # @router.post("/uipath")
 # def upload_and_analyze_uipath(
@@ -685,20 +360,35 @@ def get_analysis_status(
     context=Depends(get_core_context),
     db: Session = Depends(get_db)
 ):
+    """
+    Status of an analysis. Async uploads report pending, then in_progress
+    with the partial result known so far, then completed with the full
+    result (or failed with the error).
+    """
     analysis = (
         db.query(AnalysisHistory)
-        .filter(AnalysisHistory.analysis_id == analysis_id)
+        .filter(
+            AnalysisHistory.analysis_id == analysis_id,
+            AnalysisHistory.user_id == context["user"].user_id
+        )
         .first()
     )
 
     if not analysis:
         return {"detail": "Analysis not found"}
 
-    return {
+    response = {
         "analysis_id": analysis_id,
         "status": analysis.status.value,
         "file_name": analysis.file_name
     }
+    if analysis.status == AnalysisStatus.COMPLETED:
+        response["result"] = analysis.result
+    elif analysis.status == AnalysisStatus.FAILED:
+        response["error"] = (analysis.result or {}).get("error")
+    elif analysis.result:
+        response["partialResult"] = analysis.result
+    return response
 
 # --- LEGACY CODE (DO NOT REMOVE) ---
 # @router.post("/upload")
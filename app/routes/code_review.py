@@ -7,7 +7,8 @@ from app.core.database import get_db
 from app.core.deps import get_current_user
 from app.models.workflow import Workflow
 from app.models.code_review import CodeReview
-from app.services.code_review.comprehensive_rules import perform_code_review, get_severity_counts
+from app.services.code_review.comprehensive_rules import get_severity_counts
+from app.services.analysis.parse_executor import parse_executor
 from app.services.code_review.code_review_llm_gateway import run_code_review_llm
 from app.services.custom_rules.engine import run_custom_rules
 from app.models.custom_rules import CustomRule
@@ -62,13 +63,14 @@ def review(
         "workflowName": workflow.file.file_name if hasattr(workflow, 'file') else "Unknown",
         "nestingDepth": workflow.nesting_depth,
         "activityCount": workflow.activity_count,
-        "variables": workflow.raw_variables or []
+        "variables": workflow.raw_variables or [],
+        "selectorIndex": workflow.selector_index,
     }
     
     activities = workflow.raw_activities or []
 
     # Step 1: Run comprehensive built-in rules
-    review_result = perform_code_review(
+    review_result = parse_executor.review(
         platform=workflow.platform,
         workflow=workflow_data,
         activities=activities
@@ -1,5 +1,3 @@
-import os
-import shutil
 from fastapi import APIRouter, UploadFile, File as UploadFileType, Depends, HTTPException
 from sqlalchemy.orm import Session
 from uuid import UUID
@@ -8,8 +6,9 @@ from app.core.database import get_db
 from app.core.deps import get_current_user
 from app.models.file import File
 from app.models.user import User
-
-UPLOAD_ROOT = "data/uploads"
+from app.services.analysis.parse_limits import ParseLimitExceeded
+from app.services.analysis.platform_detector import detect_platform
+from app.services.analysis.upload_store import upload_store
 
 router = APIRouter(prefix="/api/v1/files", tags=["Files"])
 
@@ -21,18 +20,19 @@ def upload_file(
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
-    os.makedirs(f"{UPLOAD_ROOT}/{project_id}", exist_ok=True)
-
-    file_path = f"{UPLOAD_ROOT}/{project_id}/{upload.filename}"
-
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(upload.file, buffer)
+    # Stored by content, and XAML canonicalized, like the analysis uploads
+    platform = detect_platform(upload.file, upload.filename)
+    try:
+        stored = upload_store.save(upload.file, platform, name=upload.filename)
+    except ParseLimitExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
 
     db_file = File(
         project_id=project_id,
         file_name=upload.filename,
-        file_path=file_path,
-        file_size=os.path.getsize(file_path),
+        file_path=str(stored.path),
+        file_size=stored.size,
+        content_hash=stored.content_hash,
     )
 
     db.add(db_file)
@@ -1,7 +1,26 @@
 from fastapi import APIRouter
 
+from app.services.analysis.parse_cache import parse_cache
+from app.services.analysis.upload_coalescer import upload_coalescer
+from app.services.analysis.upload_pipeline import pipeline_stats
+
 router = APIRouter()
 
 @router.get("/health")
 def health():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+
+@router.get("/health/parse-cache")
+def parse_cache_health():
+    return parse_cache.stats()
+
+
+@router.get("/health/upload-coalescing")
+def upload_coalescing_health():
+    return upload_coalescer.stats()
+
+
+@router.get("/health/analysis-pipeline")
+def analysis_pipeline_health():
+    return pipeline_stats.stats()
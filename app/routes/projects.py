@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
 from sqlalchemy.orm import Session
 from uuid import UUID
 
 from app.core.database import get_db
 from app.core.deps import get_current_user
 from app.models.user import User
+from app.models.workflow import Workflow
+from app.models.file import File as FileModel
+from app.services.analysis.parse_limits import ParseLimitExceeded
+from app.services.analysis.upload_store import upload_store
 from app.schemas.project import ProjectCreate, ProjectUpdate, ProjectOut
 from app.services.projects import project_service
 
@@ -71,3 +75,62 @@ def delete(
         "project_id": str(project_id)
     }
 
+
+@router.get("/{project_id}/dependency-graph")
+def dependency_graph(
+    project_id: UUID,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Invoke graph of the project with cycles and transitive complexity roll-ups."""
+    project = project_service.get_project(db, project_id, user.user_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    return project_service.get_dependency_graph(db, project)
+
+
+@router.put("/{project_id}/workflows/{workflow_id}/file")
+def replace_workflow_file(
+    project_id: UUID,
+    workflow_id: UUID,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """
+    Upload a new version of one workflow file. Only that workflow and the
+    workflows that (transitively) invoke it are re-analyzed and re-scored.
+    """
+    project = project_service.get_project(db, project_id, user.user_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    workflow = (
+        db.query(Workflow)
+        .filter(Workflow.workflow_id == workflow_id, Workflow.project_id == project_id)
+        .first()
+    )
+    if not workflow:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+
+    try:
+        stored = upload_store.save(file.file, workflow.platform, name=file.filename)
+    except ParseLimitExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    # The previous version's blob is collected once nothing references it
+    db_file = db.query(FileModel).filter(FileModel.file_id == workflow.file_id).first()
+    if db_file:
+        db_file.file_path = str(stored.path)
+        db_file.file_size = stored.size
+        db_file.content_hash = stored.content_hash
+
+    try:
+        return project_service.reanalyze_workflow_file(db, project, workflow, str(stored.path), stored.content_hash)
+    except ParseLimitExceeded as e:
+        db.rollback()
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Analysis failed: {str(e)}")
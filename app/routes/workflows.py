@@ -9,6 +9,7 @@ from app.core.deps import get_current_user
 from app.models.file import File
 from app.models.workflow import Workflow
 from app.models.project import Project
+from app.services.analysis.selectors import summarize_selector_index
 from app.services.workflows.complexity import analyze_workflow
 from app.services.workflows.workflow_llm_gateway import run_workflow_llm_analysis
 from app.models.user import User
@@ -44,7 +45,7 @@ def analyze(
         raise HTTPException(status_code=404, detail="File not found")
 
     # Step 1: Local complexity analysis
-    result = analyze_workflow(file.file_path)
+    result = analyze_workflow(file.file_path, platform, content_hash=file.content_hash)
 
     # Step 2: AI-powered analysis (with graceful fallback)
     ai_result = {}
@@ -145,6 +146,10 @@ def get_workflow(
         "variable_count": workflow.variable_count,
         "ai_summary": workflow.ai_summary,
         "ai_recommendations": workflow.ai_recommendations,
+        # Metrics-mode and older workflows have no selector index
+        "selector_summary": (
+            summarize_selector_index(workflow.selector_index) if workflow.selector_index is not None else None
+        ),
         "analyzed_at": workflow.analyzed_at.isoformat() if workflow.analyzed_at else None,
     }
 
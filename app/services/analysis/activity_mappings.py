@@ -1,6 +1,11 @@
 from typing import List, Dict, Optional, Any
+from collections import Counter
 import math
 
+# Bump whenever ACTIVITY_MAPPINGS or the effort / compatibility formulas
+# change so cached analysis results are invalidated
+MAPPINGS_VERSION = "1"
+
 class ActivityMappingData:
     def __init__(self, uiPathActivity: str, bluePrismEquivalent: str, mappingType: str, effortEstimate: float, isDeprecated: bool, category: str, conversionNotes: str = ""):
         self.uiPathActivity = uiPathActivity
@@ -154,11 +159,23 @@ def get_mappings_for_activities(activities: List[str], direction: str = 'UiPath-
         })
     return results
 
+def categorize_activity_counts(activity_counts: Dict[str, int]) -> Dict[str, int]:
+    """Category breakdown from per-activity counts (one lookup per distinct activity)."""
+    categorized = Counter()
+    for activity, count in activity_counts.items():
+        categorized[categorize_activity(activity)] += count
+    return dict(categorized)
+
 def calculate_migration_stats(activities: List[str], direction: str = 'UiPath-to-BP') -> Dict[str, Any]:
-    mapping_results = get_mappings_for_activities(activities, direction)
+    return calculate_migration_stats_from_counts(dict(Counter(activities)), direction)
+
+def calculate_migration_stats_from_counts(activity_counts: Dict[str, int], direction: str = 'UiPath-to-BP') -> Dict[str, Any]:
+    # Mappings are resolved once per distinct activity and weighted by count
+    distinct = list(activity_counts)
+    mapping_results = get_mappings_for_activities(distinct, direction)
 
     stats = {
-        "totalActivities": len(activities),
+        "totalActivities": sum(activity_counts.values()),
         "directMappings": 0,
         "partialMappings": 0,
         "complexMappings": 0,
@@ -167,20 +184,21 @@ def calculate_migration_stats(activities: List[str], direction: str = 'UiPath-to
         "compatibilityScore": 0
     }
 
-    for result in mapping_results:
+    for activity, result in zip(distinct, mapping_results):
+        count = activity_counts[activity]
         if result["hasDirect"]:
-            stats["directMappings"] += 1
-            stats["totalEffortHours"] += result["mappings"][0]["effortEstimate"] if result["mappings"] else 0
+            stats["directMappings"] += count
+            stats["totalEffortHours"] += (result["mappings"][0]["effortEstimate"] if result["mappings"] else 0) * count
         elif result["hasPartial"]:
-            stats["partialMappings"] += 1
-            stats["totalEffortHours"] += result["mappings"][0]["effortEstimate"] if result["mappings"] else 0
+            stats["partialMappings"] += count
+            stats["totalEffortHours"] += (result["mappings"][0]["effortEstimate"] if result["mappings"] else 0) * count
         elif result["isComplex"]:
-            stats["complexMappings"] += 1
-            stats["totalEffortHours"] += result["mappings"][0]["effortEstimate"] if result["mappings"] else 0
+            stats["complexMappings"] += count
+            stats["totalEffortHours"] += (result["mappings"][0]["effortEstimate"] if result["mappings"] else 0) * count
         elif result["isIncompatible"]:
-            stats["incompatibleMappings"] += 1
+            stats["incompatibleMappings"] += count
             # Default 8 hours for custom implementation if incompatible or no mapping found
-            stats["totalEffortHours"] += 8.0
+            stats["totalEffortHours"] += 8.0 * count
 
     # Calculate compatibility score (weighted)
     if stats["totalActivities"] > 0:
@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Session
 
-from app.services.analysis.parser import parse_workflow
+from app.services.analysis.parse_cache import parse_workflow_cached
 from app.services.analysis.metrics import calculate_metrics
 from app.services.analysis.complexity import calculate_complexity
 from app.services.analysis.llm_gateway import run_llm_analysis
@@ -17,7 +17,7 @@ def run_analysis(
     user_id=None,  # Optional for backward compatibility
 ) -> Workflow:
     # 1. Parse
-    parsed = parse_workflow(file.file_path, platform)
+    parsed = parse_workflow_cached(file.file_path, platform)
 
     # 2. Metrics
     metrics = calculate_metrics(parsed)
@@ -0,0 +1,315 @@
+import io
+import os
+import shutil
+import hashlib
+import logging
+import threading
+from pathlib import Path
+
+from lxml import etree
+
+from app.services.analysis.parse_limits import LimitedReader, ParseLimits, default_parse_limits
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 64 * 1024
+
+_XML_NAMESPACE = "http://www.w3.org/XML/1998/namespace"
+_XML_SPACE = f"{{{_XML_NAMESPACE}}}space"
+
+# Designer-only subtrees: layout, view state, editor imports and debug data
+DESIGNER_ELEMENTS = {
+    "WorkflowViewStateService.ViewState",
+    "WorkflowViewState.ViewStateManager",
+    "TextExpression.NamespacesForImplementation",
+    "TextExpression.ReferencesForImplementation",
+    "VisualBasic.Settings",
+    "DebugSymbol.Symbol",
+}
+
+# Designer-only attributes (matched on the local name, any namespace)
+DESIGNER_ATTRIBUTES = {
+    "WorkflowViewState.IdRef",
+    "VirtualizedContainerService.HintSize",
+    "DebugSymbol.Symbol",
+    "VisualBasic.Settings",
+}
+
+
+def _local_name(name: str) -> str:
+    return name.rsplit("}", 1)[-1]
+
+
+def _escape_text(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace("\r", "&#13;")
+
+
+def _escape_attribute(value: str) -> str:
+    return (
+        _escape_text(value)
+        .replace('"', "&quot;")
+        .replace("\n", "&#10;")
+        .replace("\t", "&#9;")
+    )
+
+
+class _HashingWriter:
+    """File wrapper that hashes and counts everything written through it."""
+
+    def __init__(self, out):
+        self._out = out
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes):
+        self.digest.update(data)
+        self.size += len(data)
+        self._out.write(data)
+
+
+class _Canonicalizer:
+    """
+    Event-driven serializer for one document.
+
+    Text is only complete once the parser has moved past it, so an
+    element's start tag and text are written when its first child starts
+    (or when it ends, as a self-closing tag if it has no content), and its
+    tail when the next sibling starts or the parent ends.
+    """
+
+    def __init__(self):
+        self.parts: list[str] = []
+        self._open = []          # [element, start tag, scope, written, preserve whitespace]
+        self._pending_tail = None
+        self._pending_ns = []
+        self._skip_depth = 0
+        self._root_scope = ({}, {_XML_NAMESPACE: "xml"})   # (prefix -> uri, uri -> prefix)
+
+    def _keeps(self, text, preserve: bool) -> bool:
+        return bool(text) and (preserve or not text.isspace())
+
+    def _flush_tail(self):
+        if self._pending_tail is not None:
+            tail = self._pending_tail.tail
+            # A tail is content of the element that is open now
+            if self._keeps(tail, bool(self._open) and self._open[-1][4]):
+                self.parts.append(_escape_text(tail))
+            self._pending_tail = None
+
+    def _open_parent(self):
+        if self._open and not self._open[-1][3]:
+            entry = self._open[-1]
+            self.parts.append(entry[1] + ">")
+            text = entry[0].text
+            if self._keeps(text, entry[4]):
+                self.parts.append(_escape_text(text))
+            entry[3] = True
+
+    def start_ns(self, prefix: str, uri: str):
+        self._pending_ns.append((prefix, uri))
+
+    def _scope(self, parent_scope):
+        # Namespace scopes are shared with the parent unless the element
+        # declares something, so the common case costs nothing
+        if not self._pending_ns:
+            return parent_scope, ""
+        declared = sorted(self._pending_ns)
+        self._pending_ns = []
+        nsmap = dict(parent_scope[0])
+        nsmap.update(declared)
+        # A redeclared prefix no longer names the parent's URI
+        redeclared = {prefix for prefix, _ in declared}
+        prefix_of = {uri: prefix for uri, prefix in parent_scope[1].items() if prefix not in redeclared}
+        for prefix, uri in sorted(nsmap.items(), reverse=True):
+            if prefix:
+                prefix_of[uri] = prefix
+        declarations = "".join(
+            f' xmlns:{prefix}="{_escape_attribute(uri)}"' if prefix else f' xmlns="{_escape_attribute(uri)}"'
+            for prefix, uri in declared
+        )
+        return (nsmap, prefix_of), declarations
+
+    def start(self, el):
+        if self._skip_depth:
+            self._skip_depth += 1
+            self._pending_ns = []
+            return
+
+        self._flush_tail()
+        self._open_parent()
+
+        tag = el.tag
+        if _local_name(tag) in DESIGNER_ELEMENTS:
+            self._skip_depth = 1
+            self._pending_ns = []
+            return
+
+        scope, declarations = self._scope(self._open[-1][2] if self._open else self._root_scope)
+        prefix_of = scope[1]
+
+        if tag[0] == "{":
+            uri, local = tag[1:].split("}", 1)
+            prefix = prefix_of.get(uri) if scope[0].get("") != uri else None
+            tag = f"{prefix}:{local}" if prefix else local
+        parts = ["<", tag, declarations]
+
+        attrib = el.attrib
+        for key in sorted(attrib):
+            if key[0] == "{":
+                uri, local = key[1:].split("}", 1)
+                if local in DESIGNER_ATTRIBUTES:
+                    continue
+                prefix = prefix_of.get(uri)
+                name = f"{prefix}:{local}" if prefix else local
+                parts.append(f' {name}="{_escape_attribute(attrib[key])}"')
+            elif key not in DESIGNER_ATTRIBUTES:
+                parts.append(f' {key}="{_escape_attribute(attrib[key])}"')
+
+        space = attrib.get(_XML_SPACE)
+        preserve = space == "preserve" if space else bool(self._open) and self._open[-1][4]
+        self._open.append([el, "".join(parts), scope, False, preserve])
+
+    def end(self, el):
+        if self._skip_depth:
+            self._skip_depth -= 1
+            if not self._skip_depth:
+                # The dropped subtree's tail still belongs to the parent
+                self._pending_tail = el
+            return
+
+        self._flush_tail()
+        _, start_tag, _, written, preserve = self._open.pop()
+        if written:
+            self.parts.append(f"</{start_tag[1:].split(' ', 1)[0]}>")
+        elif self._keeps(el.text, preserve):
+            self.parts.append(f"{start_tag}>{_escape_text(el.text)}</{start_tag[1:].split(' ', 1)[0]}>")
+        else:
+            self.parts.append(start_tag + "/>")
+        self._pending_tail = el
+
+    def take(self) -> bytes:
+        data = "".join(self.parts).encode("utf-8")
+        self.parts.clear()
+        return data
+
+
+def canonicalize_xaml(source, out, limits: ParseLimits | None = None) -> None:
+    """
+    Stream a XAML document from the binary file object `source` to `out`
+    in canonical form.
+
+    Designer-only subtrees and attributes are dropped, whitespace-only
+    text (outside xml:space="preserve", as XAML itself treats it),
+    comments and processing instructions are removed, attributes
+    and namespace declarations are sorted, and the document is written
+    without indentation. Files that differ only in layout therefore
+    canonicalize to identical bytes. The input is fed in chunks and
+    finished elements are released, so memory stays bounded by the
+    nesting depth. Raises etree.XMLSyntaxError for input that is not
+    well-formed XML (nothing is repaired: a recovered document could drop
+    or reorder content) and ParseLimitExceeded as soon as the input
+    crosses a parse limit.
+    """
+    tracker = (limits or default_parse_limits()).tracker()
+    parser = etree.XMLPullParser(
+        events=("start-ns", "start", "end"),
+        remove_comments=True,
+        remove_pis=True,
+        huge_tree=True,
+        no_network=True,
+    )
+    canonicalizer = _Canonicalizer()
+    out.write(b'<?xml version="1.0" encoding="utf-8"?>\n')
+    depth = -1
+
+    def drain():
+        nonlocal depth
+        for event, el in parser.read_events():
+            if event == "start":
+                depth += 1
+                tracker.element(depth, el.attrib)
+                canonicalizer.start(el)
+                continue
+            if event == "start-ns":
+                canonicalizer.start_ns(*el)
+                continue
+            tracker.text(el.text)
+            depth -= 1
+            canonicalizer.end(el)
+            # Keep the tail: it is written on the next event
+            el.clear(keep_tail=True)
+            while el.getprevious() is not None:
+                del el.getparent()[0]
+        out.write(canonicalizer.take())
+
+    for chunk in iter(lambda: source.read(_CHUNK_SIZE), b""):
+        tracker.read(len(chunk))
+        parser.feed(chunk)
+        drain()
+    root = parser.close()
+    drain()
+
+    if root is None:
+        raise etree.XMLSyntaxError("Document is empty", None, 0, 0)
+
+
+def canonical_xaml_bytes(file_path: str) -> bytes:
+    out = io.BytesIO()
+    with open(file_path, "rb") as f:
+        canonicalize_xaml(f, out)
+    return out.getvalue()
+
+
+def write_workflow(source, f, name: str, platform: str | None, limits: ParseLimits) -> tuple[int, str]:
+    """
+    Write one workflow from `source` to the binary file object `f` the way
+    it is stored (see save_workflow_file); returns (size, sha256) of what
+    was written. `f` must support seek(0) and truncate() for the verbatim
+    fallback.
+    """
+    writer = _HashingWriter(f)
+    if platform == "UiPath":
+        try:
+            canonicalize_xaml(source, writer, limits)
+            return writer.size, writer.digest.hexdigest()
+        except etree.LxmlError as e:
+            logger.warning(f"Storing {name} verbatim, canonicalization failed: {e}")
+            source.seek(0)
+            f.seek(0)
+            f.truncate()
+            writer = _HashingWriter(f)
+
+    shutil.copyfileobj(LimitedReader(source, limits.tracker()), writer, _CHUNK_SIZE)
+    return writer.size, writer.digest.hexdigest()
+
+
+def save_workflow_file(
+    source,
+    destination: Path,
+    platform: str | None,
+    limits: ParseLimits | None = None,
+) -> tuple[int, str]:
+    """
+    Store an uploaded workflow file; returns (size, sha256) of what was written.
+
+    UiPath XAML is stored in canonical form, so the hash doubles as a
+    layout-insensitive cache key and every later reader (parser, code
+    review, LLM prompt) sees the same designer-free document. Other
+    platforms, and XAML that is not well-formed enough to canonicalize,
+    are copied verbatim; `source` must be seekable for that fallback.
+
+    The upload is read once, in chunks, and hashed and size-checked as it
+    is written to a temporary file that is renamed into place when
+    complete. Reading stops with ParseLimitExceeded as soon as the input
+    passes the limits; nothing is left on disk after any error.
+    """
+    limits = limits or default_parse_limits()
+    tmp_path = destination.with_name(f"{destination.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            size, content_hash = write_workflow(source, f, destination.name, platform, limits)
+        os.replace(tmp_path, destination)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return size, content_hash
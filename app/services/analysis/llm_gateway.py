@@ -11,6 +11,7 @@ from app.domain.llm_contracts import LLMInput, LLMOutput
 from app.services.analysis.prompts import ANALYSIS_PROMPT_V1
 from app.core.config import settings
 from app.core.usage_tracker import increment_ai_calls
+from app.services.analysis.canonicalizer import canonical_xaml_bytes
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +21,17 @@ MAX_RETRIES = 3
 RETRY_DELAY = 2  # seconds
 
 
+def _read_workflow_content(file_path: str) -> str:
+    """Workflow text for the prompt; XAML is sent without its designer metadata."""
+    if Path(file_path).suffix.lower() == ".xaml":
+        try:
+            return canonical_xaml_bytes(file_path).decode("utf-8")
+        except Exception as e:
+            logger.warning(f"Sending {file_path} uncanonicalized: {str(e)}")
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        return f.read()
+
+
 def run_llm_analysis_from_file(file_path: str, platform: str, db, user_id) -> LLMOutput:
     """
     Send the file directly to the LLM for analysis.
@@ -27,8 +39,7 @@ def run_llm_analysis_from_file(file_path: str, platform: str, db, user_id) -> LL
     """
     try:
         # Read file content
-        with open(file_path, 'r', encoding='utf-8') as f:
-            file_content = f.read()
+        file_content = _read_workflow_content(file_path)
         
         # Truncate if too large (max ~30KB for context)
         # if len(file_content) > 30000:
@@ -100,9 +111,8 @@ def run_llm_analysis(data: LLMInput, db, user_id, file_path: str = None) -> LLMO
     file_content_section = ""
     if file_path and Path(file_path).exists():
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-                file_content_section = f"\n\nRaw Workflow Content:\n```\n{content}\n```"
+            content = _read_workflow_content(file_path)
+            file_content_section = f"\n\nRaw Workflow Content:\n```\n{content}\n```"
         except Exception as e:
             logger.warning(f"Failed to read file for LLM analysis: {str(e)}")
 
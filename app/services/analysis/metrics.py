@@ -1,19 +1,29 @@
-from collections import Counter
-from app.domain.analysis_contracts import ParsedWorkflow, DeterministicMetrics
+from app.domain.analysis_contracts import ParsedWorkflow, WorkflowSummary, DeterministicMetrics
 
 
-def calculate_metrics(parsed: ParsedWorkflow) -> DeterministicMetrics:
+def calculate_metrics(parsed: ParsedWorkflow | WorkflowSummary) -> DeterministicMetrics:
+    # Work from per-activity counts so compact parse results are never
+    # expanded into one string per node
+    activity_counts = parsed.activity_counts()
+
     invoked_workflows = sum(
-        1 for a in parsed.activities if "Invoke" in a
+        count for a, count in activity_counts.items() if "Invoke" in a
     )
 
     has_custom_code = any(
-        "Code" in a or "Script" in a for a in parsed.activities
+        "Code" in a or "Script" in a for a in activity_counts
     )
 
+    if isinstance(parsed, WorkflowSummary):
+        activity_count = parsed.activity_count
+        variable_count = parsed.variable_count
+    else:
+        activity_count = len(parsed.activities)
+        variable_count = len(parsed.variables)
+
     return DeterministicMetrics(
-        activity_count=len(parsed.activities),
-        variable_count=len(parsed.variables),
+        activity_count=activity_count,
+        variable_count=variable_count,
         nesting_depth=parsed.nesting_depth,
         invoked_workflows=invoked_workflows,
         has_custom_code=has_custom_code,
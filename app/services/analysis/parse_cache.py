@@ -0,0 +1,177 @@
+import os
+import zlib
+import marshal
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from pathlib import Path
+
+from app.core.config import settings
+from app.domain.analysis_contracts import ParsedWorkflow
+from app.domain.compact_workflow import CompactWorkflow
+from app.services.analysis.parse_limits import ParseLimits
+from app.services.analysis.parser import PARSER_VERSION
+from app.services.analysis.parse_executor import parse_executor
+
+logger = logging.getLogger(__name__)
+
+# On-disk entry layout: MAGIC | marshal version byte | zlib(marshal(state))
+# where state is the CompactWorkflow state every parser produces. PWC2
+# entries (state tagged with its kind) are not read and are parsed again.
+_MAGIC = b"PWC3"
+_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _encode(parsed: ParsedWorkflow) -> bytes:
+    return _MAGIC + bytes([marshal.version]) + zlib.compress(marshal.dumps(parsed.compact.to_state()), 1)
+
+
+def _decode(blob: bytes) -> ParsedWorkflow | None:
+    if blob[:4] != _MAGIC or blob[4] != marshal.version:
+        return None
+    return ParsedWorkflow.from_compact(CompactWorkflow.from_state(marshal.loads(zlib.decompress(blob[5:]))))
+
+
+class ParseCache:
+    """
+    Two-tier cache of ParsedWorkflow results keyed by
+    (content SHA-256, parser version, platform).
+
+    The first tier is an in-process LRU; the second is a directory of
+    compact marshal+zlib blobs shared by every worker on the host. Cached
+    entries never carry raw_tree and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int, cache_dir: str | None):
+        self.max_entries = max_entries
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._entries: OrderedDict[tuple, ParsedWorkflow] = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _disk_path(self, key: tuple) -> Path:
+        content_hash, version, platform = key
+        platform_slug = platform.lower().replace(" ", "-")
+        return self.cache_dir / content_hash[:2] / f"{content_hash}-v{version}-{platform_slug}.bin"
+
+    def get(self, key: tuple) -> ParsedWorkflow | None:
+        with self._lock:
+            parsed = self._entries.get(key)
+            if parsed is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return parsed
+
+        parsed = self._read_disk(key)
+
+        with self._lock:
+            if parsed is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, parsed)
+        return parsed
+
+    def put(self, key: tuple, parsed: ParsedWorkflow):
+        parsed = replace(parsed, raw_tree=None)
+        with self._lock:
+            self._remember(key, parsed)
+        self._write_disk(key, parsed)
+
+    def _remember(self, key: tuple, parsed: ParsedWorkflow):
+        self._entries[key] = parsed
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_disk(self, key: tuple) -> ParsedWorkflow | None:
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            return _decode(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable parse cache entry {path}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def _write_disk(self, key: tuple, parsed: ParsedWorkflow):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_bytes(_encode(parsed))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Failed to write parse cache entry {path}: {e}")
+            tmp_path.unlink(missing_ok=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+parse_cache = ParseCache(
+    max_entries=settings.parse_cache_max_entries,
+    cache_dir=settings.parse_cache_dir,
+)
+
+
+def parse_workflow_cached(
+    file_path: str,
+    platform: str,
+    content_hash: str | None = None,
+    limits: ParseLimits | None = None,
+) -> ParsedWorkflow:
+    """
+    parse_workflow() behind the shared parse cache; misses are parsed
+    in the parse process pool.
+
+    content_hash is the SHA-256 of the file; callers that already hashed
+    the upload should pass it to avoid reading the file twice. limits
+    only apply to misses: a cached result cost nothing to produce.
+    """
+    if not settings.parse_cache_enabled:
+        return parse_executor.parse(file_path, platform, limits)
+
+    if content_hash is None:
+        content_hash = file_sha256(file_path)
+
+    key = (content_hash, PARSER_VERSION, platform)
+
+    cached = parse_cache.get(key)
+    if cached is not None:
+        logger.info(f"Parse cache hit for {content_hash[:16]}... ({platform})")
+        return cached
+
+    parsed = parse_executor.parse(file_path, platform, limits)
+    parse_cache.put(key, parsed)
+    return parsed
@@ -0,0 +1,233 @@
+import os
+import signal
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from lxml import etree
+
+from app.core.config import settings
+from app.domain.analysis_contracts import ParsedWorkflow, WorkflowSummary
+from app.domain.compact_workflow import CompactWorkflow
+from app.services.analysis.parse_limits import ParseLimits
+from app.services.analysis.parser import parse_workflow
+from app.services.analysis.summary_parser import parse_workflow_summary
+from app.services.code_review.comprehensive_rules import perform_code_review
+
+logger = logging.getLogger(__name__)
+
+# Extra time the parent waits beyond the wall-clock limit before it
+# assumes a worker is stuck (e.g. inside C code) and kills the pool
+_WALL_GRACE_SECONDS = 5
+
+
+class ParseTimeoutError(Exception):
+    """A parse or review task exceeded its CPU or wall-clock limit."""
+
+
+class WorkflowParseError(Exception):
+    """The workflow XML could not be parsed at all (empty or unrecoverable)."""
+
+
+# ----------------------------------------------------------------------
+# Worker side
+# ----------------------------------------------------------------------
+
+def _register_worker(pids):
+    # Pool initializer: lets the parent find its own workers to terminate
+    pids.put(os.getpid())
+
+
+def _raise_timeout(signum, frame):
+    limit = "CPU" if signum == signal.SIGPROF else "wall-clock"
+    raise ParseTimeoutError(f"{limit} time limit exceeded")
+
+
+def _call_with_limits(fn, args: tuple, cpu_seconds: float, wall_seconds: float):
+    """
+    Run fn(*args) with ITIMER_PROF / ITIMER_REAL armed, so a runaway task
+    raises ParseTimeoutError inside the worker instead of pinning it.
+    """
+    armed = hasattr(signal, "setitimer")
+    if armed:
+        signal.signal(signal.SIGPROF, _raise_timeout)
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_PROF, cpu_seconds)
+        signal.setitimer(signal.ITIMER_REAL, wall_seconds)
+    try:
+        return fn(*args)
+    except etree.LxmlError as e:
+        # lxml errors carry their error log, which cannot be pickled back
+        # to the parent process
+        raise WorkflowParseError(str(e)) from None
+    finally:
+        if armed:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _parse_task(
+    file_path: str, platform: str, limits: ParseLimits | None, cpu_seconds: float, wall_seconds: float
+) -> tuple:
+    # The tree cannot leave the worker, so never build it; only the
+    # compact arrays are sent back
+    parsed = _call_with_limits(
+        parse_workflow, (file_path, platform, True, limits), cpu_seconds, wall_seconds
+    )
+    return parsed.compact.to_state()
+
+
+def _summary_task(
+    file_path: str, platform: str, limits: ParseLimits | None, cpu_seconds: float, wall_seconds: float
+) -> WorkflowSummary:
+    return _call_with_limits(
+        parse_workflow_summary, (file_path, platform, limits), cpu_seconds, wall_seconds
+    )
+
+
+def _review_task(platform: str, workflow: dict, activities: list, cpu_seconds: float, wall_seconds: float) -> dict:
+    return _call_with_limits(
+        perform_code_review, (platform, workflow, activities), cpu_seconds, wall_seconds
+    )
+
+
+# ----------------------------------------------------------------------
+# Parent side
+# ----------------------------------------------------------------------
+
+class ParseExecutor:
+    """
+    Dedicated process pool for CPU-heavy parsing and rule evaluation.
+
+    Workers are spawned lazily, recycled after max_tasks_per_child tasks
+    to bound memory growth, and the whole pool is replaced when a task
+    overruns its wall-clock limit. With workers=0 tasks run inline in the
+    calling thread, without time limits.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_tasks_per_child: int,
+        cpu_timeout_seconds: float,
+        wall_timeout_seconds: float,
+    ):
+        self.workers = workers
+        self.max_tasks_per_child = max_tasks_per_child
+        self.cpu_timeout_seconds = cpu_timeout_seconds
+        self.wall_timeout_seconds = wall_timeout_seconds
+        self._pool: ProcessPoolExecutor | None = None
+        self._worker_pids = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                context = multiprocessing.get_context("spawn")
+                self._worker_pids = context.SimpleQueue()
+                # max_tasks_per_child is not supported with the fork start method
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=context,
+                    max_tasks_per_child=self.max_tasks_per_child or None,
+                    initializer=_register_worker,
+                    initargs=(self._worker_pids,),
+                )
+                logger.info(f"Started parse pool with {self.workers} workers")
+            return self._pool
+
+    def _recycle(self, pool: ProcessPoolExecutor):
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+            worker_pids = self._worker_pids
+
+        # A worker stuck in C code never sees its timer signal; shutdown()
+        # cannot stop running tasks, so terminate the processes directly.
+        # Workers replaced after max_tasks_per_child are no longer children
+        pids = set()
+        while not worker_pids.empty():
+            pids.add(worker_pids.get())
+        for process in multiprocessing.active_children():
+            if process.pid in pids:
+                process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+        logger.warning("Parse pool recycled after a stuck task")
+
+    def _task_done(self, future):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _deadline(self, ahead: int) -> float:
+        """
+        How long the parent waits for a task with `ahead` tasks in flight
+        before it. The wall-clock limit is enforced in the worker, so every
+        task in front of it frees its worker within that limit; the parent
+        only steps in when a worker stopped answering altogether.
+        """
+        rounds = ahead // max(1, self.workers) + 1
+        return rounds * self.wall_timeout_seconds + _WALL_GRACE_SECONDS
+
+    def _run(self, task, args: tuple, label: str):
+        limits = (self.cpu_timeout_seconds, self.wall_timeout_seconds)
+        for attempt in (1, 2):
+            pool = self._get_pool()
+            try:
+                with self._lock:
+                    ahead = self._in_flight
+                    self._in_flight += 1
+                try:
+                    future = pool.submit(task, *args, *limits)
+                except BaseException:
+                    self._task_done(None)
+                    raise
+                future.add_done_callback(self._task_done)
+
+                return future.result(timeout=self._deadline(ahead))
+
+            except FutureTimeoutError:
+                self._recycle(pool)
+                raise ParseTimeoutError(
+                    f"{label}: no result within {self.wall_timeout_seconds}s"
+                )
+            except BrokenProcessPool:
+                # Another task's timeout took this worker down with the pool
+                self._recycle(pool)
+                if attempt == 2:
+                    raise
+
+    def parse(self, file_path: str, platform: str, limits: ParseLimits | None = None) -> ParsedWorkflow:
+        if self.workers <= 0:
+            return parse_workflow(file_path, platform, limits=limits)
+        state = self._run(_parse_task, (file_path, platform, limits), f"Parsing {file_path}")
+        return ParsedWorkflow.from_compact(CompactWorkflow.from_state(state))
+
+    def summarize(self, file_path: str, platform: str, limits: ParseLimits | None = None) -> WorkflowSummary:
+        if self.workers <= 0:
+            return parse_workflow_summary(file_path, platform, limits)
+        return self._run(_summary_task, (file_path, platform, limits), f"Summarizing {file_path}")
+
+    def review(self, platform: str, workflow: dict, activities: list) -> dict:
+        if self.workers <= 0:
+            return perform_code_review(platform, workflow, activities)
+        return self._run(
+            _review_task, (platform, workflow, list(activities)), "Code review"
+        )
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+parse_executor = ParseExecutor(
+    workers=settings.parse_workers,
+    max_tasks_per_child=settings.parse_max_tasks_per_child,
+    cpu_timeout_seconds=settings.parse_cpu_timeout_seconds,
+    wall_timeout_seconds=settings.parse_wall_timeout_seconds,
+)
@@ -0,0 +1,148 @@
+import time
+from dataclasses import dataclass
+
+from app.core.config import settings
+
+_MB = 1024 * 1024
+
+# Streaming walkers report their running totals (and the wall clock is
+# read) once per this many elements, or sooner when a limit is crossed
+CHECK_INTERVAL = 4096
+
+
+class ParseLimitExceeded(Exception):
+    """A workflow exceeded one of its parse limits; raised while the stream is still being read."""
+
+    def __init__(self, limit: str, maximum: int | float):
+        # Keep the arguments in .args so the error pickles across the parse pool
+        super().__init__(limit, maximum)
+        self.limit = limit
+        self.maximum = maximum
+
+    def __str__(self):
+        return f"Workflow exceeds the {self.limit} limit ({self.maximum})"
+
+
+@dataclass(frozen=True)
+class ParseLimits:
+    max_file_bytes: int
+    max_nodes: int
+    max_depth: int
+    max_text_chars: int       # element text and attribute values, summed
+    max_attribute_chars: int  # any single attribute value
+    max_seconds: float
+
+    def tracker(self) -> "LimitTracker":
+        return LimitTracker(self)
+
+
+class LimitTracker:
+    """
+    Running totals for one parse.
+
+    Raises ParseLimitExceeded as soon as a total crosses its limit, so a
+    pathological document is abandoned after reading only as much of it
+    as it takes to cross the line.
+    """
+
+    __slots__ = ("limits", "nodes", "text_chars", "input_bytes", "_deadline", "_next_clock")
+
+    def __init__(self, limits: ParseLimits):
+        self.limits = limits
+        self.nodes = 0
+        self.text_chars = 0
+        self.input_bytes = 0
+        self._deadline = time.monotonic() + limits.max_seconds
+        self._next_clock = CHECK_INTERVAL
+
+    def update(self, nodes: int, depth: int, text_chars: int):
+        """Check totals kept by a caller that counts inline in its own loop."""
+        limits = self.limits
+        self.nodes = nodes
+        self.text_chars = text_chars
+        if nodes > limits.max_nodes:
+            raise ParseLimitExceeded("node count", limits.max_nodes)
+        if depth > limits.max_depth:
+            raise ParseLimitExceeded("nesting depth", limits.max_depth)
+        if text_chars > limits.max_text_chars:
+            raise ParseLimitExceeded("total text size", limits.max_text_chars)
+        if nodes >= self._next_clock:
+            self._next_clock = nodes + CHECK_INTERVAL
+            if time.monotonic() > self._deadline:
+                raise ParseLimitExceeded("parse time (seconds)", limits.max_seconds)
+
+    def element(self, depth: int, attrib=None):
+        """Count one element and, when given, its attribute values."""
+        text_chars = self.text_chars
+        if attrib:
+            max_attribute = self.limits.max_attribute_chars
+            for value in attrib.values():
+                size = len(value)
+                if size > max_attribute:
+                    raise ParseLimitExceeded("attribute size", max_attribute)
+                text_chars += size
+        self.update(self.nodes + 1, depth, text_chars)
+
+    def text(self, value: str | None):
+        if value:
+            self.text_chars += len(value)
+            if self.text_chars > self.limits.max_text_chars:
+                raise ParseLimitExceeded("total text size", self.limits.max_text_chars)
+
+    def read(self, size: int):
+        self.input_bytes += size
+        if self.input_bytes > self.limits.max_file_bytes:
+            raise ParseLimitExceeded("file size (bytes)", self.limits.max_file_bytes)
+
+
+class LimitedReader:
+    """
+    Binary file wrapper that counts what the parser reads against
+    max_file_bytes.
+
+    Without entity expansion, attribute values can never add up to more
+    than the bytes read, so this also bounds them for walkers that do
+    not look at every attribute.
+    """
+
+    def __init__(self, f, tracker: LimitTracker):
+        self._f = f
+        self._tracker = tracker
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._f.read(size)
+        self._tracker.read(len(data))
+        return data
+
+    def close(self):
+        self._f.close()
+
+
+def parse_limits_for_file_size(max_file_size_mb: int | None) -> ParseLimits:
+    """
+    Limits for files of up to max_file_size_mb.
+
+    Node and text budgets scale with the allowed file size: without
+    entity expansion a document cannot hold more text than it has bytes,
+    and real workflows stay well under the per-MB node budget.
+    """
+    if not max_file_size_mb or max_file_size_mb <= 0:
+        max_file_size_mb = settings.parse_max_file_size_mb
+    file_bytes = max_file_size_mb * _MB
+    return ParseLimits(
+        max_file_bytes=file_bytes,
+        max_nodes=settings.parse_max_nodes_per_mb * max_file_size_mb,
+        max_depth=settings.parse_max_depth,
+        max_text_chars=file_bytes,
+        max_attribute_chars=min(settings.parse_max_attribute_kb * 1024, file_bytes),
+        max_seconds=settings.parse_wall_timeout_seconds,
+    )
+
+
+def parse_limits_for_plan(plan) -> ParseLimits:
+    """Limits for a tenant, from SubscriptionPlan.max_file_size_mb (None = the service default)."""
+    return parse_limits_for_file_size(getattr(plan, "max_file_size_mb", None))
+
+
+def default_parse_limits() -> ParseLimits:
+    return parse_limits_for_file_size(None)
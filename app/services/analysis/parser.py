@@ -51,174 +51,583 @@
 #         raw_tree=root,
 #     )
 
+import ijson
 from lxml import etree
+import os
 import logging
+from app.core.config import settings
 from app.domain.analysis_contracts import ParsedWorkflow
+from app.domain.compact_workflow import CompactWorkflow, VariableRecord
+from app.services.analysis.parse_limits import (
+    CHECK_INTERVAL,
+    LimitedReader,
+    LimitTracker,
+    ParseLimitExceeded,
+    ParseLimits,
+    default_parse_limits,
+)
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever parse output changes so cached parse results are invalidated
+PARSER_VERSION = "7"
 
-def parse_workflow(file_path: str, platform: str) -> ParsedWorkflow:
-    parser = etree.XMLParser(recover=True, remove_blank_text=True)
+
+# Infrastructure / Metadata elements to ignore
+UIPATH_IGNORED_TAGS = {
+    "AssemblyReference",
+    "TextExpression.NamespacesForImplementation",
+    "TextExpression.ReferencesForImplementation",
+    "WorkflowViewStateService.ViewState",
+    "VisualBasic.Settings",
+    "String",
+    "Boolean",
+    "Dictionary",
+    "Collection",
+    "sap2010:WorkflowViewState.IdRef",
+}
+
+# Structural containers that are not counted as activities
+UIPATH_CONTAINER_TAGS = {"Sequence", "Flowchart"}
+
+UIPATH_INVOKE_TAG = "InvokeWorkflowFile"
+
+# Elements that only carry the selectors of the activity they belong to
+UIPATH_SELECTOR_TARGET_TAGS = {"Target", "TargetAnchorable", "TargetApp"}
+UIPATH_SELECTOR_ATTRIBUTES = (
+    "Selector",
+    "FullSelectorArgument",
+    "FuzzySelectorArgument",
+    "ScopeSelectorArgument",
+)
+
+
+# Automation Anywhere: legacy .atmx elements (matched case-insensitively)
+# and the A360 JSON keys that nest commands
+AA_COMMAND_TAGS = {"command", "cmd"}
+AA_VARIABLE_TAGS = {"variable", "var"}
+AA_NESTED_NODE_KEYS = ("children", "branches")
+AA_BRANCH_TYPE = "Branch"
+
+_JSON_CHUNK_SIZE = 64 * 1024
+
+
+def clean_tag(tag) -> str:
+    tag_str = str(tag) if tag is not None else ""
+    return tag_str.split('}')[-1] if '}' in tag_str else tag_str
+
+
+def _is_uipath_metadata(tag_name: str) -> bool:
+    # Pure namespace / metadata nodes
+    return (
+        tag_name.startswith("TextExpression")
+        or tag_name.endswith("Reference")
+        or tag_name.endswith("ViewState")
+    )
+
+
+def _literal_workflow_path(value: str | None) -> str | None:
+    """
+    WorkflowFileName as a plain path: either a literal attribute value or
+    a VB expression that is a single string literal ("[""Sub.xaml""]").
+    Computed paths cannot be resolved statically and yield None.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.startswith("[") and value.endswith("]"):
+        inner = value[1:-1].strip()
+        if len(inner) >= 2 and inner[0] == inner[-1] == '"' and '"' not in inner[1:-1]:
+            return inner[1:-1] or None
+        return None
+    return value
+
+
+def _open_stream(file_path: str, tracker: LimitTracker) -> tuple[LimitedReader, etree.iterparse]:
+    """
+    (source, iterparse context) for file_path. The caller closes source
+    in a finally: a parse stopped by a limit or timeout never reaches EOF.
+    """
+    source = LimitedReader(open(file_path, "rb"), tracker)
+    # Entities are never expanded in text and nothing is fetched; the
+    # input is counted against the file size limit as it is read
+    context = etree.iterparse(
+        source,
+        events=("start", "end"),
+        recover=True,
+        remove_blank_text=True,
+        resolve_entities=False,
+        no_network=True,
+    )
+    return source, context
+
+
+def _walk(context, low_memory: bool, tracker: LimitTracker):
+    """
+    Yield (element, depth) for every element start, in document order.
+
+    Attributes are complete on the start event, which is all the parsers
+    below need. In low-memory mode every element is cleared once its end
+    tag is seen and finished siblings are detached from the parent, so the
+    live tree never grows beyond the current root-to-leaf path.
+
+    Node count, depth and element text are counted inline and handed to
+    the tracker every CHECK_INTERVAL elements, or at once when a limit is
+    crossed; every attribute value is checked against max_attribute_chars
+    on its start event.
+    """
+    limits = tracker.limits
+    max_depth = limits.max_depth
+    max_text_chars = limits.max_text_chars
+    max_attribute_chars = limits.max_attribute_chars
+    checkpoint = min(CHECK_INTERVAL, limits.max_nodes + 1)
+    nodes = 0
+    text_chars = 0
+
+    depth = -1
+    for event, el in context:
+        if event == "start":
+            depth += 1
+            nodes += 1
+            if nodes >= checkpoint or depth > max_depth:
+                tracker.update(nodes, depth, text_chars)
+                checkpoint = min(nodes + CHECK_INTERVAL, limits.max_nodes + 1)
+            values = el.values()
+            if values and max(map(len, values)) > max_attribute_chars:
+                raise ParseLimitExceeded("attribute size", max_attribute_chars)
+            yield el, depth
+            continue
+
+        text = el.text
+        if text:
+            text_chars += len(text)
+            if text_chars > max_text_chars:
+                tracker.update(nodes, depth, text_chars)
+
+        depth -= 1
+        if low_memory:
+            el.clear(keep_tail=True)
+            while el.getprevious() is not None:
+                del el.getparent()[0]
+
+
+def _log_parser_warnings(context, file_path: str):
+    if context.error_log:
+        logger.warning(f"XML parser warnings for {file_path}: {context.error_log}")
+
+
+def _parent_of(ancestors: list, depth: int) -> int:
+    """Index of the nearest recorded ancestor; pops entries that are no longer open."""
+    while ancestors and ancestors[-1][0] >= depth:
+        ancestors.pop()
+    return ancestors[-1][1] if ancestors else -1
+
+
+def _selector_owner(compact: CompactWorkflow, ancestors: list) -> int:
+    # Skip property elements such as Click.Target up to the activity itself
+    names = compact.type_names
+    type_ids = compact.type_ids
+    for _, index in reversed(ancestors):
+        if "." not in names[type_ids[index]]:
+            return index
+    return -1
+
+
+def _parse_uipath(file_path: str, limits: ParseLimits, low_memory: bool = False) -> ParsedWorkflow:
+    """
+    Single-pass UiPath parser.
+
+    Walks the document once with iterparse start/end events and tracks the
+    element depth with a counter, so activities, raw activities, variables
+    and nesting depth are all collected together in O(n) into a
+    CompactWorkflow.
+    """
+    tracker = limits.tracker()
+    source, context = _open_stream(file_path, tracker)
+
+    compact = CompactWorkflow("UiPath")
+    variables = compact.variables
+    type_index = compact.type_index
+    activity_types = compact.activity_types
+    ancestors = []
+    nesting_depth = 0
 
     try:
-        tree = etree.parse(file_path, parser)
-        root = tree.getroot()
+        for el, depth in _walk(context, low_memory, tracker):
+            tag_name = clean_tag(el.tag)
+            name = el.get("Name")
+
+            # Skip root and infrastructure tags; any named descendant of the
+            # root is still a raw variable, regardless of tag
+            if tag_name in UIPATH_IGNORED_TAGS:
+                if name and depth > 0:
+                    variables.append(VariableRecord(
+                        name, el.get("Default") or "", "defaultValue",
+                        listed=False, raw=True,
+                    ))
+                continue
+
+            if depth > nesting_depth:
+                nesting_depth = depth
 
-        if parser.error_log:
-            logger.warning(f"XML parser warnings for {file_path}: {parser.error_log}")
+            # Skip non-activity container nodes
+            if tag_name in UIPATH_CONTAINER_TAGS:
+                if name:
+                    variables.append(VariableRecord(
+                        name, el.get("Default") or "", "defaultValue",
+                        listed=True, raw=depth > 0,
+                    ))
+                continue
+
+            type_id = type_index.get(tag_name)
+            if type_id is None:
+                # Pure namespace / metadata nodes are raw activities but not activities
+                type_id = compact.intern_type(
+                    tag_name, is_activity=not _is_uipath_metadata(tag_name)
+                )
+
+            # Capture variables
+            if name:
+                listed = bool(activity_types[type_id])
+                if listed or depth > 0:
+                    variables.append(VariableRecord(
+                        name, el.get("Default") or "", "defaultValue",
+                        listed=listed, raw=depth > 0,
+                    ))
+
+            if tag_name == UIPATH_INVOKE_TAG:
+                target = _literal_workflow_path(el.get("WorkflowFileName"))
+                if target:
+                    compact.invoked_files.append(target)
+
+            parent = _parent_of(ancestors, depth)
+            index = compact.add_node(type_id, el.get("DisplayName") or tag_name, parent, depth)
+
+            # Markup extensions such as {x:Null} are not selectors
+            if tag_name in UIPATH_SELECTOR_TARGET_TAGS:
+                for attribute in UIPATH_SELECTOR_ATTRIBUTES:
+                    value = el.get(attribute)
+                    if value and value[0] != "{":
+                        compact.selectors.append((_selector_owner(compact, ancestors), attribute, value))
+            else:
+                value = el.get("Selector")
+                if value and value[0] != "{":
+                    compact.selectors.append((index, "Selector", value))
+
+            ancestors.append((depth, index))
 
     except Exception as e:
         logger.error(f"Failed to parse {file_path}: {str(e)}")
         raise
+    finally:
+        source.close()
 
-    # -----------------------------------
-    # UiPath Parsing (FIXED PROPERLY)
-    # -----------------------------------
-    if platform == "UiPath":
+    _log_parser_warnings(context, file_path)
 
-        def clean_tag(tag):
-            tag_str = str(tag) if tag is not None else ""
-            return tag_str.split('}')[-1] if '}' in tag_str else tag_str
-
-        # Infrastructure / Metadata elements to ignore
-        IGNORED_TAGS = {
-            "AssemblyReference",
-            "TextExpression.NamespacesForImplementation",
-            "TextExpression.ReferencesForImplementation",
-            "WorkflowViewStateService.ViewState",
-            "VisualBasic.Settings",
-            "String",
-            "Boolean",
-            "Dictionary",
-            "Collection",
-            "sap2010:WorkflowViewState.IdRef",
-        }
-
-        activities = []
-        variables = []
-
-        for el in root.iter():
-            tag_name = clean_tag(el.tag)
+    compact.nesting_depth = nesting_depth
+    return ParsedWorkflow.from_compact(
+        compact,
+        raw_tree=None if low_memory else context.root,
+    )
 
-            # Skip root and infrastructure tags
-            if tag_name in IGNORED_TAGS:
-                continue
 
-            # Skip pure namespace / metadata nodes
-            if (
-                tag_name.startswith("TextExpression")
-                or tag_name.endswith("Reference")
-                or tag_name.endswith("ViewState")
-            ):
+def _parse_blue_prism(file_path: str, limits: ParseLimits, low_memory: bool = False) -> ParsedWorkflow:
+    """
+    Single-pass Blue Prism parser.
+
+    Collects stages, actions, variables and the maximum element depth in
+    one walk instead of findall() per kind plus an ancestor:: XPath per
+    element.
+    """
+    tracker = limits.tracker()
+    source, context = _open_stream(file_path, tracker)
+
+    # Activities are display names; stages are listed before actions, as
+    # with findall(".//stage") + findall(".//action")
+    compact = CompactWorkflow(
+        "Blue Prism",
+        activity_from_label=True,
+        raw_type_order=("stage", "action"),
+    )
+    ancestors = []
+    nesting_depth = 0
+
+    try:
+        for el, depth in _walk(context, low_memory, tracker):
+            if depth == 0:
                 continue
+            if depth > nesting_depth:
+                nesting_depth = depth
+
+            # Exact tag match mirrors root.findall(".//stage") etc.
+            tag = el.tag
+            if tag == "stage" or tag == "action":
+                parent = _parent_of(ancestors, depth)
+                index = compact.add_node(
+                    compact.intern_type(tag), el.get("name") or tag, parent, depth
+                )
+                ancestors.append((depth, index))
+            elif tag == "variable":
+                name = el.get("name")
+                compact.variables.append(VariableRecord(
+                    name, el.get("type"), "type", listed=bool(name), raw=True,
+                ))
 
-            # Capture variables
-            if el.get("Name"):
-                variables.append(el.get("Name"))
+    except Exception as e:
+        logger.error(f"Failed to parse {file_path}: {str(e)}")
+        raise
+    finally:
+        source.close()
 
-            # Skip non-activity container nodes
-            if tag_name in {"Sequence", "Flowchart"}:
+    _log_parser_warnings(context, file_path)
+
+    compact.nesting_depth = nesting_depth
+    return ParsedWorkflow.from_compact(
+        compact,
+        raw_tree=None if low_memory else context.root,
+    )
+
+
+def _parse_generic(file_path: str, platform: str, limits: ParseLimits, low_memory: bool = False) -> ParsedWorkflow:
+    """Single-pass parser for platforms without a dedicated parser: every element is an activity."""
+    tracker = limits.tracker()
+    source, context = _open_stream(file_path, tracker)
+
+    compact = CompactWorkflow(platform, emit_raw_activities=False)
+    upper_named = []
+    lower_named = []
+    ancestors = []
+    nesting_depth = 0
+
+    try:
+        for el, depth in _walk(context, low_memory, tracker):
+            if depth == 0:
                 continue
+            if depth > nesting_depth:
+                nesting_depth = depth
+
+            parent = _parent_of(ancestors, depth)
+            index = compact.add_node(compact.intern_type(el.tag), None, parent, depth)
+            ancestors.append((depth, index))
+
+            # Elements carrying "Name" are listed before those carrying "name",
+            # matching findall(".//*[@Name]") + findall(".//*[@name]")
+            name = el.get("Name") or el.get("name")
+            if name:
+                if "Name" in el.attrib:
+                    upper_named.append(VariableRecord(name, None, "value", listed=True, raw=False))
+                if "name" in el.attrib:
+                    lower_named.append(VariableRecord(name, None, "value", listed=True, raw=False))
 
-            # Add as activity
-            activities.append(tag_name)
-
-        real_nodes = [
-            el for el in root.iter()
-            if clean_tag(el.tag) not in IGNORED_TAGS
-        ]
-
-        raw_activities = []
-        for el in real_nodes:
-            tag = clean_tag(el.tag)
-            if tag in {"Sequence", "Flowchart"}: continue
-            raw_activities.append({
-                "type": tag,
-                "displayName": el.get("DisplayName") or tag
-            })
-
-        raw_variables = []
-        for el in root.findall(".//*[@Name]"):
-            v_name = el.get("Name")
-            if v_name:
-                raw_variables.append({
-                    "name": v_name,
-                    "defaultValue": el.get("Default") or ""
-                })
-
-        nesting_depth = max(
-            (len([a for a in el.iterancestors()]) for el in real_nodes),
-            default=0
-        )
-
-    # -----------------------------------
-    # Blue Prism Parsing
-    # -----------------------------------
-    elif platform == "Blue Prism":
+    except Exception as e:
+        logger.error(f"Failed to parse {file_path}: {str(e)}")
+        raise
+    finally:
+        source.close()
 
-        activities_data = root.findall(".//stage") + root.findall(".//action")
-        activities = [
-            el.get("name") or el.tag
-            for el in activities_data
-        ]
-
-        raw_activities = []
-        for el in activities_data:
-            raw_activities.append({
-                "type": el.tag,
-                "displayName": el.get("name") or el.tag
-            })
-
-        variables_data = root.findall(".//variable")
-        variables = [
-            el.get("name")
-            for el in variables_data
-            if el.get("name")
-        ]
-
-        raw_variables = []
-        for el in variables_data:
-            raw_variables.append({
-                "name": el.get("name"),
-                "type": el.get("type")
-            })
-
-        nesting_depth = max(
-            (len(el.xpath("ancestor::*")) for el in root.findall(".//*")),
-            default=0
-        )
-
-    # -----------------------------------
-    # Generic XML Fallback
-    # -----------------------------------
-    else:
-        activities = [el.tag for el in root.findall(".//*")]
+    _log_parser_warnings(context, file_path)
 
-        variables = [
-            el.get("Name") or el.get("name")
-            for el in root.findall(".//*[@Name]") + root.findall(".//*[@name]")
-            if el.get("Name") or el.get("name")
-        ]
+    compact.variables = upper_named + lower_named
+    compact.nesting_depth = nesting_depth
+    return ParsedWorkflow.from_compact(
+        compact,
+        raw_tree=None if low_memory else context.root,
+    )
 
-        nesting_depth = max(
-            (len(el.xpath("ancestor::*")) for el in root.findall(".//*")),
-            default=0
-        )
+
+def _parse_automation_anywhere_xml(file_path: str, limits: ParseLimits, low_memory: bool = False) -> ParsedWorkflow:
+    """
+    Single-pass parser for legacy Automation Anywhere .atmx tasks.
+
+    Every Command element is an activity named by its Name attribute;
+    nesting depth counts nested commands (If / Loop blocks), not elements.
+    """
+    tracker = limits.tracker()
+    source, context = _open_stream(file_path, tracker)
+
+    compact = CompactWorkflow("Automation Anywhere")
+    ancestors = []
+    nesting_depth = 0
+
+    try:
+        for el, depth in _walk(context, low_memory, tracker):
+            tag_name = clean_tag(el.tag)
+            kind = tag_name.lower()
+
+            if kind in AA_COMMAND_TAGS:
+                command = el.get("Name") or el.get("name") or el.get("Type") or tag_name
+                parent = _parent_of(ancestors, depth)
+                level = len(ancestors) + 1
+                if level > nesting_depth:
+                    nesting_depth = level
+                index = compact.add_node(
+                    compact.intern_type(command),
+                    el.get("Description") or el.get("Comment") or command,
+                    parent,
+                    level,
+                )
+                ancestors.append((depth, index))
+            elif kind in AA_VARIABLE_TAGS:
+                name = el.get("Name") or el.get("name")
+                if name:
+                    compact.variables.append(VariableRecord(
+                        name, el.get("Type") or el.get("type"), "type", listed=True, raw=True,
+                    ))
+
+    except Exception as e:
+        logger.error(f"Failed to parse {file_path}: {str(e)}")
+        raise
+    finally:
+        source.close()
+
+    _log_parser_warnings(context, file_path)
+
+    compact.nesting_depth = nesting_depth
+    return ParsedWorkflow.from_compact(
+        compact,
+        raw_tree=None if low_memory else context.root,
+    )
+
+
+def _parse_automation_anywhere_json(file_path: str, limits: ParseLimits) -> ParsedWorkflow:
+    """
+    Streaming parser for Automation Anywhere A360 JSON bot exports.
+
+    Consumes ijson events, so only the chain of currently open command
+    nodes is held; commands are recorded in document order as they open
+    and typed as "<packageName>.<commandName>" once their keys are seen.
+    Nodes nest through "children" and "branches". Every JSON object and
+    array counts as a node against the parse limits.
+    """
+    tracker = limits.tracker()
+    json_depth = 0
+    compact = CompactWorkflow("Automation Anywhere")
+    branch_type = compact.intern_type(AA_BRANCH_TYPE, is_activity=False)
+    # [prefix, node index, packageName key, commandName key, packageName,
+    #  commandName, prefixes of nested nodes]
+    open_nodes = []
+    variable = None
+    nesting_depth = 0
+
+    with open(file_path, "rb") as f:
+        events = ijson.parse(LimitedReader(f, tracker), buf_size=_JSON_CHUNK_SIZE)
+
+        try:
+            for prefix, event, value in events:
+                if event == "start_map" or event == "start_array":
+                    tracker.element(json_depth)
+                    json_depth += 1
+                elif event == "end_map" or event == "end_array":
+                    json_depth -= 1
+                elif event == "string" or event == "map_key":
+                    tracker.text(value)
+
+                if event == "start_map":
+                    if open_nodes:
+                        is_node = prefix in open_nodes[-1][6]
+                    else:
+                        is_node = prefix == "nodes.item"
+
+                    if is_node:
+                        level = len(open_nodes) + 1
+                        if level > nesting_depth:
+                            nesting_depth = level
+                        parent = open_nodes[-1][1] if open_nodes else -1
+                        index = compact.add_node(branch_type, None, parent, level)
+                        open_nodes.append([
+                            prefix, index, f"{prefix}.packageName", f"{prefix}.commandName", None, None,
+                            {f"{prefix}.{key}.item" for key in AA_NESTED_NODE_KEYS},
+                        ])
+                    elif prefix == "variables.item":
+                        variable = {}
+
+                elif event == "end_map":
+                    if open_nodes and prefix == open_nodes[-1][0]:
+                        _, index, _, _, package, command, _ = open_nodes.pop()
+                        if command:
+                            type_name = f"{package}.{command}" if package else command
+                            compact.type_ids[index] = compact.intern_type(type_name)
+                    elif variable is not None and prefix == "variables.item":
+                        if variable.get("name"):
+                            compact.variables.append(VariableRecord(
+                                variable["name"], variable.get("type"), "type", listed=True, raw=True,
+                            ))
+                        variable = None
+
+                elif event == "string":
+                    if open_nodes:
+                        node = open_nodes[-1]
+                        if prefix == node[3]:
+                            node[5] = value
+                        elif prefix == node[2]:
+                            node[4] = value
+                    if variable is not None and (prefix == "variables.item.name" or prefix == "variables.item.type"):
+                        variable[prefix[15:]] = value
+
+        except Exception as e:
+            logger.error(f"Failed to parse {file_path}: {str(e)}")
+            raise
+
+    compact.nesting_depth = nesting_depth
+    return ParsedWorkflow.from_compact(compact)
+
+
+def _is_json_file(file_path: str) -> bool:
+    with open(file_path, "rb") as f:
+        head = f.read(512)
+    return head.lstrip(b"\xef\xbb\xbf \t\r\n").startswith((b"{", b"["))
+
+
+def _use_low_memory(file_path: str) -> bool:
+    threshold = settings.parse_streaming_threshold_mb * 1024 * 1024
+    try:
+        return os.path.getsize(file_path) >= threshold
+    except OSError:
+        return False
+
+
+def parse_workflow(
+    file_path: str,
+    platform: str,
+    low_memory: bool | None = None,
+    limits: ParseLimits | None = None,
+) -> ParsedWorkflow:
+    """
+    Parse a workflow file into a ParsedWorkflow.
+
+    low_memory selects the bounded-memory streaming mode, which clears
+    elements as soon as they are processed and never keeps raw_tree.
+    When left as None it is enabled automatically for files at or above
+    settings.parse_streaming_threshold_mb.
+
+    limits caps node count, depth, text size and parse time; they are
+    checked as the document streams in and ParseLimitExceeded is raised
+    at the first element over a limit. Defaults to the service-wide
+    limits.
+    """
+    if low_memory is None:
+        low_memory = _use_low_memory(file_path)
+    if limits is None:
+        limits = default_parse_limits()
+
+    if platform == "UiPath":
+        parsed = _parse_uipath(file_path, limits, low_memory=low_memory)
+    elif platform == "Blue Prism":
+        parsed = _parse_blue_prism(file_path, limits, low_memory=low_memory)
+    elif platform == "Automation Anywhere":
+        if _is_json_file(file_path):
+            parsed = _parse_automation_anywhere_json(file_path, limits)
+        else:
+            parsed = _parse_automation_anywhere_xml(file_path, limits, low_memory=low_memory)
+    else:
+        parsed = _parse_generic(file_path, platform, limits, low_memory=low_memory)
 
     logger.info(
         f"Parsed {platform} workflow: "
-        f"{len(activities)} activities, "
-        f"{len(variables)} variables, "
-        f"depth {nesting_depth}"
+        f"{len(parsed.activities)} activities, "
+        f"{len(parsed.variables)} variables, "
+        f"depth {parsed.nesting_depth}"
+        f"{' (low-memory mode)' if low_memory else ''}"
     )
 
-    return ParsedWorkflow(
-        platform=platform,
-        activities=activities,
-        variables=variables,
-        nesting_depth=nesting_depth,
-        raw_activities=raw_activities if 'raw_activities' in locals() else [],
-        raw_variables=raw_variables if 'raw_variables' in locals() else [],
-        raw_tree=root,
-    )
+    return parsed
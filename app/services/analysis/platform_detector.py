@@ -0,0 +1,99 @@
+import logging
+from pathlib import Path
+
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+# The root element and its namespace declarations are always in the
+# first few KB, so nothing past this is ever read
+SNIFF_BYTES = 8 * 1024
+
+UIPATH_NAMESPACE_MARKERS = ("schemas.uipath.com",)
+XAML_ACTIVITIES_NAMESPACE = "http://schemas.microsoft.com/netfx/2009/xaml/activities"
+BLUE_PRISM_NAMESPACE_MARKERS = ("blueprism.co.uk",)
+BLUE_PRISM_ROOT_TAGS = {"release", "process", "object"}
+AUTOMATION_ANYWHERE_NAMESPACE_MARKERS = ("automationanywhere",)
+AUTOMATION_ANYWHERE_JSON_KEYS = ('"nodes"', '"packages"', '"triggers"')
+
+# Only consulted when the content itself is inconclusive
+EXTENSION_PLATFORMS = {
+    ".xaml": "UiPath",
+    ".bprelease": "Blue Prism",
+    ".bpprocess": "Blue Prism",
+    ".bpobject": "Blue Prism",
+    ".atmx": "Automation Anywhere",
+}
+
+
+def _sniff_xml_root(head: bytes) -> tuple[str | None, list[str]]:
+    """Local name of the root element and every namespace declared up to it."""
+    parser = etree.XMLPullParser(
+        events=("start-ns", "start"),
+        recover=True,
+        resolve_entities=False,
+        no_network=True,
+    )
+    namespaces = []
+    try:
+        parser.feed(head)
+        for event, value in parser.read_events():
+            if event == "start-ns":
+                namespaces.append(value[1])
+                continue
+            tag = value.tag
+            if isinstance(tag, str):
+                return tag.rsplit("}", 1)[-1], namespaces
+    except etree.LxmlError:
+        pass
+    return None, namespaces
+
+
+def detect_platform_from_bytes(head: bytes, file_name: str | None = None) -> str:
+    """
+    Platform of a workflow judged from its first bytes: the root element,
+    its namespaces and, for JSON exports, the top-level keys. Falls back
+    to the file extension, then to "Unknown".
+    """
+    text = head.lstrip(b"\xef\xbb\xbf \t\r\n")
+
+    if text.startswith(b"{"):
+        snippet = text.decode("utf-8", errors="ignore")
+        if any(key in snippet for key in AUTOMATION_ANYWHERE_JSON_KEYS):
+            return "Automation Anywhere"
+
+    elif text.startswith(b"<"):
+        root, namespaces = _sniff_xml_root(text)
+        if any(marker in ns for ns in namespaces for marker in UIPATH_NAMESPACE_MARKERS):
+            return "UiPath"
+        if root == "Activity" and XAML_ACTIVITIES_NAMESPACE in namespaces:
+            return "UiPath"
+        if root in BLUE_PRISM_ROOT_TAGS or any(
+            marker in ns for ns in namespaces for marker in BLUE_PRISM_NAMESPACE_MARKERS
+        ):
+            return "Blue Prism"
+        if any(marker in ns for ns in namespaces for marker in AUTOMATION_ANYWHERE_NAMESPACE_MARKERS):
+            return "Automation Anywhere"
+
+    if file_name:
+        return EXTENSION_PLATFORMS.get(Path(file_name).suffix.lower(), "Unknown")
+    return "Unknown"
+
+
+def detect_platform(source, file_name: str | None = None) -> str:
+    """
+    Sniff the platform from a path or a seekable binary file object; the
+    file object is rewound to where it was.
+    """
+    if isinstance(source, (str, Path)):
+        with open(source, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+        file_name = file_name or str(source)
+    else:
+        position = source.tell()
+        head = source.read(SNIFF_BYTES)
+        source.seek(position)
+
+    platform = detect_platform_from_bytes(head, file_name)
+    logger.info(f"Detected platform {platform} for {file_name or 'upload'}")
+    return platform
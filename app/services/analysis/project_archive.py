@@ -0,0 +1,164 @@
+import json
+import hashlib
+import logging
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+
+from app.core.config import settings
+from app.services.analysis.parse_limits import LimitedReader, ParseLimitExceeded, ParseLimits
+from app.services.analysis.upload_store import UploadStore
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ARCHIVE_EXTENSIONS = {".zip", ".nupkg"}
+
+_CHUNK_SIZE = 1024 * 1024
+_MB = 1024 * 1024
+
+
+@dataclass
+class ArchiveWorkflow:
+    relative_path: str  # path inside the project, e.g. "Framework/InitAllSettings.xaml"
+    file_path: str      # the workflow's blob in the upload store
+    file_size: int
+    content_hash: str
+
+
+@dataclass
+class ProjectArchive:
+    name: str
+    description: str | None
+    main: str | None
+    manifest: dict
+    members: list[tuple[str, zipfile.ZipInfo]] = field(default_factory=list)  # (relative path, entry) of each .xaml
+    workflows: list[ArchiveWorkflow] = field(default_factory=list)
+
+
+def copy_and_hash(source, destination: Path, limits: ParseLimits | None = None) -> tuple[int, str]:
+    """
+    Stream a file object to disk in chunks; returns (size, sha256).
+
+    With limits, the copy stops with ParseLimitExceeded once it passes
+    max_file_bytes.
+    """
+    if limits is not None:
+        source = LimitedReader(source, limits.tracker())
+    digest = hashlib.sha256()
+    size = 0
+    with open(destination, "wb") as out:
+        for chunk in iter(lambda: source.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+            out.write(chunk)
+    return size, digest.hexdigest()
+
+
+def _safe_member_path(name: str) -> PurePosixPath | None:
+    # Reject absolute paths and parent references (zip slip)
+    path = PurePosixPath(name.replace("\\", "/"))
+    if path.is_absolute() or ".." in path.parts or not path.parts:
+        return None
+    return path
+
+
+def _find_project_root(names: list[PurePosixPath]) -> PurePosixPath | None:
+    # .nupkg packages keep the project under lib/<framework>/; a plain zip
+    # may wrap it in a top-level folder. The shallowest project.json wins.
+    manifests = [p for p in names if p.name.lower() == "project.json"]
+    if not manifests:
+        return None
+    return min(manifests, key=lambda p: len(p.parts)).parent
+
+
+def inspect_project_archive(archive_path: str) -> ProjectArchive:
+    """
+    Read the central directory and project.json of a UiPath project
+    archive (.zip / .nupkg) without extracting any workflow.
+
+    Raises zipfile.BadZipFile for non-archives, ValueError when the archive
+    contains no workflows and ParseLimitExceeded when it has more entries,
+    or declares more uncompressed bytes, than the project_archive_* settings
+    allow. The returned project lists its .xaml members, so callers can
+    check quota before extract_project_workflows stores anything.
+    """
+    with zipfile.ZipFile(archive_path) as archive:
+        infos = archive.infolist()
+        if len(infos) > settings.project_archive_max_entries:
+            raise ParseLimitExceeded("archive entry count", settings.project_archive_max_entries)
+        # Declared sizes only; extraction is still held to the parse limits
+        # per entry, in case the central directory lies
+        max_uncompressed = settings.project_archive_max_uncompressed_mb * _MB
+        if sum(info.file_size for info in infos) > max_uncompressed:
+            raise ParseLimitExceeded("archive uncompressed size (bytes)", max_uncompressed)
+
+        members = []
+        for info in infos:
+            if info.is_dir():
+                continue
+            path = _safe_member_path(info.filename)
+            if path is None:
+                logger.warning(f"Skipping unsafe archive entry {info.filename!r} in {archive_path}")
+                continue
+            members.append((path, info))
+
+        root = _find_project_root([path for path, _ in members])
+
+        manifest = {}
+        if root is not None:
+            try:
+                manifest = json.loads(archive.read(str(root / "project.json")).decode("utf-8-sig"))
+            except (KeyError, ValueError) as e:
+                logger.warning(f"Unreadable project.json in {archive_path}: {e}")
+
+    project = ProjectArchive(
+        name=manifest.get("name") or Path(archive_path).stem,
+        description=manifest.get("description"),
+        main=manifest.get("main"),
+        manifest=manifest,
+    )
+
+    for path, info in members:
+        if path.suffix.lower() != ".xaml":
+            continue
+        if root is not None and root.parts and path.parts[:len(root.parts)] != root.parts:
+            continue
+        relative = path.relative_to(root) if root is not None else path
+        project.members.append((str(relative), info))
+
+    if not project.members:
+        raise ValueError("Archive does not contain any .xaml workflows")
+    return project
+
+
+def extract_project_workflows(
+    archive_path: str,
+    project: ProjectArchive,
+    store: UploadStore,
+    limits: ParseLimits | None = None,
+) -> ProjectArchive:
+    """
+    Extract the .xaml members found by inspect_project_archive.
+
+    Each entry is streamed into the upload store in canonical form and
+    hashed on the way, so neither the archive nor any single entry is ever
+    held in memory, and workflows already in the store are not written
+    again. Raises ParseLimitExceeded when an entry is over the parse limits.
+    """
+    with zipfile.ZipFile(archive_path) as archive:
+        for relative, info in project.members:
+            with archive.open(info) as source:
+                stored = store.save(source, "UiPath", limits, relative)
+
+            project.workflows.append(ArchiveWorkflow(
+                relative_path=relative,
+                file_path=str(stored.path),
+                file_size=stored.size,
+                content_hash=stored.content_hash,
+            ))
+
+    logger.info(
+        f"Extracted project {project.name!r}: {len(project.workflows)} workflows from {archive_path}"
+    )
+    return project
+
@@ -0,0 +1,109 @@
+import re
+import hashlib
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+
+from lxml import etree
+
+from app.services.analysis.parse_limits import LimitedReader, ParseLimits, default_parse_limits
+
+logger = logging.getLogger(__name__)
+
+RELEASE_ROOT_TAG = "release"
+RELEASE_UNIT_TAGS = {"process": ".bpprocess", "object": ".bpobject"}
+
+_UNSAFE_NAME = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+@dataclass
+class ReleaseUnit:
+    name: str           # the process / business object name from the release
+    kind: str           # "process" or "object"
+    file_path: str      # the unit's own document on disk
+    file_size: int
+    content_hash: str
+
+
+def _local_name(tag) -> str | None:
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else None
+
+
+def _write_unit(el, index: int, dest_dir: Path) -> ReleaseUnit:
+    kind = _local_name(el.tag)
+    name = el.get("name") or f"{kind} {index + 1}"
+    slug = _UNSAFE_NAME.sub("_", name).strip("_")[:80] or kind
+    target = dest_dir / f"{index:03d}_{slug}{RELEASE_UNIT_TAGS[kind]}"
+
+    data = etree.tostring(el, encoding="utf-8", xml_declaration=True, with_tail=False)
+    target.write_bytes(data)
+    return ReleaseUnit(
+        name=name,
+        kind=kind,
+        file_path=str(target),
+        file_size=len(data),
+        content_hash=hashlib.sha256(data).hexdigest(),
+    )
+
+
+def split_blue_prism_release(
+    file_path: str,
+    dest_dir: Path,
+    limits: ParseLimits | None = None,
+) -> list[ReleaseUnit]:
+    """
+    Split a .bprelease into one document per top-level <process> / <object>.
+
+    The release is read in a single streaming pass; each unit is written
+    to dest_dir as soon as its end tag is seen and is then released, so
+    memory is bounded by the largest unit rather than the release. Units
+    keep their namespace declarations, so each parses exactly like the
+    same subtree inside the release. Returns [] when the document is not
+    a release (a single exported process or object). The whole release is
+    held to the parse limits while it is read.
+    """
+    tracker = (limits or default_parse_limits()).tracker()
+    with open(file_path, "rb") as f:
+        context = etree.iterparse(
+            LimitedReader(f, tracker),
+            events=("start", "end"),
+            recover=True,
+            remove_blank_text=True,
+            resolve_entities=False,
+            no_network=True,
+            huge_tree=True,
+        )
+
+        units = []
+        depth = -1
+        unit_depth = None
+
+        for event, el in context:
+            if event == "start":
+                depth += 1
+                tracker.element(depth)
+                if depth == 0 and _local_name(el.tag) != RELEASE_ROOT_TAG:
+                    return []
+                if unit_depth is None and _local_name(el.tag) in RELEASE_UNIT_TAGS:
+                    unit_depth = depth
+                continue
+
+            tracker.text(el.text)
+            if depth == unit_depth:
+                if not units:
+                    dest_dir.mkdir(parents=True, exist_ok=True)
+                units.append(_write_unit(el, len(units), dest_dir))
+                unit_depth = None
+            depth -= 1
+
+            # Everything finished outside an open unit is no longer needed
+            if unit_depth is None:
+                el.clear(keep_tail=True)
+                while el.getprevious() is not None:
+                    del el.getparent()[0]
+
+    if context.error_log:
+        logger.warning(f"XML parser warnings while splitting {file_path}: {context.error_log}")
+
+    logger.info(f"Split release {file_path} into {len(units)} processes/objects")
+    return units
@@ -0,0 +1,61 @@
+import logging
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.domain.analysis_contracts import WorkflowAnalysis
+from app.models.analysis_result_cache import AnalysisResultCache
+from app.services.analysis.activity_mappings import MAPPINGS_VERSION
+from app.services.analysis.parser import PARSER_VERSION
+from app.services.code_review.code_review_service import RULESET_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever metrics, complexity scoring or the selector index change
+# so cached analysis results are invalidated
+SCORING_VERSION = "1"
+
+# Every versioned input of a cached result; when any of them changes,
+# entries written by the previous analyzer are no longer read
+ANALYZER_VERSION = f"p{PARSER_VERSION}.r{RULESET_VERSION}.m{MAPPINGS_VERSION}.s{SCORING_VERSION}"
+
+
+def _lookup_modes(mode: str) -> tuple[str, ...]:
+    # A full analysis can answer a metrics request; never the other way round
+    return ("full",) if mode == "full" else ("metrics", "full")
+
+
+def get_cached_analysis(db: Session, content_hash: str, platform: str, mode: str) -> WorkflowAnalysis | None:
+    rows = dict(
+        db.query(AnalysisResultCache.mode, AnalysisResultCache.result)
+        .filter(
+            AnalysisResultCache.content_hash == content_hash,
+            AnalysisResultCache.platform == platform,
+            AnalysisResultCache.mode.in_(_lookup_modes(mode)),
+            AnalysisResultCache.analyzer_version == ANALYZER_VERSION,
+        )
+        .all()
+    )
+    state = rows.get(mode) or rows.get("full")
+    return WorkflowAnalysis.from_state(state) if state else None
+
+
+def store_analysis(db: Session, content_hash: str, platform: str, mode: str, analysis: WorkflowAnalysis):
+    """
+    Add an analysis to the shared cache inside the caller's transaction;
+    a concurrent upload of the same content that got there first wins.
+    Entries of other analyzer versions are left alone: during a rolling
+    deploy both versions are live, and old entries are removed by a
+    cleanup job rather than on the request path.
+    """
+    db.execute(
+        insert(AnalysisResultCache)
+        .values(
+            content_hash=content_hash,
+            platform=platform,
+            mode=mode,
+            analyzer_version=ANALYZER_VERSION,
+            result=analysis.to_state(),
+        )
+        .on_conflict_do_nothing()
+    )
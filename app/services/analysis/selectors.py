@@ -0,0 +1,97 @@
+import re
+import logging
+from collections import Counter
+
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+# Selectors are fragments like <wnd app='x.exe' /><ctrl name='OK' />; they
+# are wrapped in a <selector> root and queried with precompiled XPath
+_SELECTOR_PARSER = etree.XMLParser(recover=True, resolve_entities=False, no_network=True)
+_SELECTOR_NODES = etree.XPath("/selector/*")
+_HAS_IDX = etree.XPath("boolean(/selector/*[@idx])")
+_HAS_WILDCARD = etree.XPath("boolean(/selector/*/@*[contains(., '*') or contains(., '?')])")
+
+# String literals inside a VB expression ("" is an escaped quote)
+_VB_STRING = re.compile(r'"((?:[^"]|"")*)"')
+
+DYNAMIC_PLACEHOLDER = "{{expr}}"
+
+
+def _selector_text(value: str) -> tuple[str, bool]:
+    """
+    Selector markup and whether it is built at runtime. For VB expressions
+    the string literals are kept and the computed parts are replaced by a
+    placeholder, so the static structure can still be inspected.
+    """
+    value = value.strip()
+    if not (value.startswith("[") and value.endswith("]")):
+        return value, "{{" in value
+
+    inner = value[1:-1].strip()
+    parts = []
+    position = 0
+    for match in _VB_STRING.finditer(inner):
+        if inner[position:match.start()].strip(" +&_\r\n\t"):
+            parts.append(DYNAMIC_PLACEHOLDER)
+        parts.append(match.group(1).replace('""', '"'))
+        position = match.end()
+    if inner[position:].strip(" +&_\r\n\t"):
+        parts.append(DYNAMIC_PLACEHOLDER)
+
+    text = "".join(parts)
+    dynamic = DYNAMIC_PLACEHOLDER in text or "{{" in text or not parts
+    return text, dynamic
+
+
+def parse_selector(value: str) -> dict:
+    """Tokenize one selector into its nodes plus idx / wildcard / dynamic flags."""
+    text, dynamic = _selector_text(value)
+    try:
+        root = etree.fromstring(f"<selector>{text}</selector>", _SELECTOR_PARSER)
+    except etree.XMLSyntaxError:
+        root = None
+
+    if root is None:
+        return {"nodes": [], "tags": [], "usesIdx": False, "usesWildcards": False, "dynamic": dynamic}
+
+    nodes = [
+        {"tag": node.tag, "attributes": dict(node.attrib)}
+        for node in _SELECTOR_NODES(root)
+        if isinstance(node.tag, str)
+    ]
+    return {
+        "nodes": nodes,
+        "tags": [node["tag"] for node in nodes],
+        "usesIdx": _HAS_IDX(root),
+        "usesWildcards": _HAS_WILDCARD(root),
+        "dynamic": dynamic,
+    }
+
+
+def build_selector_index(parsed) -> list[dict]:
+    """Structured selector index of a ParsedWorkflow, in the JSON shape stored on Workflow."""
+    index = []
+    for activity_type, display_name, attribute, value in parsed.selector_entries():
+        entry = {
+            "activityType": activity_type,
+            "activity": display_name,
+            "attribute": attribute,
+            "selector": value,
+        }
+        entry.update(parse_selector(value))
+        index.append(entry)
+    return index
+
+
+def summarize_selector_index(selector_index: list[dict]) -> dict:
+    """Counts over a stored selector index, as shown on the workflow detail."""
+    return {
+        "total": len(selector_index),
+        "usesIdx": sum(1 for entry in selector_index if entry.get("usesIdx")),
+        "usesWildcards": sum(1 for entry in selector_index if entry.get("usesWildcards")),
+        "dynamic": sum(1 for entry in selector_index if entry.get("dynamic")),
+        # The top-level tag tells the UI technology (wnd, html, java, sap ...)
+        "rootTags": dict(Counter(entry["tags"][0] for entry in selector_index if entry.get("tags"))),
+    }
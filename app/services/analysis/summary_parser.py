@@ -0,0 +1,241 @@
+from collections import Counter
+import logging
+
+from lxml import etree
+
+from app.domain.analysis_contracts import WorkflowSummary
+from app.services.analysis.parse_limits import (
+    CHECK_INTERVAL,
+    LimitTracker,
+    ParseLimitExceeded,
+    ParseLimits,
+    default_parse_limits,
+)
+from app.services.analysis.parser import (
+    UIPATH_IGNORED_TAGS,
+    UIPATH_CONTAINER_TAGS,
+    clean_tag,
+    parse_workflow,
+    _is_uipath_metadata,
+)
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class _LimitedTarget:
+    """
+    Node and depth accounting shared by the targets below; the tracker is
+    consulted every CHECK_INTERVAL elements or as soon as the depth limit
+    is crossed. Text is bounded by the bytes fed; each attribute value is
+    checked against max_attribute_chars on its start event.
+    """
+
+    def __init__(self, tracker: LimitTracker):
+        self.tracker = tracker
+        self.nodes = 0
+        self.max_depth = tracker.limits.max_depth
+        self.max_attribute_chars = tracker.limits.max_attribute_chars
+        self.checkpoint = min(CHECK_INTERVAL, tracker.limits.max_nodes + 1)
+
+    def _check_attributes(self, attrib):
+        if attrib and max(map(len, attrib.values())) > self.max_attribute_chars:
+            raise ParseLimitExceeded("attribute size", self.max_attribute_chars)
+
+    def _check_limits(self):
+        tracker = self.tracker
+        tracker.update(self.nodes, self.depth, tracker.text_chars)
+        self.checkpoint = min(self.nodes + CHECK_INTERVAL, tracker.limits.max_nodes + 1)
+
+
+class _UiPathTarget(_LimitedTarget):
+    """Parser target mirroring _parse_uipath(), keeping only counts."""
+
+    def __init__(self, tracker: LimitTracker):
+        super().__init__(tracker)
+        self.depth = -1
+        self.nesting_depth = 0
+        self.counts = Counter()
+        self.variable_count = 0
+        # clean_tag + classification per distinct raw tag:
+        # None = ignored, False = container / metadata, True = activity
+        self._kinds = {}
+
+    def _classify(self, tag):
+        tag_name = clean_tag(tag)
+        if tag_name in UIPATH_IGNORED_TAGS:
+            kind = None
+        elif tag_name in UIPATH_CONTAINER_TAGS or _is_uipath_metadata(tag_name):
+            kind = False
+        else:
+            kind = True
+        self._kinds[tag] = (tag_name, kind)
+        return tag_name, kind
+
+    def start(self, tag, attrib):
+        self.depth += 1
+        self.nodes += 1
+        if self.nodes >= self.checkpoint or self.depth > self.max_depth:
+            self._check_limits()
+        self._check_attributes(attrib)
+        entry = self._kinds.get(tag)
+        tag_name, kind = entry if entry is not None else self._classify(tag)
+        if kind is None:
+            return
+
+        if self.depth > self.nesting_depth:
+            self.nesting_depth = self.depth
+
+        if kind:
+            self.counts[tag_name] += 1
+            if attrib.get("Name"):
+                self.variable_count += 1
+        elif tag_name in UIPATH_CONTAINER_TAGS and attrib.get("Name"):
+            self.variable_count += 1
+
+    def end(self, tag):
+        self.depth -= 1
+
+    def close(self):
+        return dict(self.counts)
+
+
+class _BluePrismTarget(_LimitedTarget):
+    """Parser target mirroring _parse_blue_prism(), keeping only counts."""
+
+    def __init__(self, tracker: LimitTracker):
+        super().__init__(tracker)
+        self.depth = -1
+        self.nesting_depth = 0
+        self.stages = Counter()
+        self.actions = Counter()
+        self.variable_count = 0
+
+    def start(self, tag, attrib):
+        self.depth += 1
+        self.nodes += 1
+        if self.nodes >= self.checkpoint or self.depth > self.max_depth:
+            self._check_limits()
+        self._check_attributes(attrib)
+        if self.depth == 0:
+            return
+        if self.depth > self.nesting_depth:
+            self.nesting_depth = self.depth
+
+        if tag == "stage":
+            self.stages[attrib.get("name") or tag] += 1
+        elif tag == "action":
+            self.actions[attrib.get("name") or tag] += 1
+        elif tag == "variable" and attrib.get("name"):
+            self.variable_count += 1
+
+    def end(self, tag):
+        self.depth -= 1
+
+    def close(self):
+        # Stages are reported before actions
+        counts = dict(self.stages)
+        for name, count in self.actions.items():
+            counts[name] = counts.get(name, 0) + count
+        return counts
+
+
+class _GenericTarget(_LimitedTarget):
+    """Parser target mirroring _parse_generic(), keeping only counts."""
+
+    def __init__(self, tracker: LimitTracker):
+        super().__init__(tracker)
+        self.depth = -1
+        self.nesting_depth = 0
+        self.counts = Counter()
+        self.variable_count = 0
+
+    def start(self, tag, attrib):
+        self.depth += 1
+        self.nodes += 1
+        if self.nodes >= self.checkpoint or self.depth > self.max_depth:
+            self._check_limits()
+        self._check_attributes(attrib)
+        if self.depth == 0:
+            return
+        if self.depth > self.nesting_depth:
+            self.nesting_depth = self.depth
+
+        self.counts[tag] += 1
+        if attrib.get("Name") or attrib.get("name"):
+            # Listed once per attribute present, like the [@Name] + [@name] lists
+            self.variable_count += ("Name" in attrib) + ("name" in attrib)
+
+    def end(self, tag):
+        self.depth -= 1
+
+    def close(self):
+        return dict(self.counts)
+
+
+def parse_workflow_summary(
+    file_path: str,
+    platform: str,
+    limits: ParseLimits | None = None,
+) -> WorkflowSummary:
+    """
+    Metrics-only parse.
+
+    Feeds the file through an lxml parser target, so no element tree (or
+    per-node Python objects) is ever built. The result carries exactly
+    what calculate_metrics() needs and matches the numbers of a full
+    parse_workflow() for the same file. limits are enforced as in
+    parse_workflow().
+    """
+    if limits is None:
+        limits = default_parse_limits()
+
+    if platform == "Automation Anywhere":
+        # The streaming AA parsers never build a tree already
+        parsed = parse_workflow(file_path, platform, low_memory=True, limits=limits)
+        return WorkflowSummary(
+            platform=platform,
+            activity_totals=parsed.activity_counts(),
+            variable_count=len(parsed.variables),
+            nesting_depth=parsed.nesting_depth,
+        )
+
+    tracker = limits.tracker()
+    if platform == "UiPath":
+        target = _UiPathTarget(tracker)
+    elif platform == "Blue Prism":
+        target = _BluePrismTarget(tracker)
+    else:
+        target = _GenericTarget(tracker)
+
+    parser = etree.XMLParser(target=target, recover=True, resolve_entities=False, no_network=True)
+
+    try:
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+                tracker.read(len(chunk))
+                parser.feed(chunk)
+        activity_counts = parser.close()
+    except Exception as e:
+        logger.error(f"Failed to parse {file_path}: {str(e)}")
+        raise
+
+    if parser.error_log:
+        logger.warning(f"XML parser warnings for {file_path}: {parser.error_log}")
+
+    summary = WorkflowSummary(
+        platform=platform,
+        activity_totals=activity_counts,
+        variable_count=target.variable_count,
+        nesting_depth=target.nesting_depth,
+    )
+
+    logger.info(
+        f"Summarized {platform} workflow: "
+        f"{summary.activity_count} activities, "
+        f"{summary.variable_count} variables, "
+        f"depth {summary.nesting_depth}"
+    )
+
+    return summary
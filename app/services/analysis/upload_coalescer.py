@@ -0,0 +1,162 @@
+import time
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+
+from app.core.config import settings
+from app.core.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = "upload-flight"
+_POLL_SECONDS = 0.25
+
+
+class UploadCoalescer:
+    """
+    Single-flight for uploads of the same content.
+
+    The first request for a key leads: it runs the analysis while later
+    requests for the key wait. Requests in the same process wait on the
+    leader's Future; on other nodes they see the leader's Redis lock and
+    poll until it is released. A follower then re-reads the caches, which
+    the leader has committed by the time it lets go, instead of parsing
+    and reviewing the file again.
+
+    A waiting follower holds a worker thread, so at most max_followers
+    requests wait per key in one process; the rest analyze on their own.
+    Without Redis only requests within one process are coalesced.
+    """
+
+    def __init__(
+        self,
+        redis,
+        lock_seconds: float,
+        wait_seconds: float,
+        enabled: bool = True,
+        max_followers: int = 4,
+    ):
+        self.enabled = enabled
+        self.redis = redis
+        self.lock_seconds = lock_seconds
+        self.wait_seconds = wait_seconds
+        self.max_followers = max_followers
+        self._flights: dict[str, Future] = {}
+        self._followers: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced_local = 0
+        self.coalesced_remote = 0
+        self.wait_timeouts = 0
+        self.followers_over_cap = 0
+
+    @staticmethod
+    def key(content_hash: str, platform: str, mode: str) -> str:
+        return f"{_KEY_PREFIX}:{content_hash}:{platform}:{mode}"
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @contextmanager
+    def flight(self, key: str):
+        """
+        Context for analyzing `key`. Yields False to the leader, which
+        should analyze, and True to a request that waited for another one
+        and should look in the caches first.
+        """
+        if not self.enabled:
+            yield False
+            return
+
+        with self._lock:
+            future = self._flights.get(key)
+            leader = future is None
+            if leader:
+                future = self._flights[key] = Future()
+                self._followers[key] = 0
+            elif self._followers[key] < self.max_followers:
+                self._followers[key] += 1
+            else:
+                future = None
+
+        if future is None:
+            self._count("followers_over_cap")
+            yield False
+            return
+
+        if not leader:
+            self._count("coalesced_local")
+            try:
+                future.result(timeout=self.wait_seconds)
+            except FutureTimeout:
+                self._count("wait_timeouts")
+                logger.warning(f"Stopped waiting for in-flight analysis {key}")
+            yield True
+            return
+
+        lock = None
+        try:
+            lock, waited = self._acquire_remote(key)
+            if not waited:
+                self._count("leaders")
+            yield waited
+        finally:
+            self._release_remote(lock)
+            with self._lock:
+                self._flights.pop(key, None)
+                self._followers.pop(key, None)
+            future.set_result(None)
+
+    def _acquire_remote(self, key: str):
+        """(lock, waited): the Redis lock when we took it; waited when another node held it."""
+        if self.redis is None:
+            return None, False
+        try:
+            lock = self.redis.lock(key, timeout=self.lock_seconds)
+            if lock.acquire(blocking=False):
+                return lock, False
+
+            self._count("coalesced_remote")
+            deadline = time.monotonic() + self.wait_seconds
+            while self.redis.exists(key):
+                if time.monotonic() >= deadline:
+                    self._count("wait_timeouts")
+                    logger.warning(f"Stopped waiting for analysis {key} on another node")
+                    break
+                time.sleep(_POLL_SECONDS)
+            return None, True
+        except Exception as e:
+            logger.warning(f"Upload coalescing lock unavailable for {key}: {e}")
+            return None, False
+
+    def _release_remote(self, lock):
+        if lock is None:
+            return
+        try:
+            lock.release()
+        except Exception as e:
+            # Expired and possibly taken by another node; nothing to undo
+            logger.warning(f"Upload coalescing lock was not released: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._flights),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced_local + self.coalesced_remote,
+                "coalesced_local": self.coalesced_local,
+                "coalesced_remote": self.coalesced_remote,
+                "wait_timeouts": self.wait_timeouts,
+                "followers_over_cap": self.followers_over_cap,
+            }
+
+
+upload_coalescer = UploadCoalescer(
+    redis=redis_client,
+    lock_seconds=settings.upload_coalescing_lock_seconds,
+    wait_seconds=settings.upload_coalescing_wait_seconds,
+    enabled=settings.upload_coalescing_enabled,
+    max_followers=settings.upload_coalescing_max_followers,
+)
@@ -0,0 +1,1045 @@
+import time
+import uuid
+import shutil
+import logging
+import threading
+import traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field, replace
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator
+
+from sqlalchemy import Text, cast, or_
+from sqlalchemy.orm import Session
+
+from app.core import json_codec
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.usage_tracker import increment_ai_calls
+from app.domain.analysis_contracts import WorkflowAnalysis
+from app.models.analysis_history import AnalysisHistory, AnalysisStatus
+from app.models.code_review import CodeReview
+from app.models.file import File as FileModel
+from app.models.project import Project
+from app.models.workflow import Workflow
+from app.services.analysis.activity_mappings import calculate_migration_stats_from_counts, categorize_activity_counts
+from app.services.analysis.complexity import calculate_complexity
+from app.services.analysis.metrics import calculate_metrics
+from app.services.analysis.parse_cache import parse_workflow_cached
+from app.services.analysis.parse_executor import parse_executor
+from app.services.analysis.parse_limits import ParseLimitExceeded, ParseLimits, parse_limits_for_plan
+from app.services.analysis.platform_detector import detect_platform
+from app.services.analysis.release_splitter import ReleaseUnit, split_blue_prism_release
+from app.services.analysis.result_cache import get_cached_analysis, store_analysis
+from app.services.analysis.selectors import build_selector_index
+from app.services.analysis.upload_coalescer import upload_coalescer
+from app.services.analysis.upload_store import StoredUpload, upload_store
+from app.services.code_review.code_review_service import evaluate_rules, review_suggestions, risk_indicators
+from app.services.projects.project_service import link_new_workflows
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("detect", "ingest", "parse", "metrics", "complexity", "rules", "mappings", "persist")
+
+# Everything else feeds the response and every later stage
+SKIPPABLE_STAGES = frozenset({"rules", "mappings"})
+
+# The stages served by the cross-tenant result cache
+_CONTENT_STAGES = ("parse", "metrics", "complexity", "rules", "mappings")
+
+# Runs the independent stages of one analysis side by side
+_stage_pool = ThreadPoolExecutor(max_workers=max(1, settings.analysis_stage_workers), thread_name_prefix="analysis-stage")
+
+
+class UnsupportedUpload(ValueError):
+    """The upload is not a workflow the pipeline was asked to analyze."""
+
+
+@dataclass
+class StageTiming:
+    stage: str
+    ms: float
+    status: str = "ran"  # ran | cached | skipped
+
+
+@dataclass
+class AnalysisRun:
+    """One upload on its way through the pipeline."""
+    user_id: Any
+    api_key_id: Any
+    subscription_id: Any
+    file_name: str
+    limits: ParseLimits
+    analysis_id: uuid.UUID = field(default_factory=uuid.uuid4)
+    platform: str | None = None
+    stored: StoredUpload | None = None
+    cached_response: bytes | None = None  # the user's earlier analysis of the same content, as JSON
+    timings: list[StageTiming] = field(default_factory=list)
+    # Set by prepare(): the content stages' output, for persist()
+    workflow_analysis: WorkflowAnalysis | None = None
+    release_units: list[ReleaseUnit] | None = None
+    release_analyses: list[dict] | None = None
+    share_analysis: bool = False  # computed rather than read from the result cache, so persist() adds it
+
+    def server_timing(self) -> str:
+        """The stage timings as a Server-Timing header value."""
+        return ", ".join(
+            f"{timing.stage};dur={timing.ms:.1f}" + (f';desc="{timing.status}"' if timing.status != "ran" else "")
+            for timing in self.timings
+        )
+
+    def timing_headers(self) -> dict[str, str]:
+        """Server-Timing header for the response, when server_timing_enabled is set."""
+        return {"Server-Timing": self.server_timing()} if settings.server_timing_enabled else {}
+
+    def timing_fields(self) -> dict[str, str]:
+        """serverTiming for an NDJSON line, when server_timing_enabled is set."""
+        return {"serverTiming": self.server_timing()} if settings.server_timing_enabled else {}
+
+
+class PipelineStats:
+    """Per-stage timing totals over every analysis run in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: dict[str, dict] = {}
+
+    def record(self, timings: list[StageTiming]):
+        with self._lock:
+            for timing in timings:
+                stage = self._stages.setdefault(
+                    timing.stage,
+                    {"ran": 0, "cached": 0, "skipped": 0, "total_ms": 0.0, "max_ms": 0.0},
+                )
+                stage[timing.status] += 1
+                if timing.status == "ran":
+                    stage["total_ms"] += timing.ms
+                    stage["max_ms"] = max(stage["max_ms"], timing.ms)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    **stage,
+                    "total_ms": round(stage["total_ms"], 3),
+                    "max_ms": round(stage["max_ms"], 3),
+                    "mean_ms": round(stage["total_ms"] / stage["ran"], 3) if stage["ran"] else 0.0,
+                }
+                for name, stage in self._stages.items()
+            }
+
+
+pipeline_stats = PipelineStats()
+
+
+def _timed(timings: list[StageTiming], stage: str, fn, *args):
+    start = time.perf_counter()
+    value = fn(*args)
+    timings.append(StageTiming(stage, (time.perf_counter() - start) * 1000))
+    return value
+
+
+def _mark(timings: list[StageTiming], stages, status: str):
+    timings.extend(StageTiming(stage, 0.0, status) for stage in stages)
+
+
+def _run_concurrently(timings: list[StageTiming], tasks: dict) -> dict:
+    """Run {stage: (fn, *args)} in the stage pool; each stage is timed on its own thread."""
+    def timed(fn, args):
+        start = time.perf_counter()
+        value = fn(*args)
+        return value, (time.perf_counter() - start) * 1000
+
+    futures = {stage: _stage_pool.submit(timed, fn, args) for stage, (fn, *args) in tasks.items()}
+    outputs = {}
+    for stage, future in futures.items():
+        outputs[stage], ms = future.result()
+        timings.append(StageTiming(stage, ms))
+    return outputs
+
+
+def _extract_element_data(parsed) -> dict:
+    """The per-element data stored on Workflow in full mode."""
+    return {
+        "invoked_files": parsed.invoked_workflow_files(),
+        "raw_activities": parsed.raw_activity_dicts(),
+        "raw_variables": parsed.raw_variable_dicts(),
+        "selector_index": build_selector_index(parsed),
+    }
+
+
+def _split_release(file_path: str, analysis_id, limits: ParseLimits) -> list[ReleaseUnit]:
+    """Split a Blue Prism release and move its units into the upload store."""
+    split_dir = upload_store.tmp_dir / str(analysis_id)
+    try:
+        return [
+            replace(unit, file_path=str(upload_store.adopt(unit.file_path, unit.content_hash).path))
+            for unit in split_blue_prism_release(file_path, split_dir, limits)
+        ]
+    finally:
+        shutil.rmtree(split_dir, ignore_errors=True)
+
+
+def record_failure(db: Session, analysis, error: Exception, **details):
+    """Drop the analysis' uncommitted rows and store it as FAILED in a transaction of its own."""
+    db.rollback()
+    analysis.status = AnalysisStatus.FAILED
+    analysis.result = {"error": str(error), "error_type": type(error).__name__, **details}
+    db.add(analysis)
+    db.commit()
+
+
+def fail_stale_analyses(db: Session, older_than: timedelta) -> int:
+    """
+    Store analyses left PENDING or IN_PROGRESS for longer than older_than
+    as FAILED. Background runs live only in the process that accepted
+    them, so a restart drops them; the age cut-off keeps the live runs of
+    other workers. Returns the number of analyses failed.
+    """
+    cutoff = datetime.now(timezone.utc) - older_than
+    count = (
+        db.query(AnalysisHistory)
+        .filter(
+            AnalysisHistory.status.in_((AnalysisStatus.PENDING, AnalysisStatus.IN_PROGRESS)),
+            AnalysisHistory.created_at < cutoff,
+        )
+        .update(
+            {
+                AnalysisHistory.status: AnalysisStatus.FAILED,
+                AnalysisHistory.result: {
+                    "error": "The analysis was interrupted by a restart; upload the file again",
+                    "error_type": "AnalysisInterrupted",
+                },
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return count
+
+
+def recover_stale_analyses():
+    """Startup hook: fail the analyses a previous process left unfinished."""
+    db: Session = SessionLocal()
+    try:
+        count = fail_stale_analyses(db, timedelta(minutes=settings.stale_analysis_minutes))
+        if count:
+            logger.warning(f"Marked {count} interrupted analyses as failed")
+    except Exception as e:
+        logger.error(f"Could not recover interrupted analyses: {str(e)}")
+    finally:
+        db.close()
+
+
+def default_project(db: Session, user_id, platform: str) -> Project:
+    """The user's default Project, added to the session if the user has none yet."""
+    project = db.query(Project).filter(Project.user_id == user_id).first()
+    if not project:
+        project = Project(
+            project_id=uuid.uuid4(),
+            user_id=user_id,
+            name="Default Project",
+            platform=platform
+        )
+        db.add(project)
+    return project
+
+
+def _add_file_rows(db: Session, user_id, platform: str, file_name: str, stored: StoredUpload, project: Project | None = None):
+    """
+    Add the upload's File row, under `project` or else the user's default
+    Project (created if missing), to the session. IDs are assigned here,
+    so rows that reference them can be built without flushing first.
+    """
+    if project is None:
+        project = default_project(db, user_id, platform)
+
+    db_file = FileModel(
+        file_id=uuid.uuid4(),
+        project_id=project.project_id,
+        file_name=file_name,
+        file_path=str(stored.path),
+        file_size=stored.size,
+        content_hash=stored.content_hash
+    )
+    db.add(db_file)
+    return project, db_file
+
+
+def _complete(db: Session, analysis, result: dict) -> dict:
+    """Attach the result and commit the analysis together with every row added for it."""
+    analysis.result = result
+    analysis.status = AnalysisStatus.COMPLETED
+    db.add(analysis)
+    db.commit()
+    return result
+
+
+def _as_cached(raw: str | None) -> bytes:
+    """A stored result as response bytes with "cached": true spliced in."""
+    if raw is None or raw == "null":
+        return b'{"cached":true}'
+
+    data = raw.encode()
+    # Legacy rows keyed by workflow_id, or already carrying the flag, are rewritten
+    if b'"workflow_id"' in data or b'"cached"' in data or not data.startswith(b"{"):
+        cached_result = json_codec.loads(data) or {}
+        cached_result["cached"] = True
+        # Ensure 'id' exists for frontend compatibility if it was stored as 'workflow_id'
+        if "workflow_id" in cached_result and "id" not in cached_result:
+            cached_result["id"] = cached_result["workflow_id"]
+        return json_codec.dumps(cached_result)
+
+    if data.rstrip() == b"{}":
+        return b'{"cached":true}'
+    return b'{"cached":true,' + data[1:]
+
+
+def ndjson_line(payload: dict) -> bytes:
+    return json_codec.dumps(payload) + b"\n"
+
+
+def find_cached_response(db: Session, user_id, file_hash: str, mode: str) -> bytes | None:
+    """
+    The user's latest completed analysis of this content, as JSON bytes
+    marked as cached. The stored JSON text is used as-is: it is never
+    decoded into a dict or encoded again.
+    """
+    analysis_mode = AnalysisHistory.result["analysisMode"].as_string()
+    query = (
+        db.query(cast(AnalysisHistory.result, Text))
+        .filter(
+            AnalysisHistory.user_id == user_id,
+            AnalysisHistory.file_hash == file_hash,
+            AnalysisHistory.status == AnalysisStatus.COMPLETED
+        )
+    )
+    # A metrics-only result cannot answer a full analysis request
+    if mode == "full":
+        query = query.filter(or_(analysis_mode.is_(None), analysis_mode != "metrics"))
+
+    row = query.order_by(AnalysisHistory.created_at.desc()).first()
+    return _as_cached(row[0]) if row else None
+
+
+def _analyze_release_unit(unit: ReleaseUnit, mode: str, limits: ParseLimits) -> dict:
+    """Parse, score and rule-check one release unit; runs on a feeder thread, touches no DB state."""
+    platform = "Blue Prism"
+    if mode == "metrics":
+        parsed = parse_executor.summarize(unit.file_path, platform, limits)
+    else:
+        parsed = parse_workflow_cached(unit.file_path, platform, unit.content_hash, limits)
+    metrics = calculate_metrics(parsed)
+
+    review = None
+    if mode == "full":
+        review = parse_executor.review(
+            platform=platform,
+            workflow={
+                "workflowName": unit.name,
+                "nestingDepth": metrics.nesting_depth,
+                "activityCount": metrics.activity_count,
+                "variables": parsed.raw_variable_dicts(),
+                "selectorIndex": None,
+            },
+            activities=parsed.raw_activity_dicts(),
+        )
+
+    return {
+        "parsed": parsed,
+        "metrics": metrics,
+        "complexity": calculate_complexity(metrics),
+        "activity_counts": parsed.activity_counts(),
+        # The metrics-only summary keeps no per-node data to read invokes from
+        "invoked_files": parsed.invoked_workflow_files() if mode == "full" else [],
+        "review": review,
+    }
+
+
+def _analyze_release_units(units: list[ReleaseUnit], mode: str, limits: ParseLimits) -> list[dict]:
+    """Analyze the units of a release in parallel in the parse pool."""
+    with ThreadPoolExecutor(max_workers=max(1, settings.parse_workers)) as feeders:
+        return list(feeders.map(lambda unit: _analyze_release_unit(unit, mode, limits), units))
+
+
+def _analyze_release(
+    db: Session,
+    analysis,
+    user_id,
+    file_name: str,
+    stored: StoredUpload,
+    units: list[ReleaseUnit],
+    mode: str,
+    limits: ParseLimits,
+) -> dict:
+    """
+    Analyze each process / object of a Blue Prism release as its own
+    Workflow under the release's File. Units are parsed and rule-checked
+    in parallel in the parse pool; all rows are committed together.
+    """
+    analyzed = _analyze_release_units(units, mode, limits)
+    return _persist_release(db, analysis, user_id, file_name, stored, units, analyzed, mode)
+
+
+def _persist_release(
+    db: Session,
+    analysis,
+    user_id,
+    file_name: str,
+    stored: StoredUpload,
+    units: list[ReleaseUnit],
+    analyzed: list[dict],
+    mode: str,
+    project: Project | None = None,
+) -> dict:
+    """Write the Workflow rows of analyzed release units and complete `analysis` in one transaction."""
+    platform = "Blue Prism"
+    project, db_file = _add_file_rows(db, user_id, platform, file_name, stored, project)
+
+    release_counts = Counter()
+    new_workflows = []
+    unit_results = []
+    release_issues = []
+    suggestions = []
+
+    for unit, item in zip(units, analyzed):
+        parsed, metrics, complexity = item["parsed"], item["metrics"], item["complexity"]
+        activity_counts = item["activity_counts"]
+        release_counts.update(activity_counts)
+        stats = calculate_migration_stats_from_counts(activity_counts)
+
+        findings = [asdict(f) for f in item["review"]["findings"]] if item["review"] else []
+        detected_issues = []
+        if metrics.nesting_depth > 3:
+            detected_issues.append(f"High nesting depth (level {metrics.nesting_depth})")
+        detected_issues.extend(f.get("message", "Unknown issue") for f in findings)
+        if metrics.has_custom_code:
+            detected_issues.append("Contains custom code/scripts")
+        release_issues.extend(f"{unit.name}: {issue}" for issue in detected_issues)
+
+        for finding in findings:
+            suggestions.append({
+                "id": len(suggestions) + 1,
+                "priority": finding.get("severity", "medium").lower(),
+                "title": f"{unit.name}: {finding.get('message', 'Code Quality Issue')}",
+                "description": finding.get("recommendation", "Review and refactor"),
+                "impact": finding.get("impact", "Medium"),
+                "effort": finding.get("effort", "Medium"),
+                "benefits": ["Improved maintainability", "Better code quality"],
+                "implementation_steps": [finding.get("recommendation", "Review code")]
+            })
+
+        workflow = Workflow(
+            workflow_id=uuid.uuid4(),
+            project_id=project.project_id,
+            file_id=db_file.file_id,
+            workflow_name=unit.name,
+            platform=platform,
+            complexity_score=complexity.score,
+            complexity_level=complexity.level,
+            activity_count=metrics.activity_count,
+            nesting_depth=metrics.nesting_depth,
+            variable_count=metrics.variable_count,
+            invoked_workflows=metrics.invoked_workflows,
+            has_custom_code=metrics.has_custom_code,
+            raw_activities=parsed.raw_activity_dicts() if mode == "full" else None,
+            raw_variables=parsed.raw_variable_dicts() if mode == "full" else None,
+            activity_breakdown=categorize_activity_counts(activity_counts),
+            risk_indicators=detected_issues or ["No major issues detected"],
+            estimated_effort_hours=stats["totalEffortHours"],
+            compatibility_score=stats["compatibilityScore"],
+        )
+        db.add(workflow)
+
+        if item["review"]:
+            review = item["review"]
+            db.add(CodeReview(
+                workflow_id=workflow.workflow_id,
+                overall_score=int(review["overallScore"]),
+                grade=review["qualityGrade"],
+                total_issues=len(findings),
+                findings=findings,
+            ))
+        new_workflows.append((workflow, item["invoked_files"]))
+
+        unit_results.append({
+            "id": str(workflow.workflow_id),
+            "workflowName": unit.name,
+            "kind": unit.kind,
+            "complexityScore": float(complexity.score),
+            "complexityLevel": complexity.level,
+            "totalActivities": metrics.activity_count,
+            "nestingDepth": metrics.nesting_depth,
+            "estimatedEffortHours": stats["totalEffortHours"],
+            "compatibilityScore": stats["compatibilityScore"],
+            "riskIndicators": workflow.risk_indicators,
+        })
+
+    link_new_workflows(db, project, new_workflows)
+
+    # The release as a whole is scored by its most complex unit
+    stats = calculate_migration_stats_from_counts(release_counts)
+    top = max(unit_results, key=lambda result: result["complexityScore"])
+    result = {
+        "id": unit_results[0]["id"],
+        "workflowName": file_name,
+        "platform": platform,
+        "complexityScore": top["complexityScore"],
+        "complexityLevel": top["complexityLevel"],
+        "totalActivities": sum(result["totalActivities"] for result in unit_results),
+        "estimatedEffortHours": stats["totalEffortHours"],
+        "compatibilityScore": stats["compatibilityScore"],
+        "riskIndicators": release_issues or ["No major issues detected"],
+        "activityBreakdown": categorize_activity_counts(release_counts),
+        "analyzedAt": datetime.utcnow().isoformat(),
+        "suggestions": suggestions,
+        "analysisMode": mode,
+        "workflows": unit_results,
+    }
+
+    _complete(db, analysis, result)
+    logger.info(f"Analyzed release {file_name} as {len(units)} workflows")
+    return result
+
+
+def add_workflow_rows(
+    db: Session,
+    db_file,
+    platform: str,
+    mode: str,
+    workflow_id,
+    workflow_analysis: WorkflowAnalysis,
+    workflow_name: str | None = None,
+) -> Workflow:
+    """
+    Add the Workflow row of an analyzed workflow under `db_file`, and its
+    CodeReview in full mode, to the session. Risk indicators, suggestions
+    and migration effort are filled in here; usage is left to the caller.
+    """
+    metrics, complexity = workflow_analysis.metrics, workflow_analysis.complexity
+
+    workflow = Workflow(
+        workflow_id=workflow_id,
+        project_id=db_file.project_id,
+        file_id=db_file.file_id,
+        workflow_name=workflow_name,
+        platform=platform,
+        complexity_score=complexity.score,
+        complexity_level=complexity.level,
+        activity_count=metrics.activity_count,
+        nesting_depth=metrics.nesting_depth,
+        variable_count=metrics.variable_count,
+        invoked_workflows=metrics.invoked_workflows,
+        has_custom_code=metrics.has_custom_code,
+        raw_activities=workflow_analysis.raw_activities if mode == "full" else None,
+        raw_variables=workflow_analysis.raw_variables if mode == "full" else None,
+        selector_index=workflow_analysis.selector_index if mode == "full" else None
+    )
+    db.add(workflow)
+
+    # Code review needs the raw activities, so metrics mode skips it
+    findings = []
+    if mode == "full" and workflow_analysis.review is not None:
+        db.add(CodeReview(workflow_id=workflow_id, **workflow_analysis.review))
+        findings = [finding for finding in workflow_analysis.review["findings"] if isinstance(finding, dict)]
+
+    # Migration effort from the comprehensive mapping service (empty when skipped)
+    stats = workflow_analysis.migration_stats
+
+    # Detect issues from metrics and review, and suggestions from the findings
+    workflow.activity_breakdown = workflow_analysis.activity_breakdown
+    workflow.risk_indicators = risk_indicators(metrics, findings)
+    workflow.estimated_effort_hours = stats.get("totalEffortHours")
+    workflow.compatibility_score = stats.get("compatibilityScore")
+    workflow.suggestions = review_suggestions(findings)
+    return workflow
+
+
+def workflow_result(workflow: Workflow, file_name: str, mode: str) -> dict:
+    """The response / AnalysisHistory.result of one workflow added by add_workflow_rows."""
+    return {
+        "id": str(workflow.workflow_id),
+        "workflowName": file_name,
+        "platform": workflow.platform,
+
+        # Flattened fields (VERY IMPORTANT)
+        "complexityScore": float(workflow.complexity_score),
+        "complexityLevel": workflow.complexity_level,
+        "totalActivities": workflow.activity_count,
+        "estimatedEffortHours": workflow.estimated_effort_hours,
+        "compatibilityScore": workflow.compatibility_score,
+
+        "riskIndicators": workflow.risk_indicators,
+        "activityBreakdown": workflow.activity_breakdown,
+
+        "analyzedAt": workflow.analyzed_at.isoformat() if workflow.analyzed_at else datetime.utcnow().isoformat(),
+
+        # Optional (detail page use)
+        "suggestions": workflow.suggestions,
+        "analysisMode": mode,
+    }
+
+
+def _persist_workflow_analysis(
+    db: Session,
+    analysis,
+    user_id,
+    platform: str,
+    mode: str,
+    file_name: str,
+    stored: StoredUpload,
+    workflow_id,
+    workflow_analysis: WorkflowAnalysis,
+    project: Project | None = None,
+) -> dict:
+    """
+    Write the per-user rows of a single-workflow analysis (Project if new
+    and none is given, File, Workflow, CodeReview, invoke edges, usage) and
+    complete `analysis`, all in one transaction. Every value is known before the
+    first flush, so each row is one INSERT; IDs are assigned client-side
+    and server defaults come back through RETURNING, so nothing is
+    refreshed.
+    """
+    project, db_file = _add_file_rows(db, user_id, platform, file_name, stored, project)
+    workflow = add_workflow_rows(db, db_file, platform, mode, workflow_id, workflow_analysis)
+    if mode == "full" and workflow_analysis.review is not None:
+        increment_ai_calls(db, user_id, commit=False)
+
+    # Flush the INSERTs; analyzed_at comes back from the database
+    if mode == "full":
+        link_new_workflows(db, project, [(workflow, workflow_analysis.invoked_files)])
+    else:
+        db.flush()
+
+    return _complete(db, analysis, workflow_result(workflow, file_name, mode))
+
+
+def _report_progress(db: Session, analysis, stage: str, partial: dict):
+    analysis.result = {**partial, "stage": stage, "partial": True}
+    db.commit()
+
+
+class UploadAnalysisPipeline:
+    """
+    Analysis of one uploaded workflow as explicit stages:
+
+        detect -> ingest -> parse -> metrics -> complexity -> rules | mappings -> persist
+
+    Every stage is timed into AnalysisRun.timings and pipeline_stats.
+    A user's repeat upload is answered from their history right after
+    ingest. parse through mappings depend only on the content, so they
+    are served together from the cross-tenant result cache (parse itself
+    reads through the parse cache). rules and mappings (migration stats,
+    activity breakdown) do not depend on each other: they run
+    concurrently and either can be skipped. Metrics mode skips rules.
+
+    stream_batch() runs many uploads through the same stages: prepare()
+    (split through mappings) on worker threads, persist() on the caller's
+    session.
+    """
+
+    def __init__(self, mode: str = "full", skip=(), expected_platform: str | None = None, stats: PipelineStats = pipeline_stats):
+        skip = frozenset(skip)
+        if not skip <= SKIPPABLE_STAGES:
+            raise ValueError(f"Stages cannot be skipped: {', '.join(sorted(skip - SKIPPABLE_STAGES))}")
+        self.mode = mode
+        # Metrics mode has no element data to check rules against
+        self.skip = skip | {"rules"} if mode == "metrics" else skip
+        # Only an analysis with every stage of its mode is shared across tenants
+        self.shares_results = not skip
+        self.expected_platform = expected_platform
+        self.stats = stats
+
+    def ingest(self, db: Session, source, file_name: str, context: dict) -> AnalysisRun:
+        """
+        Detect the platform and store the upload. Raises UnsupportedUpload
+        for an unexpected platform and ParseLimitExceeded when the upload
+        passes the plan's limits. run.cached_response is set when the user
+        already analyzed the same content.
+        """
+        run = AnalysisRun(file_name=file_name, **self._run_owner(context))
+        return self._ingest(db, source, run)
+
+    @staticmethod
+    def _run_owner(context: dict) -> dict:
+        return {
+            "user_id": context["user"].user_id,
+            "api_key_id": context["api_key"].api_key_id,
+            "subscription_id": context["subscription"].subscription_id,
+            "limits": parse_limits_for_plan(context["subscription"].plan),
+        }
+
+    def _ingest(self, db: Session, source, run: AnalysisRun) -> AnalysisRun:
+        # Detect platform from the first few KB, before anything is parsed
+        run.platform = _timed(run.timings, "detect", detect_platform, source, run.file_name)
+        if self.expected_platform and run.platform != self.expected_platform:
+            raise UnsupportedUpload(
+                f"File content looks like a {run.platform} workflow, not {self.expected_platform}."
+            )
+
+        # Store the file by content; XAML is stored canonicalized, so the hash
+        # ignores designer metadata and layout and re-uploads share one blob
+        run.stored = _timed(run.timings, "ingest", upload_store.save, source, run.platform, run.limits, run.file_name)
+
+        run.cached_response = find_cached_response(db, run.user_id, run.stored.content_hash, self.mode)
+        if run.cached_response:
+            _mark(run.timings, STAGES[2:], "cached")
+            self.stats.record(run.timings)
+        return run
+
+    def _new_analysis(self, run: AnalysisRun, status: AnalysisStatus) -> AnalysisHistory:
+        return AnalysisHistory(
+            analysis_id=run.analysis_id,
+            user_id=run.user_id,
+            api_key_id=run.api_key_id,
+            subscription_id=run.subscription_id,
+            file_name=run.file_name,
+            file_path=str(run.stored.path),
+            file_hash=run.stored.content_hash,
+            status=status
+        )
+
+    def analyze(self, db: Session, run: AnalysisRun) -> dict:
+        """
+        Run the remaining stages now. The analysis is inserted together with
+        its other rows in one transaction; a failure is recorded on it and
+        re-raised.
+        """
+        analysis = self._new_analysis(run, AnalysisStatus.IN_PROGRESS)
+        try:
+            return self._analyze(db, run, analysis)
+        except Exception as e:
+            self._fail(db, analysis, e)
+            raise
+
+    def submit(self, db: Session, run: AnalysisRun) -> AnalysisHistory:
+        """Add the run's analysis as PENDING, so it is visible before run_in_background() picks it up."""
+        analysis = self._new_analysis(run, AnalysisStatus.PENDING)
+        db.add(analysis)
+        db.commit()
+        return analysis
+
+    def run_in_background(self, run: AnalysisRun):
+        """
+        Background task for submitted runs; runs after the 202 was sent, with
+        its own session. Best effort: the task lives in this process only, so
+        a run interrupted by a restart stays unfinished until the next
+        startup marks it FAILED (see recover_stale_analyses()).
+        """
+        db: Session = SessionLocal()
+        analysis = None
+        try:
+            analysis = db.query(AnalysisHistory).filter(AnalysisHistory.analysis_id == run.analysis_id).first()
+            if not analysis:
+                logger.warning(f"Analysis {run.analysis_id} not found")
+                return
+
+            analysis.status = AnalysisStatus.IN_PROGRESS
+            db.commit()
+            self._analyze(
+                db, run, analysis,
+                on_progress=lambda stage, partial: _report_progress(db, analysis, stage, partial),
+            )
+            logger.info(f"Analysis {run.analysis_id} completed in the background")
+
+        except Exception as e:
+            if analysis:
+                self._fail(db, analysis, e)
+            else:
+                logger.error(f"Analysis {run.analysis_id} failed: {str(e)}")
+        finally:
+            db.close()
+
+    def _fail(self, db: Session, analysis, error: Exception):
+        if isinstance(error, ParseLimitExceeded):
+            logger.warning(f"Analysis {analysis.analysis_id} stopped: {error}")
+            record_failure(db, analysis, error)
+        else:
+            logger.error(f"Analysis {analysis.analysis_id} failed: {str(error)}", exc_info=error)
+            record_failure(db, analysis, error, traceback="".join(traceback.format_exception(error)))
+
+    def _analyze(self, db: Session, run: AnalysisRun, analysis, on_progress=None) -> dict:
+        try:
+            # Concurrent uploads of the same content are analyzed once
+            with upload_coalescer.flight(upload_coalescer.key(run.stored.content_hash, run.platform, self.mode)) as waited:
+                # The same user's identical upload finished while this one waited
+                cached_response = waited and find_cached_response(db, run.user_id, run.stored.content_hash, self.mode)
+                if cached_response:
+                    _mark(run.timings, STAGES[2:], "cached")
+                    cached_result = json_codec.loads(cached_response)
+                    _complete(db, analysis, {key: value for key, value in cached_result.items() if key != "cached"})
+                    return cached_result
+                return self._run_stages(db, run, analysis, on_progress)
+        finally:
+            self.stats.record(run.timings)
+
+    def _run_stages(self, db: Session, run: AnalysisRun, analysis, on_progress) -> dict:
+        file_path = str(run.stored.path)
+
+        # Blue Prism releases become one workflow per process / object
+        if run.platform == "Blue Prism":
+            units = _timed(run.timings, "split", _split_release, file_path, run.analysis_id, run.limits)
+            if units:
+                return _timed(
+                    run.timings, "release", _analyze_release,
+                    db, analysis, run.user_id, run.file_name, run.stored, units, self.mode, run.limits,
+                )
+
+        workflow_analysis = self.analyze_content(
+            db, file_path, run.platform, run.stored.content_hash, run.limits, run.timings,
+        )
+        metrics, complexity = workflow_analysis.metrics, workflow_analysis.complexity
+
+        workflow_id = uuid.uuid4()
+        if on_progress:
+            on_progress("metrics", {
+                "id": str(workflow_id),
+                "workflowName": run.file_name,
+                "platform": run.platform,
+                "complexityScore": float(complexity.score),
+                "complexityLevel": complexity.level,
+                "totalActivities": metrics.activity_count,
+                "analysisMode": self.mode,
+            })
+
+        return _timed(
+            run.timings, "persist", _persist_workflow_analysis,
+            db, analysis, run.user_id, run.platform, self.mode, run.file_name, run.stored,
+            workflow_id, workflow_analysis,
+        )
+
+    def prepare(self, db: Session, run: AnalysisRun):
+        """
+        Run the split / parse through mappings stages of an ingested run
+        without writing anything; `db` is only read (result cache). The
+        output is kept on the run for persist().
+        """
+        file_path = str(run.stored.path)
+
+        if run.platform == "Blue Prism":
+            units = _timed(run.timings, "split", _split_release, file_path, run.analysis_id, run.limits)
+            if units:
+                run.release_units = units
+                run.release_analyses = _timed(run.timings, "release", _analyze_release_units, units, self.mode, run.limits)
+                return
+
+        run.workflow_analysis, computed = self._content_stages(
+            db, file_path, run.platform, run.stored.content_hash, run.limits, run.timings,
+        )
+        run.share_analysis = computed and self._stores_results()
+
+    def persist(self, db: Session, run: AnalysisRun, project: Project | None = None) -> dict:
+        """
+        Write the rows of a prepared run under `project` (default: the
+        user's default Project) and complete its analysis, in one
+        transaction. A failure is recorded on the analysis and re-raised.
+        """
+        analysis = self._new_analysis(run, AnalysisStatus.IN_PROGRESS)
+        try:
+            if run.release_units:
+                return _timed(
+                    run.timings, "persist", _persist_release,
+                    db, analysis, run.user_id, run.file_name, run.stored,
+                    run.release_units, run.release_analyses, self.mode, project,
+                )
+            if run.share_analysis:
+                store_analysis(db, run.stored.content_hash, run.platform, self.mode, run.workflow_analysis)
+            return _timed(
+                run.timings, "persist", _persist_workflow_analysis,
+                db, analysis, run.user_id, run.platform, self.mode, run.file_name, run.stored,
+                uuid.uuid4(), run.workflow_analysis, project,
+            )
+        except Exception as e:
+            self._fail(db, analysis, e)
+            raise
+        finally:
+            self.stats.record(run.timings)
+
+    def stream_batch(
+        self,
+        db: Session,
+        uploads: list[tuple[str, Any]],
+        context: dict,
+        session_factory=SessionLocal,
+    ) -> Iterator[bytes]:
+        """
+        Analyze several uploads ([(file_name, source)]) as NDJSON lines: a
+        "batch" line, one "file" line per upload in completion order, then
+        a "summary" line.
+
+        Worker threads run detect through mappings for the files side by
+        side, each with a short-lived session of its own that is only read.
+        Every completed file is persisted here, on `db`, in its own
+        transaction under the default Project resolved once for the batch,
+        so the invoke graph is always extended by one writer. A cached
+        result is streamed as soon as its file is ingested, as the stored
+        JSON bytes. A failed file does not stop the batch.
+
+        Identical uploads are not coalesced here: the analysis is computed
+        before the transaction that would release its followers.
+        """
+        owner = self._run_owner(context)
+        start = time.perf_counter()
+        counts = {"completed": 0, "cached": 0, "failed": 0}
+        project = None
+
+        # The per-file commits must not expire the project, or every file
+        # would reload it
+        db.expire_on_commit = False
+
+        yield ndjson_line({"type": "batch", "fileCount": len(uploads), "analysisMode": self.mode})
+
+        def work(file_name: str, source) -> tuple[AnalysisRun, Exception | None]:
+            run = AnalysisRun(file_name=file_name, **owner)
+            worker_db = session_factory()
+            try:
+                self._ingest(worker_db, source, run)
+                if not run.cached_response:
+                    self.prepare(worker_db, run)
+                return run, None
+            except Exception as e:
+                return run, e
+            finally:
+                worker_db.close()
+
+        workers = ThreadPoolExecutor(
+            max_workers=max(1, min(settings.batch_upload_workers, len(uploads))),
+            thread_name_prefix="batch-upload",
+        )
+        try:
+            futures = {
+                workers.submit(work, file_name, source): index
+                for index, (file_name, source) in enumerate(uploads)
+            }
+            for future in as_completed(futures):
+                run, error = future.result()
+                line = {"type": "file", "index": futures[future], "fileName": run.file_name}
+
+                if error is None and run.cached_response:
+                    counts["cached"] += 1
+                    line.update(status="completed", **run.timing_fields())
+                    # The stored JSON goes out as-is
+                    yield json_codec.dumps(line)[:-1] + b',"result":' + run.cached_response + b"}\n"
+                    continue
+
+                # Rejected at detect / ingest: nothing was stored, as with a single upload
+                if error is not None and run.stored is None:
+                    counts["failed"] += 1
+                    yield ndjson_line({**line, "status": "failed", "error": str(error), "error_type": type(error).__name__})
+                    continue
+
+                line["analysisId"] = str(run.analysis_id)
+                if error is None:
+                    try:
+                        # Committed on its own, so a failing file cannot roll it back
+                        if project is None:
+                            project = default_project(db, run.user_id, run.platform)
+                            db.commit()
+                        result = self.persist(db, run, project)
+                    except Exception as e:
+                        error = e
+                else:
+                    # Stored but not analyzed: recorded like a failed single upload
+                    self._fail(db, self._new_analysis(run, AnalysisStatus.IN_PROGRESS), error)
+                    self.stats.record(run.timings)
+
+                if error is not None:
+                    counts["failed"] += 1
+                    yield ndjson_line({**line, "status": "failed", "error": str(error), "error_type": type(error).__name__})
+                    continue
+
+                counts["completed"] += 1
+                yield ndjson_line({**line, "status": "completed", **run.timing_fields(), "result": result})
+        finally:
+            # A client that went away cancels the files not started yet
+            workers.shutdown(wait=False, cancel_futures=True)
+
+        yield ndjson_line({
+            "type": "summary",
+            "fileCount": len(uploads),
+            **counts,
+            "durationMs": round((time.perf_counter() - start) * 1000, 1),
+            "analyzedAt": datetime.utcnow().isoformat(),
+        })
+
+    def analyze_content(
+        self,
+        db: Session,
+        file_path: str,
+        platform: str,
+        content_hash: str,
+        limits: ParseLimits | None = None,
+        timings: list[StageTiming] | None = None,
+    ) -> WorkflowAnalysis:
+        """
+        The parse through mappings stages: from the cross-tenant result
+        cache when any user uploaded the same content under the current
+        analyzer version, otherwise computed and added to the cache
+        (committed with the caller's transaction).
+        """
+        workflow_analysis, computed = self._content_stages(db, file_path, platform, content_hash, limits, timings)
+        if computed and self._stores_results():
+            store_analysis(db, content_hash, platform, self.mode, workflow_analysis)
+        return workflow_analysis
+
+    def _stores_results(self) -> bool:
+        return settings.analysis_result_cache_enabled and self.shares_results
+
+    def _content_stages(
+        self,
+        db: Session,
+        file_path: str,
+        platform: str,
+        content_hash: str,
+        limits: ParseLimits | None,
+        timings: list[StageTiming] | None,
+    ) -> tuple[WorkflowAnalysis, bool]:
+        """The parse through mappings stages, and whether they were computed rather than read from the cache."""
+        timings = [] if timings is None else timings
+
+        if settings.analysis_result_cache_enabled:
+            cached = _timed(timings, "cache", get_cached_analysis, db, content_hash, platform, self.mode)
+            if cached is not None:
+                logger.info(f"Analysis result cache hit for {content_hash[:16]}... ({platform}, {self.mode})")
+                _mark(timings, _CONTENT_STAGES, "cached")
+                return cached, False
+
+        parsed = _timed(timings, "parse", self._parse, file_path, platform, content_hash, limits)
+        return self.analyze_parsed(parsed, platform, timings), True
+
+    def _parse(self, file_path: str, platform: str, content_hash: str, limits: ParseLimits | None):
+        # Metrics mode never builds the element tree
+        if self.mode == "metrics":
+            return parse_executor.summarize(file_path, platform, limits)
+        return parse_workflow_cached(file_path, platform, content_hash, limits)
+
+    def analyze_parsed(self, parsed, platform: str, timings: list[StageTiming] | None = None) -> WorkflowAnalysis:
+        """The metrics through mappings stages for an already parsed workflow."""
+        timings = [] if timings is None else timings
+        metrics = _timed(timings, "metrics", calculate_metrics, parsed)
+        complexity = _timed(timings, "complexity", calculate_complexity, metrics)
+        activity_counts = parsed.activity_counts()
+
+        # Rules, migration stats, activity breakdown and the element data
+        # stored on Workflow are independent of each other
+        tasks = {}
+        if "rules" not in self.skip:
+            tasks["rules"] = (evaluate_rules, platform, metrics)
+        if "mappings" not in self.skip:
+            tasks["mappings"] = (calculate_migration_stats_from_counts, activity_counts)
+            tasks["breakdown"] = (categorize_activity_counts, activity_counts)
+        if self.mode == "full":
+            tasks["extract"] = (_extract_element_data, parsed)
+        _mark(timings, sorted(self.skip), "skipped")
+        outputs = _run_concurrently(timings, tasks)
+
+        return WorkflowAnalysis(
+            metrics=metrics,
+            complexity=complexity,
+            activity_counts=activity_counts,
+            activity_breakdown=outputs.get("breakdown", {}),
+            migration_stats=outputs.get("mappings", {}),
+            review=outputs.get("rules"),
+            **outputs.get("extract", {"invoked_files": []}),
+        )
@@ -0,0 +1,323 @@
+import io
+import os
+import re
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from sqlalchemy import func
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.analysis_history import AnalysisHistory
+from app.models.file import File
+from app.services.analysis.canonicalizer import write_workflow
+from app.services.analysis.parse_limits import ParseLimits, default_parse_limits
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 1024 * 1024
+_HASH_NAME = re.compile(r"^[0-9a-f]{64}$")
+
+# ioctl(dest_fd, FICLONE, src_fd): share the source's extents (btrfs, XFS)
+_FICLONE = 0x40049409
+
+try:
+    import fcntl
+except ImportError:     # Windows
+    fcntl = None
+
+
+@dataclass
+class StoredUpload:
+    path: Path              # the blob; shared by every upload with the same content
+    size: int
+    content_hash: str
+    deduplicated: bool      # the blob already existed, nothing new was kept
+
+
+def _reflink(source: Path, destination: Path) -> bool:
+    if fcntl is None:
+        return False
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+            return True
+        except OSError:
+            pass
+    destination.unlink(missing_ok=True)
+    return False
+
+
+def link_or_copy(source: Path, destination: Path):
+    """Hardlink source to destination, else reflink it, else copy it."""
+    try:
+        os.link(source, destination)
+        return
+    except OSError:
+        pass
+    if not _reflink(source, destination):
+        shutil.copyfile(source, destination)
+
+
+def _link_into_place(tmp_path: Path, destination: Path) -> bool:
+    """Publish a finished temp file under its blob name; False when the blob already exists."""
+    try:
+        os.link(tmp_path, destination)
+    except FileExistsError:
+        return False
+    except OSError:
+        # No hardlinks on this filesystem: a rename is still atomic
+        if destination.exists():
+            return False
+        os.replace(tmp_path, destination)
+    return True
+
+
+class _SpooledBlob:
+    """
+    Write target for one upload. Data is kept in memory up to spool_bytes
+    and only then spills to a temporary file inside the store, so a
+    duplicate small upload is hashed without touching the disk.
+    """
+
+    def __init__(self, tmp_path: Path, spool_bytes: int):
+        self.tmp_path = tmp_path
+        self._spool_bytes = spool_bytes
+        self._buffer = io.BytesIO()
+        self._file = None
+
+    def write(self, data: bytes):
+        if self._file is None and self._buffer.tell() + len(data) > self._spool_bytes:
+            self._file = open(self.tmp_path, "wb")
+            self._file.write(self._buffer.getbuffer())
+            self._buffer = None
+        (self._file or self._buffer).write(data)
+
+    def seek(self, pos: int):
+        (self._file or self._buffer).seek(pos)
+
+    def truncate(self):
+        (self._file or self._buffer).truncate()
+
+    def publish(self, destination: Path) -> bool:
+        """Link the content into place; False when destination already exists."""
+        # The blob must be on disk before anything is told it is stored
+        if self._file is None:
+            self._file = open(self.tmp_path, "wb")
+            self._file.write(self._buffer.getbuffer())
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        return _link_into_place(self.tmp_path, destination)
+
+    def discard(self):
+        if self._file is not None:
+            self._file.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+class UploadStore:
+    """
+    Content-addressed store for uploaded workflow files.
+
+    Each distinct content is kept once, as blobs/<h[0:2]>/<h[2:4]>/<sha256>,
+    and File / AnalysisHistory rows point at the blob. Blobs are never
+    rewritten in place; a blob is only removed by collect_garbage() once
+    no row references it.
+    """
+
+    def __init__(self, root: str, spool_bytes: int):
+        self.root = Path(root)
+        self.blob_dir = self.root / "blobs"
+        self.tmp_dir = self.root / "tmp"
+        self.spool_bytes = spool_bytes
+
+    def blob_path(self, content_hash: str) -> Path:
+        return self.blob_dir / content_hash[:2] / content_hash[2:4] / content_hash
+
+    def _tmp_path(self) -> Path:
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        return self.tmp_dir / f"{os.getpid()}.{threading.get_ident()}.{time.monotonic_ns()}.tmp"
+
+    def _claim(self, content_hash: str, size: int, publish) -> StoredUpload:
+        path = self.blob_path(content_hash)
+        if path.exists():
+            # Restart the grace period, so the collector keeps the blob
+            # until the caller's rows are committed
+            try:
+                os.utime(path)
+                return StoredUpload(path, size, content_hash, deduplicated=True)
+            except FileNotFoundError:
+                # Collected in between: publish it again
+                pass
+        path.parent.mkdir(parents=True, exist_ok=True)
+        deduplicated = not publish(path)
+        if deduplicated:
+            os.utime(path)
+        return StoredUpload(path, size, content_hash, deduplicated)
+
+    def save(
+        self,
+        source,
+        platform: str | None,
+        limits: ParseLimits | None = None,
+        name: str = "upload",
+    ) -> StoredUpload:
+        """
+        Store an uploaded workflow (canonicalized like save_workflow_file).
+
+        The upload is hashed while it is read; content that is already in
+        the store is dropped without being written again. Raises
+        ParseLimitExceeded when the upload passes the limits.
+        """
+        spooled = _SpooledBlob(self._tmp_path(), self.spool_bytes)
+        try:
+            size, content_hash = write_workflow(source, spooled, name, platform, limits or default_parse_limits())
+            stored = self._claim(content_hash, size, spooled.publish)
+        finally:
+            spooled.discard()
+
+        if stored.deduplicated:
+            logger.info(f"Upload {name} deduplicated to blob {content_hash[:16]}...")
+        return stored
+
+    def adopt(self, file_path: str, content_hash: str | None = None) -> StoredUpload:
+        """
+        Move a file that is already on disk into the store. It is
+        hardlinked (or reflinked) into place rather than copied wherever
+        the filesystem allows, and the original path is removed.
+        """
+        source = Path(file_path)
+        if content_hash is None:
+            digest = hashlib.sha256()
+            with open(source, "rb") as f:
+                for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+            content_hash = digest.hexdigest()
+
+        def publish(destination: Path) -> bool:
+            tmp_path = self._tmp_path()
+            try:
+                link_or_copy(source, tmp_path)
+                return _link_into_place(tmp_path, destination)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+
+        stored = self._claim(content_hash, source.stat().st_size, publish)
+        source.unlink(missing_ok=True)
+        return stored
+
+    def collect_garbage(self, referenced: set[str], grace_seconds: float) -> dict:
+        """
+        Remove blobs that are not in `referenced` and have not been written
+        or reused within grace_seconds, plus abandoned temporary files.
+        """
+        cutoff = time.time() - grace_seconds
+        removed = kept = freed = 0
+
+        for path in self.blob_dir.glob("*/*/*"):
+            if not _HASH_NAME.match(path.name):
+                continue
+            if path.name in referenced:
+                kept += 1
+                continue
+            try:
+                stat = path.stat()
+                if stat.st_mtime > cutoff:
+                    kept += 1
+                    continue
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            removed += 1
+            freed += stat.st_size
+
+        for path in self.tmp_dir.glob("*.tmp"):
+            try:
+                if path.stat().st_mtime <= cutoff:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
+
+        return {"removed": removed, "kept": kept, "freed_bytes": freed}
+
+
+def blob_reference_counts(db) -> dict[str, int]:
+    """Number of File and AnalysisHistory rows referencing each content hash."""
+    counts: dict[str, int] = {}
+    for model, column in ((File, File.content_hash), (AnalysisHistory, AnalysisHistory.file_hash)):
+        rows = (
+            db.query(column, func.count())
+            .select_from(model)
+            .filter(column.isnot(None))
+            .group_by(column)
+        )
+        for content_hash, count in rows:
+            counts[content_hash] = counts.get(content_hash, 0) + count
+    return counts
+
+
+class UploadStoreCollector:
+    """
+    Background thread that periodically removes unreferenced blobs.
+
+    Safe to run in every worker process: collection is idempotent and a
+    blob is only removed after its grace period.
+    """
+
+    def __init__(self, store: UploadStore, interval_seconds: float, grace_seconds: float):
+        self.store = store
+        self.interval_seconds = interval_seconds
+        self.grace_seconds = grace_seconds
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self) -> dict:
+        db = SessionLocal()
+        try:
+            referenced = set(blob_reference_counts(db))
+        finally:
+            db.close()
+        stats = self.store.collect_garbage(referenced, self.grace_seconds)
+        if stats["removed"]:
+            logger.info(
+                f"Upload store GC removed {stats['removed']} blobs ({stats['freed_bytes']} bytes), "
+                f"kept {stats['kept']}"
+            )
+        return stats
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Upload store GC failed: {str(e)}")
+
+    def start(self):
+        if self.interval_seconds <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="upload-store-gc", daemon=True)
+        self._thread.start()
+
+    def shutdown(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+upload_store = UploadStore(
+    root=settings.upload_store_dir,
+    spool_bytes=settings.upload_store_spool_mb * 1024 * 1024,
+)
+
+upload_store_collector = UploadStoreCollector(
+    upload_store,
+    interval_seconds=settings.upload_store_gc_interval_minutes * 60,
+    grace_seconds=settings.upload_store_gc_grace_minutes * 60,
+)
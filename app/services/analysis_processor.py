@@ -3,10 +3,13 @@ import logging
 from pathlib import Path
 from sqlalchemy.orm import Session
 from app.models.analysis_history import AnalysisHistory, AnalysisStatus
+from app.models.subscription import Subscription
 from app.core.database import SessionLocal
-from app.services.analysis.parser import parse_workflow
+from app.services.analysis.parse_cache import parse_workflow_cached
+from app.services.analysis.parse_limits import parse_limits_for_plan
 from app.services.analysis.metrics import calculate_metrics
 from app.services.analysis.llm_gateway import run_llm_analysis
+from app.services.analysis.platform_detector import detect_platform
 from app.domain.llm_contracts import LLMInput
 
 logger = logging.getLogger(__name__)
@@ -35,18 +38,18 @@ def process_analysis_async(analysis_id: str):
         if not analysis.file_path or not Path(analysis.file_path).exists():
             raise FileNotFoundError(f"File not found: {analysis.file_path}")
 
-        # Detect platform from file extension
-        file_ext = Path(analysis.file_name).suffix.lower()
-        if file_ext == ".xaml":
-            platform = "UiPath"
-        elif file_ext == ".atmx":
-            platform = "Automation Anywhere"
-        else:
-            platform = "Unknown"
+        # Detect platform from the file header, falling back to the extension
+        platform = detect_platform(analysis.file_path, analysis.file_name)
 
-        # Parse the workflow file
+        # Parse the workflow file within the limits of the tenant's plan
+        subscription = (
+            db.query(Subscription)
+            .filter(Subscription.subscription_id == analysis.subscription_id)
+            .first()
+        )
+        limits = parse_limits_for_plan(subscription.plan if subscription else None)
         logger.info(f"Parsing workflow file: {analysis.file_path}")
-        parsed_workflow = parse_workflow(analysis.file_path, platform)
+        parsed_workflow = parse_workflow_cached(analysis.file_path, platform, analysis.file_hash, limits)
 
         # Calculate metrics
         logger.info(f"Calculating metrics for {analysis_id}")
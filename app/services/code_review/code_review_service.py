@@ -5,6 +5,10 @@ from app.models.workflow import Workflow
 from app.models.code_review import CodeReview
 from app.core.usage_tracker import increment_ai_calls
 
+# Bump whenever a built-in rule is added or changed so cached analysis
+# results are invalidated
+RULESET_VERSION = "1"
+
 
 def run_code_review(
     db: Session,
@@ -13,15 +17,39 @@ def run_code_review(
 ) -> CodeReview:
     increment_ai_calls(db, user_id)
 
+    review = build_code_review(workflow)
+
+    db.add(review)
+    db.commit()
+    db.refresh(review)
+
+    return review
+
+
+def build_code_review(workflow: Workflow) -> CodeReview:
+    """Evaluate the built-in rules and return an unsaved CodeReview; the caller owns the transaction."""
+    return CodeReview(
+        workflow_id=workflow.workflow_id,
+        **evaluate_rules(workflow.platform, workflow),  # Workflow stores deterministic metrics
+    )
+
+
+def evaluate_rules(platform: str, metrics) -> dict:
+    """
+    Evaluate the built-in rules against deterministic metrics and return
+    the CodeReview column values (overall_score, grade, total_issues,
+    findings). Depends only on its arguments, so the outcome is cached
+    with the rest of a workflow's analysis.
+    """
     context = RuleContext(
-        platform=workflow.platform,
-        metrics=workflow,  # Workflow stores deterministic metrics
+        platform=platform,
+        metrics=metrics,
     )
 
     findings: list[RuleFinding] = []
 
     # Built-in rule example
-    if workflow.nesting_depth > 4:
+    if context.metrics.nesting_depth > 4:
         findings.append(
             RuleFinding(
                 rule_id="CR-001",
@@ -36,19 +64,40 @@ def run_code_review(
 
     score = max(0, 100 - len(findings) * 5)
 
-    review = CodeReview(
-        workflow_id=workflow.workflow_id,
-        overall_score=score,
-        grade=_grade(score),
-        total_issues=len(findings),
-        findings=[f.__dict__ for f in findings],
-    )
+    return {
+        "overall_score": score,
+        "grade": _grade(score),
+        "total_issues": len(findings),
+        "findings": [f.__dict__ for f in findings],
+    }
 
-    db.add(review)
-    db.commit()
-    db.refresh(review)
 
-    return review
+def risk_indicators(metrics, findings: list[dict]) -> list[str]:
+    """Workflow.risk_indicators from the metrics and the review findings."""
+    detected_issues = []
+    if metrics.nesting_depth > 3:
+        detected_issues.append(f"High nesting depth (level {metrics.nesting_depth})")
+    detected_issues.extend(finding.get("message", "Unknown issue") for finding in findings)
+    if metrics.has_custom_code:
+        detected_issues.append("Contains custom code/scripts")
+    return detected_issues or ["No major issues detected"]
+
+
+def review_suggestions(findings: list[dict]) -> list[dict]:
+    """Workflow.suggestions generated from the review findings."""
+    return [
+        {
+            "id": idx,
+            "priority": finding.get("severity", "medium").lower(),
+            "title": finding.get("message", "Code Quality Issue"),
+            "description": finding.get("recommendation", "Review and refactor"),
+            "impact": finding.get("impact", "Medium"),
+            "effort": finding.get("effort", "Medium"),
+            "benefits": ["Improved maintainability", "Better code quality"],
+            "implementation_steps": [finding.get("recommendation", "Review code")]
+        }
+        for idx, finding in enumerate(findings, 1)
+    ]
 
 
 def _grade(score: int) -> str:
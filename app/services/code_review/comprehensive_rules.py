@@ -245,7 +245,40 @@ def check_large_workflow(workflow: Dict, activities: List[Dict]) -> List[CodeRev
 def check_selector_optimization(workflow: Dict, activities: List[Dict]) -> List[CodeReviewFinding]:
     """UP-PERF-003: Selector Optimization"""
     findings = []
-    
+
+    selector_index = workflow.get('selectorIndex')
+    if selector_index is not None:
+        for entry in selector_index:
+            if entry.get('usesIdx'):
+                findings.append(CodeReviewFinding(
+                    category='Performance',
+                    severity='Minor',
+                    rule_id='UP-PERF-003',
+                    rule_name='Selector Optimization',
+                    message=f'Selector of "{entry.get("activity")}" relies on the positional idx attribute',
+                    description='idx depends on the order of matching elements on screen and breaks when the UI changes',
+                    recommendation='Replace idx with stable attributes such as id, name or aaname, or use an anchor',
+                    activity_name=entry.get('activity'),
+                    code_snippet=entry.get('selector'),
+                    impact='Performance & Reliability - Slow and brittle selector resolution',
+                    effort='Low'
+                ))
+
+        if len(selector_index) > 10:
+            findings.append(CodeReviewFinding(
+                category='Performance',
+                severity='Info',
+                rule_id='UP-PERF-003',
+                rule_name='Selector Optimization',
+                message=f'Workflow has {len(selector_index)} UI selectors - review selector performance',
+                description='Many UI selectors detected. Ensure selectors use stable attributes (idx should be avoided)',
+                recommendation='Use UiPath UI Explorer to validate selectors. Prefer ID and Name attributes over positional indices. Consider using Anchors for dynamic UIs',
+                impact='Performance - Slow selector resolution',
+                effort='Medium'
+            ))
+        return findings
+
+    # Workflows analyzed before selectors were indexed: guess from type names
     ui_activities = [
         act for act in activities
         if any(keyword in act.get('type', '').lower() for keyword in ['click', 'type', 'get']) or
@@ -0,0 +1,299 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from app.models.file import File
+from app.models.workflow import Workflow
+from app.models.workflow_dependency import WorkflowDependency
+
+
+def normalize_workflow_path(path: str) -> str:
+    """Comparable form of a project-relative workflow path (UiPath paths are case-insensitive)."""
+    path = path.strip().replace("\\", "/")
+    while path.startswith("./"):
+        path = path[2:]
+    return path.lstrip("/").lower()
+
+
+class WorkflowPathIndex:
+    """Resolves WorkflowFileName values to workflow ids within one project."""
+
+    def __init__(self, paths: dict[UUID, str]):
+        self._by_path: dict[str, UUID] = {}
+        by_name = defaultdict(list)
+        for workflow_id, path in paths.items():
+            normalized = normalize_workflow_path(path)
+            self._by_path[normalized] = workflow_id
+            by_name[normalized.rsplit("/", 1)[-1]].append(workflow_id)
+        # Single-file uploads only know the bare file name, so fall back
+        # to it when it is unambiguous
+        self._by_name = {name: ids[0] for name, ids in by_name.items() if len(ids) == 1}
+
+    def resolve(self, target_path: str) -> UUID | None:
+        normalized = normalize_workflow_path(target_path)
+        workflow_id = self._by_path.get(normalized)
+        if workflow_id is None:
+            workflow_id = self._by_name.get(normalized.rsplit("/", 1)[-1])
+        return workflow_id
+
+
+@dataclass
+class DependencyGraph:
+    weights: dict[UUID, int]
+    edges: dict[UUID, list[UUID]] = field(default_factory=dict)
+
+    def reverse_edges(self) -> dict[UUID, list[UUID]]:
+        reverse = defaultdict(list)
+        for source, targets in self.edges.items():
+            for target in targets:
+                reverse[target].append(source)
+        return reverse
+
+
+@dataclass
+class GraphRollup:
+    components: list[list[UUID]]          # SCCs, dependencies before dependents
+    component_of: dict[UUID, int]
+    transitive_scores: dict[UUID, int]    # own score + every distinct reachable workflow
+    reachable_counts: dict[UUID, int]     # workflows reachable through invokes, excluding itself
+    self_invoking: set[UUID] = field(default_factory=set)
+
+    @property
+    def cycles(self) -> list[list[UUID]]:
+        # A workflow that invokes itself is a cycle of one
+        return [c for c in self.components if len(c) > 1 or c[0] in self.self_invoking]
+
+    def in_cycle(self, workflow_id: UUID) -> bool:
+        return workflow_id in self.self_invoking or len(self.components[self.component_of[workflow_id]]) > 1
+
+
+def analyze_graph(graph: DependencyGraph) -> GraphRollup:
+    """
+    Tarjan's SCC algorithm with roll-ups folded into the same pass.
+
+    Tarjan emits a component only after every component reachable from it,
+    so each component's reachable set is its own bit OR'ed with the sets of
+    its successor components, all of which are already final. Reachable
+    sets are int bitsets over component indices, so shared callees
+    (diamonds) and cycles are counted once.
+    """
+    weights = graph.weights
+    edges = graph.edges
+
+    index_of: dict[UUID, int] = {}
+    lowlink: dict[UUID, int] = {}
+    on_stack: set[UUID] = set()
+    stack: list[UUID] = []
+    components: list[list[UUID]] = []
+    component_of: dict[UUID, int] = {}
+    reach: list[int] = []
+    component_weight: list[int] = []
+    self_invoking: set[UUID] = set()
+    counter = 0
+
+    for root in weights:
+        if root in index_of:
+            continue
+
+        # Iterative DFS: (node, iterator over its successors)
+        index_of[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(edges.get(root, ())))]
+
+        while work:
+            node, successors = work[-1]
+            advanced = False
+            for succ in successors:
+                if succ not in weights:
+                    continue
+                if succ == node:
+                    self_invoking.add(node)
+                if succ not in index_of:
+                    index_of[succ] = lowlink[succ] = counter
+                    counter += 1
+                    stack.append(succ)
+                    on_stack.add(succ)
+                    work.append((succ, iter(edges.get(succ, ()))))
+                    advanced = True
+                    break
+                if succ in on_stack and index_of[succ] < lowlink[node]:
+                    lowlink[node] = index_of[succ]
+            if advanced:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                if lowlink[node] < lowlink[parent]:
+                    lowlink[parent] = lowlink[node]
+
+            if lowlink[node] != index_of[node]:
+                continue
+
+            # node is the root of a component: pop it and fold its roll-up
+            component_index = len(components)
+            members = []
+            while True:
+                member = stack.pop()
+                on_stack.discard(member)
+                component_of[member] = component_index
+                members.append(member)
+                if member == node:
+                    break
+            components.append(members)
+
+            bits = 1 << component_index
+            for member in members:
+                for succ in edges.get(member, ()):
+                    succ_component = component_of.get(succ)
+                    if succ_component is not None and succ_component != component_index:
+                        bits |= reach[succ_component]
+            reach.append(bits)
+            component_weight.append(sum(weights[m] for m in members))
+
+    transitive_scores = {}
+    reachable_counts = {}
+    for component_index, members in enumerate(components):
+        bits = reach[component_index]
+        total = 0
+        size = 0
+        while bits:
+            low = bits & -bits
+            reached = low.bit_length() - 1
+            total += component_weight[reached]
+            size += len(components[reached])
+            bits ^= low
+        for member in members:
+            transitive_scores[member] = total
+            reachable_counts[member] = size - 1
+
+    return GraphRollup(
+        components=components,
+        component_of=component_of,
+        transitive_scores=transitive_scores,
+        reachable_counts=reachable_counts,
+        self_invoking=self_invoking,
+    )
+
+
+def reverse_dependents(graph: DependencyGraph, workflow_ids) -> set[UUID]:
+    """The given workflows plus every workflow that reaches one of them through invokes."""
+    reverse = graph.reverse_edges()
+    seen = set(workflow_ids)
+    pending = list(seen)
+    while pending:
+        node = pending.pop()
+        for caller in reverse.get(node, ()):
+            if caller not in seen:
+                seen.add(caller)
+                pending.append(caller)
+    return seen
+
+
+# ----------------------------------------------------------------------
+# Persistence
+# ----------------------------------------------------------------------
+
+def project_path_index(db: Session, project_id: UUID) -> WorkflowPathIndex:
+    rows = (
+        db.query(Workflow.workflow_id, File.file_name)
+        .join(File, File.file_id == Workflow.file_id)
+        .filter(Workflow.project_id == project_id)
+        .all()
+    )
+    return WorkflowPathIndex({workflow_id: file_name for workflow_id, file_name in rows})
+
+
+def build_dependency_rows(
+    project_id: UUID,
+    source_workflow_id: UUID,
+    invoked_files: list[str],
+    path_index: WorkflowPathIndex,
+) -> list[WorkflowDependency]:
+    rows = []
+    seen = set()
+    for target_path in invoked_files:
+        key = normalize_workflow_path(target_path)
+        if key in seen:
+            continue
+        seen.add(key)
+        rows.append(WorkflowDependency(
+            project_id=project_id,
+            source_workflow_id=source_workflow_id,
+            target_path=target_path,
+            target_workflow_id=path_index.resolve(target_path),
+        ))
+    return rows
+
+
+def replace_dependencies(
+    db: Session,
+    project_id: UUID,
+    source_workflow_id: UUID,
+    invoked_files: list[str],
+    path_index: WorkflowPathIndex,
+):
+    """Swap the outgoing edges of one workflow; the caller commits."""
+    db.query(WorkflowDependency).filter(
+        WorkflowDependency.source_workflow_id == source_workflow_id
+    ).delete(synchronize_session=False)
+    db.add_all(build_dependency_rows(project_id, source_workflow_id, invoked_files, path_index))
+
+
+def resolve_pending_dependencies(db: Session, project_id: UUID, path_index: WorkflowPathIndex) -> set[UUID]:
+    """Point unresolved edges at workflows that now exist; returns the callers that gained an edge."""
+    callers = set()
+    pending = (
+        db.query(WorkflowDependency)
+        .filter(
+            WorkflowDependency.project_id == project_id,
+            WorkflowDependency.target_workflow_id.is_(None),
+        )
+        .all()
+    )
+    for dependency in pending:
+        target = path_index.resolve(dependency.target_path)
+        if target is not None and target != dependency.source_workflow_id:
+            dependency.target_workflow_id = target
+            callers.add(dependency.source_workflow_id)
+    return callers
+
+
+def load_dependency_graph(db: Session, project_id: UUID) -> tuple[DependencyGraph, list[WorkflowDependency]]:
+    weights = {
+        workflow_id: score or 0
+        for workflow_id, score in (
+            db.query(Workflow.workflow_id, Workflow.complexity_score)
+            .filter(Workflow.project_id == project_id)
+            .all()
+        )
+    }
+    dependencies = (
+        db.query(WorkflowDependency)
+        .filter(WorkflowDependency.project_id == project_id)
+        .all()
+    )
+    edges = defaultdict(list)
+    for dependency in dependencies:
+        if dependency.target_workflow_id is not None:
+            edges[dependency.source_workflow_id].append(dependency.target_workflow_id)
+    return DependencyGraph(weights=weights, edges=dict(edges)), dependencies
+
+
+def apply_rollups(db: Session, rollup: GraphRollup, workflow_ids=None) -> int:
+    """Store transitive scores, optionally only for a subset of workflows; returns rows updated."""
+    targets = rollup.transitive_scores if workflow_ids is None else {
+        workflow_id: rollup.transitive_scores[workflow_id]
+        for workflow_id in workflow_ids
+        if workflow_id in rollup.transitive_scores
+    }
+    if targets:
+        db.bulk_update_mappings(Workflow, [
+            {"workflow_id": workflow_id, "transitive_complexity_score": score}
+            for workflow_id, score in targets.items()
+        ])
+    return len(targets)
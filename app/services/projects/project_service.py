@@ -1,8 +1,26 @@
 from sqlalchemy.orm import Session
 from uuid import UUID
 
+from app.models.code_review import CodeReview
 from app.models.project import Project
+from app.models.workflow import Workflow
 from app.schemas.project import ProjectCreate, ProjectUpdate
+from app.services.analysis.parse_cache import parse_workflow_cached
+from app.services.analysis.metrics import calculate_metrics
+from app.services.analysis.complexity import calculate_complexity
+from app.services.analysis.activity_mappings import calculate_migration_stats_from_counts, categorize_activity_counts
+from app.services.analysis.selectors import build_selector_index
+from app.services.code_review.code_review_service import evaluate_rules, review_suggestions, risk_indicators
+from app.services.projects.dependency_graph import (
+    analyze_graph,
+    apply_rollups,
+    build_dependency_rows,
+    load_dependency_graph,
+    project_path_index,
+    replace_dependencies,
+    resolve_pending_dependencies,
+    reverse_dependents,
+)
 
 
 def get_project_by_name(db: Session, user_id: UUID, name: str) -> Project | None:
@@ -62,11 +80,14 @@ def update_project(
 def delete_project(db: Session, project: Project):
     # Manually delete related records to avoid foreign key violations 
     # if DB constraints don't have CASCADE set up.
-    from app.models.workflow import Workflow
     from app.models.file import File
     from app.models.code_review import CodeReview
     
     # Get all workflow IDs for this project to clean up their reviews
+    from app.models.workflow_dependency import WorkflowDependency
+
+    db.query(WorkflowDependency).filter(WorkflowDependency.project_id == project.project_id).delete(synchronize_session=False)
+
     workflow_ids = [w.workflow_id for w in db.query(Workflow.workflow_id).filter(Workflow.project_id == project.project_id).all()]
     if workflow_ids:
         db.query(CodeReview).filter(CodeReview.workflow_id.in_(workflow_ids)).delete(synchronize_session=False)
@@ -76,3 +97,122 @@ def delete_project(db: Session, project: Project):
     
     db.delete(project)
     db.commit()
+
+
+def get_dependency_graph(db: Session, project: Project) -> dict:
+    graph, dependencies = load_dependency_graph(db, project.project_id)
+    rollup = analyze_graph(graph)
+
+    workflows = (
+        db.query(Workflow.workflow_id, Workflow.workflow_name, Workflow.complexity_score)
+        .filter(Workflow.project_id == project.project_id)
+        .all()
+    )
+
+    return {
+        "project_id": str(project.project_id),
+        "nodes": [
+            {
+                "workflow_id": str(workflow_id),
+                "workflow_name": name,
+                "complexity_score": score,
+                "transitive_complexity_score": rollup.transitive_scores.get(workflow_id),
+                "reachable_workflows": rollup.reachable_counts.get(workflow_id, 0),
+                "in_cycle": rollup.in_cycle(workflow_id),
+            }
+            for workflow_id, name, score in workflows
+        ],
+        "edges": [
+            {"source": str(d.source_workflow_id), "target": str(d.target_workflow_id), "path": d.target_path}
+            for d in dependencies
+            if d.target_workflow_id is not None
+        ],
+        "unresolved": [
+            {"source": str(d.source_workflow_id), "path": d.target_path}
+            for d in dependencies
+            if d.target_workflow_id is None
+        ],
+        "cycles": [[str(m) for m in cycle] for cycle in rollup.cycles],
+    }
+
+
+def reanalyze_workflow_file(
+    db: Session,
+    project: Project,
+    workflow: Workflow,
+    file_path: str,
+    content_hash: str,
+) -> dict:
+    """
+    Re-analyze one changed workflow file and re-score only what depends on it.
+
+    The changed workflow is re-parsed and re-reviewed (its CodeReview row,
+    risk indicators and suggestions are rebuilt) and its outgoing invoke
+    edges are replaced; transitive scores are then rewritten for it and its reverse
+    dependents. Other workflows in the project are left untouched.
+    """
+    parsed = parse_workflow_cached(file_path, workflow.platform, content_hash)
+    metrics = calculate_metrics(parsed)
+    complexity = calculate_complexity(metrics)
+    activity_counts = parsed.activity_counts()
+    stats = calculate_migration_stats_from_counts(activity_counts)
+
+    workflow.complexity_score = complexity.score
+    workflow.complexity_level = complexity.level
+    workflow.activity_count = metrics.activity_count
+    workflow.nesting_depth = metrics.nesting_depth
+    workflow.variable_count = metrics.variable_count
+    workflow.invoked_workflows = metrics.invoked_workflows
+    workflow.has_custom_code = metrics.has_custom_code
+    workflow.raw_activities = parsed.raw_activity_dicts()
+    workflow.raw_variables = parsed.raw_variable_dicts()
+    workflow.selector_index = build_selector_index(parsed)
+    workflow.activity_breakdown = categorize_activity_counts(activity_counts)
+    workflow.estimated_effort_hours = stats["totalEffortHours"]
+    workflow.compatibility_score = stats["compatibilityScore"]
+
+    review = evaluate_rules(workflow.platform, metrics)
+    findings = [finding for finding in review["findings"] if isinstance(finding, dict)]
+    db.query(CodeReview).filter(CodeReview.workflow_id == workflow.workflow_id).delete(synchronize_session=False)
+    db.add(CodeReview(workflow_id=workflow.workflow_id, **review))
+    workflow.risk_indicators = risk_indicators(metrics, findings)
+    workflow.suggestions = review_suggestions(findings)
+
+    path_index = project_path_index(db, project.project_id)
+    replace_dependencies(db, project.project_id, workflow.workflow_id, parsed.invoked_workflow_files(), path_index)
+    db.flush()
+
+    graph, _ = load_dependency_graph(db, project.project_id)
+    rollup = analyze_graph(graph)
+    affected = reverse_dependents(graph, {workflow.workflow_id})
+    apply_rollups(db, rollup, affected)
+    db.commit()
+
+    return {
+        "workflow_id": str(workflow.workflow_id),
+        "complexity_score": complexity.score,
+        "transitive_complexity_score": rollup.transitive_scores.get(workflow.workflow_id),
+        "rescored_workflows": sorted(str(w) for w in affected),
+    }
+
+
+def link_new_workflows(db: Session, project: Project, new_workflows: list) -> int:
+    """
+    Add invoke edges for freshly added workflows ([(workflow, invoked_files)]),
+    resolve older edges that now point at them, and re-score the affected part
+    of the graph. The caller commits; returns the number of re-scored workflows.
+    """
+    db.flush()
+    path_index = project_path_index(db, project.project_id)
+    new_ids = set()
+    for workflow, invoked_files in new_workflows:
+        # New workflows have no edges to replace
+        db.add_all(build_dependency_rows(project.project_id, workflow.workflow_id, invoked_files, path_index))
+        new_ids.add(workflow.workflow_id)
+    callers = resolve_pending_dependencies(db, project.project_id, path_index)
+    db.flush()
+
+    graph, _ = load_dependency_graph(db, project.project_id)
+    rollup = analyze_graph(graph)
+    affected = reverse_dependents(graph, new_ids | callers)
+    return apply_rollups(db, rollup, affected)
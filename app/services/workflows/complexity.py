@@ -1,33 +1,23 @@
-from lxml import etree
+from dataclasses import asdict
 
+from app.services.analysis.parse_cache import parse_workflow_cached
+from app.services.analysis.metrics import calculate_metrics
+from app.services.analysis.complexity import calculate_complexity
 
-def analyze_workflow(file_path: str) -> dict:
-    tree = etree.parse(file_path)
-    root = tree.getroot()
 
-    activities = root.findall(".//*")
-    variables = root.findall(".//*[@Name]")
-    depth = max(len(el.xpath("ancestor::*")) for el in activities)
+def analyze_workflow(file_path: str, platform: str, content_hash: str | None = None) -> dict:
+    """
+    Deterministic metrics and complexity for a stored workflow file.
 
-    score = (
-        len(activities) * 1
-        + depth * 3
-        + len(variables) * 1
-    )
-
-    if score < 20:
-        level = "Low"
-    elif score < 50:
-        level = "Medium"
-    elif score < 100:
-        level = "High"
-    else:
-        level = "Very High"
+    Uses the same parser, metrics and scoring as the upload analysis, so a
+    file gets identical numbers whichever endpoint analyses it.
+    """
+    parsed = parse_workflow_cached(file_path, platform, content_hash)
+    metrics = calculate_metrics(parsed)
+    complexity = calculate_complexity(metrics)
 
     return {
-        "activity_count": len(activities),
-        "variable_count": len(variables),
-        "nesting_depth": depth,
-        "complexity_score": score,
-        "complexity_level": level,
+        **asdict(metrics),
+        "complexity_score": complexity.score,
+        "complexity_level": complexity.level,
     }
@@ -0,0 +1,151 @@
+"""
+Cache-hit latency of /analyze/upload: the previous path (load the JSON
+result into a dict, copy it, set "cached" and let FastAPI encode it with
+jsonable_encoder + JSONResponse) against the stored JSON bytes with the
+flag spliced in, sent as a bytes Response.
+
+Measures the lookup through the rendered response body, on a SQLite
+file (or a --database-url) holding one completed analysis whose result
+has --suggestions entries.
+
+Run from the repository root:
+
+    python benchmarks/bench_cache_hit.py [--hits 500] [--suggestions 500] [--database-url sqlite:///...]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  (registers every table)
+from app.core import json_codec
+from app.core.database import Base
+from app.models.analysis_history import AnalysisHistory, AnalysisStatus
+from app.services.analysis.upload_pipeline import find_cached_response
+
+FILE_HASH = "ab" * 32
+
+
+def make_result(suggestions: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "workflowName": "Main.xaml",
+        "platform": "UiPath",
+        "complexityScore": 42.0,
+        "complexityLevel": "Medium",
+        "totalActivities": 1200,
+        "estimatedEffortHours": 310.5,
+        "compatibilityScore": 78,
+        "riskIndicators": ["High nesting depth (level 7)", "Contains custom code/scripts"],
+        "activityBreakdown": {"UI Automation": 420, "Data Manipulation": 510, "Control Flow": 270},
+        "analyzedAt": "2026-01-01T12:00:00",
+        "suggestions": [
+            {
+                "id": i,
+                "priority": "major",
+                "title": f"Activity {i}: High nesting depth detected",
+                "description": "Refactor into smaller workflows",
+                "impact": "Reduced readability",
+                "effort": "Medium",
+                "benefits": ["Improved maintainability", "Better code quality"],
+                "implementation_steps": ["Refactor into smaller workflows"],
+            }
+            for i in range(suggestions)
+        ],
+        "analysisMode": "full",
+    }
+
+
+def legacy_hit(db, user_id) -> bytes:
+    """The cache-hit path before results were served as stored bytes."""
+    existing_analysis = (
+        db.query(AnalysisHistory)
+        .filter(
+            AnalysisHistory.user_id == user_id,
+            AnalysisHistory.file_hash == FILE_HASH,
+            AnalysisHistory.status == AnalysisStatus.COMPLETED
+        )
+        .order_by(AnalysisHistory.created_at.desc())
+        .first()
+    )
+    cached_result = existing_analysis.result.copy() if existing_analysis.result else {}
+    cached_result["cached"] = True
+    if "workflow_id" in cached_result and "id" not in cached_result:
+        cached_result["id"] = cached_result["workflow_id"]
+    # What FastAPI does with a returned dict
+    return JSONResponse(content=jsonable_encoder(cached_result)).body
+
+
+def bytes_hit(db, user_id) -> bytes:
+    raw = find_cached_response(db, user_id, FILE_HASH, "full")
+    return Response(content=raw, media_type="application/json").body
+
+
+def measure(name: str, hit, engine, user_id, hits: int):
+    Session = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    samples = []
+    for _ in range(hits):
+        db = Session()
+        start = time.perf_counter()
+        body = hit(db, user_id)
+        samples.append((time.perf_counter() - start) * 1000)
+        db.close()
+
+    samples.sort()
+    p50 = statistics.median(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{name:<18} {p50:>8.3f} {p99:>8.3f} {len(body) / 1024:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--hits", type=int, default=500)
+    parser.add_argument("--suggestions", type=int, default=500)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        # Before: the default engine, standard-library JSON both ways
+        before = create_engine(database_url)
+        after = create_engine(
+            database_url,
+            json_serializer=json_codec.dumps_str,
+            json_deserializer=json_codec.loads,
+        )
+        Base.metadata.create_all(after)
+
+        user_id = uuid.uuid4()
+        db = sessionmaker(bind=after)()
+        db.add(AnalysisHistory(
+            user_id=user_id,
+            file_name="Main.xaml",
+            file_hash=FILE_HASH,
+            status=AnalysisStatus.COMPLETED,
+            result=make_result(args.suggestions),
+        ))
+        db.commit()
+        db.close()
+
+        print(f"{args.hits} cache hits, {args.suggestions} suggestions, {database_url.split(':')[0]}")
+        print(f"{'':<18} {'p50 ms':>8} {'p99 ms':>8} {'body KiB':>10}")
+        measure("dict + re-encode", legacy_hit, before, user_id, args.hits)
+        measure("stored bytes", bytes_hit, after, user_id, args.hits)
+
+        before.dispose()
+        after.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark the metrics-only parse (lxml parser target, no tree) against
+the full parse that builds the element tree.
+
+Each mode runs in its own subprocess so peak RSS covers libxml2's own
+allocations, which tracemalloc cannot see.
+
+Run from the repository root:
+
+    python benchmarks/bench_metrics_mode.py [--activities 50000]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODES = ("tree", "full", "metrics")
+
+
+def write_uipath(path: str, activities: int):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(
+            '<Activity x:Class="Main" '
+            'xmlns="http://schemas.microsoft.com/netfx/2009/xaml/activities" '
+            'xmlns:ui="http://schemas.uipath.com/workflow/activities" '
+            'xmlns:sap2010="http://schemas.microsoft.com/netfx/2010/xaml/activities/presentation" '
+            'xmlns:x="http://schemas.microsoft.com/winfx/2006/xaml">\n'
+            '<Sequence DisplayName="Main">\n'
+        )
+        for i in range(activities // 4):
+            f.write(
+                f'<Sequence DisplayName="Block {i}" sap2010:WorkflowViewState.IdRef="Sequence_{i}">'
+                f'<Sequence.Variables><Variable x:TypeArguments="x:String" Name="v{i}" /></Sequence.Variables>'
+                f'<If DisplayName="Check {i}" Condition="[v{i} = &quot;x&quot;]"><If.Then>'
+                f'<ui:LogMessage DisplayName="Log {i}" Message="[&quot;step {i}&quot;]" />'
+                f'</If.Then><If.Else>'
+                f'<ui:InvokeWorkflowFile DisplayName="Invoke {i}" WorkflowFileName="Sub{i % 7}.xaml" />'
+                f'</If.Else></If>'
+                f'<Assign DisplayName="Assign {i}"><Assign.To><OutArgument x:TypeArguments="x:String">[v{i}]</OutArgument></Assign.To></Assign>'
+                f'</Sequence>\n'
+            )
+        f.write('</Sequence>\n</Activity>\n')
+
+
+def run_child(mode: str, path: str, platform: str):
+    from lxml import etree
+    from app.services.analysis.parser import parse_workflow
+    from app.services.analysis.summary_parser import parse_workflow_summary
+    from app.services.analysis.metrics import calculate_metrics
+    from app.services.analysis.complexity import calculate_complexity
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if mode == "tree":
+        # Tree construction alone, the floor for any tree-based approach
+        result = etree.parse(path, etree.XMLParser(recover=True, remove_blank_text=True))
+        metrics = None
+    else:
+        if mode == "full":
+            # What the full upload does before code review
+            result = parse_workflow(path, platform, low_memory=False)
+            result.raw_activity_dicts()
+            result.raw_variable_dicts()
+        else:
+            result = parse_workflow_summary(path, platform)
+        metrics = calculate_metrics(result)
+        calculate_complexity(metrics)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(json.dumps({
+        "seconds": elapsed,
+        "rss_kb": peak - baseline,
+        "metrics": metrics.__dict__ if metrics else None,
+    }))
+
+
+def measure(mode: str, path: str, platform: str, repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", mode, path, platform],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    best = min(runs, key=lambda r: r["seconds"])
+    best["rss_kb"] = min(r["rss_kb"] for r in runs)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--activities", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "PATH", "PLATFORM"))
+    args = parser.parse_args()
+
+    if args.child:
+        import logging
+        logging.disable(logging.CRITICAL)
+        run_child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "Main.xaml")
+        write_uipath(path, args.activities)
+        print(f"Synthetic UiPath workflow: {os.path.getsize(path) // 1024} KB")
+
+        results = {mode: measure(mode, path, "UiPath", args.repeat) for mode in MODES}
+
+    for mode in MODES:
+        r = results[mode]
+        print(f"  {mode:8s}: {r['seconds'] * 1000:8.1f} ms  peak RSS +{r['rss_kb'] // 1024} MB")
+
+    assert results["full"]["metrics"] == results["metrics"]["metrics"], "metrics differ between modes"
+    for baseline in ("tree", "full"):
+        print(
+            f"  {baseline} / metrics: "
+            f"time {results[baseline]['seconds'] / results['metrics']['seconds']:.1f}x, "
+            f"peak RSS {max(results[baseline]['rss_kb'], 1) / max(results['metrics']['rss_kb'], 1):.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Count database round-trips per upload: the previous /analyze/uipath
+persistence (a commit, and often a refresh, after every row) against the
+single-transaction path it now uses.
+
+Statements and commits are counted with engine events. The default
+database is an in-memory SQLite; pass a PostgreSQL URL to count against
+the real backend (the tables are created if missing).
+
+Run from the repository root:
+
+    python benchmarks/bench_upload_roundtrips.py [--uploads 20] [--database-url sqlite://]
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  (registers every table)
+from app.core.database import Base
+from app.models.analysis_history import AnalysisHistory, AnalysisStatus
+from app.models.file import File as FileModel
+from app.models.project import Project
+from app.models.workflow import Workflow
+from app.services.analysis.activity_mappings import calculate_migration_stats_from_counts, categorize_activity_counts
+from app.services.analysis.complexity import calculate_complexity
+from app.services.analysis.metrics import calculate_metrics
+from app.services.analysis.parser import parse_workflow
+from app.services.analysis.upload_pipeline import UploadAnalysisPipeline, _persist_workflow_analysis
+from app.services.analysis.selectors import build_selector_index
+from app.services.analysis.upload_store import StoredUpload
+from app.services.code_review.code_review_service import run_code_review
+from app.services.projects.project_service import link_new_workflows
+
+XAML = """<Activity xmlns="http://schemas.microsoft.com/netfx/2009/xaml/activities"
+  xmlns:ui="http://schemas.uipath.com/workflow/activities"
+  xmlns:x="http://schemas.microsoft.com/winfx/2006/xaml">
+<Sequence DisplayName="Main">
+  <Sequence.Variables><Variable x:TypeArguments="x:String" Name="name" /></Sequence.Variables>
+  <If Condition="[name = &quot;x&quot;]"><If.Then><Sequence><Sequence><Sequence>
+    <ui:LogMessage Message="[name]" />
+  </Sequence></Sequence></Sequence></If.Then></If>
+  <ui:InvokeWorkflowFile WorkflowFileName="Process.xaml" />
+</Sequence>
+</Activity>
+"""
+
+
+class RoundTrips:
+    def __init__(self, engine):
+        self.statements = 0
+        self.commits = 0
+        event.listen(engine, "before_cursor_execute", self._statement)
+        event.listen(engine, "commit", self._commit)
+
+    def _statement(self, *args):
+        self.statements += 1
+
+    def _commit(self, *args):
+        self.commits += 1
+
+    def snapshot(self) -> tuple[int, int]:
+        return self.statements, self.commits
+
+
+def legacy_persist(db, analysis, user_id, file_name, stored, parsed, metrics, complexity) -> dict:
+    """The persistence sequence /analyze/uipath used before the single transaction."""
+    db.add(analysis)
+    db.commit()
+
+    project = db.query(Project).filter(Project.user_id == user_id).first()
+    if not project:
+        project = Project(user_id=user_id, name="Default Project", platform="UiPath")
+        db.add(project)
+        db.commit()
+        db.refresh(project)
+
+    db_file = FileModel(
+        project_id=project.project_id,
+        file_name=file_name,
+        file_path=str(stored.path),
+        file_size=stored.size,
+    )
+    db.add(db_file)
+    db.commit()
+    db.refresh(db_file)
+
+    workflow = Workflow(
+        project_id=project.project_id,
+        file_id=db_file.file_id,
+        platform="UiPath",
+        complexity_score=complexity.score,
+        complexity_level=complexity.level,
+        activity_count=len(parsed.activities),
+        nesting_depth=metrics.nesting_depth,
+        variable_count=metrics.variable_count,
+        invoked_workflows=metrics.invoked_workflows,
+        has_custom_code=metrics.has_custom_code,
+        raw_activities=parsed.raw_activity_dicts(),
+        raw_variables=parsed.raw_variable_dicts(),
+        selector_index=build_selector_index(parsed),
+    )
+    db.add(workflow)
+    link_new_workflows(db, project, [(workflow, parsed.invoked_workflow_files())])
+    db.commit()
+    db.refresh(workflow)
+
+    review = run_code_review(db, workflow, user_id)
+
+    activity_counts = parsed.activity_counts()
+    stats = calculate_migration_stats_from_counts(activity_counts)
+    workflow.activity_breakdown = categorize_activity_counts(activity_counts)
+    workflow.risk_indicators = [f.get("message") for f in review.findings] or ["No major issues detected"]
+    workflow.estimated_effort_hours = stats["totalEffortHours"]
+    workflow.compatibility_score = stats["compatibilityScore"]
+    workflow.suggestions = []
+    db.commit()
+
+    result = {
+        "id": str(workflow.workflow_id),
+        "analyzedAt": workflow.analyzed_at.isoformat() if workflow.analyzed_at else None,
+    }
+    analysis.result = result
+    analysis.status = AnalysisStatus.COMPLETED
+    db.commit()
+    return result
+
+
+def single_transaction_persist(db, analysis, user_id, file_name, stored, parsed, metrics, complexity) -> dict:
+    return _persist_workflow_analysis(
+        db, analysis, user_id, "UiPath", "full", file_name, stored,
+        uuid.uuid4(), UploadAnalysisPipeline("full").analyze_parsed(parsed, "UiPath"),
+    )
+
+
+def run(name: str, persist, database_url: str, uploads: int, path: str):
+    engine = create_engine(database_url)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    counter = RoundTrips(engine)
+
+    data = open(path, "rb").read()
+    stored = StoredUpload(path=path, size=len(data), content_hash=hashlib.sha256(data).hexdigest(), deduplicated=False)
+    parsed = parse_workflow(path, "UiPath")
+    metrics = calculate_metrics(parsed)
+    complexity = calculate_complexity(metrics)
+    user_id = uuid.uuid4()
+
+    per_upload = []
+    elapsed = 0.0
+    for i in range(uploads):
+        db = Session()
+        analysis = AnalysisHistory(
+            analysis_id=uuid.uuid4(),
+            user_id=user_id,
+            file_name=f"Main{i}.xaml",
+            file_path=path,
+            file_hash=stored.content_hash,
+            status=AnalysisStatus.IN_PROGRESS,
+        )
+        before = counter.snapshot()
+        start = time.perf_counter()
+        persist(db, analysis, user_id, f"Main{i}.xaml", stored, parsed, metrics, complexity)
+        elapsed += time.perf_counter() - start
+        after = counter.snapshot()
+        per_upload.append((after[0] - before[0], after[1] - before[1]))
+        db.close()
+
+    engine.dispose()
+    statements = sum(s for s, _ in per_upload) / uploads
+    commits = sum(c for _, c in per_upload) / uploads
+    print(
+        f"{name:<20} {statements:>10.1f} {commits:>8.1f} {statements + commits:>12.1f}"
+        f" {elapsed / uploads * 1000:>10.2f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--uploads", type=int, default=20)
+    parser.add_argument("--database-url", default="sqlite://")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "Main.xaml")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(XAML)
+
+        print(f"{args.uploads} uploads against {args.database_url.split('://')[0]}, averages per upload")
+        print(f"{'':<20} {'statements':>10} {'commits':>8} {'round-trips':>12} {'ms':>10}")
+        run("commit per row", legacy_persist, args.database_url, args.uploads, path)
+        run("single transaction", single_transaction_persist, args.database_url, args.uploads, path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark /api/v1/workflows/analyze: the old standalone analyzer
+(etree.parse + findall + xpath("ancestor::*") per element) against the
+shared parser / metrics pipeline it now uses.
+
+Run from the repository root:
+
+    python benchmarks/bench_workflow_analyze.py [--nodes 100000] [--depth 60]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lxml import etree
+
+from app.core.config import settings
+from app.services.workflows.complexity import analyze_workflow
+
+XAML_NS = "http://schemas.microsoft.com/netfx/2009/xaml/activities"
+LEAVES = ("Assign", "LogMessage", "Click", "TypeInto", "InvokeWorkflowFile", "If")
+
+
+def legacy_analyze_workflow(file_path: str) -> dict:
+    tree = etree.parse(file_path)
+    root = tree.getroot()
+
+    activities = root.findall(".//*")
+    variables = root.findall(".//*[@Name]")
+    depth = max(len(el.xpath("ancestor::*")) for el in activities)
+
+    score = len(activities) * 1 + depth * 3 + len(variables) * 1
+    if score < 20:
+        level = "Low"
+    elif score < 50:
+        level = "Medium"
+    elif score < 100:
+        level = "High"
+    else:
+        level = "Very High"
+
+    return {
+        "activity_count": len(activities),
+        "variable_count": len(variables),
+        "nesting_depth": depth,
+        "complexity_score": score,
+        "complexity_level": level,
+    }
+
+
+def write_deep_workflow(path: str, nodes: int, depth: int):
+    """A spine of nested Sequences `depth` levels deep with leaves spread over every level."""
+    per_level = max(1, (nodes - depth) // depth)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'<Activity xmlns="{XAML_NS}" Name="Main">\n')
+        for level in range(depth):
+            f.write(f'<Sequence DisplayName="Level {level}">\n')
+            for i in range(per_level):
+                tag = LEAVES[i % len(LEAVES)]
+                name = f' Name="v{level}_{i}"' if i % 50 == 0 else ""
+                f.write(f'<{tag} DisplayName="{tag} {i}"{name} />\n')
+        f.write("</Sequence>\n" * depth)
+        f.write("</Activity>\n")
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=100_000)
+    parser.add_argument("--depth", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Measure parsing, not the parse cache
+    settings.parse_cache_enabled = False
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "deep.xaml")
+        write_deep_workflow(path, args.nodes, args.depth)
+        size_kb = os.path.getsize(path) // 1024
+        print(f"Synthetic workflow: ~{args.nodes} nodes, depth {args.depth}, {size_kb} KB")
+
+        legacy_time, legacy = timed(lambda: legacy_analyze_workflow(path), args.repeat)
+        new_time, new = timed(lambda: analyze_workflow(path, "UiPath"), args.repeat)
+
+    print(f"  legacy analyzer : {legacy_time * 1000:9.1f} ms  {legacy}")
+    print(f"  shared pipeline : {new_time * 1000:9.1f} ms  {new}")
+    print(f"  speedup         : {legacy_time / new_time:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
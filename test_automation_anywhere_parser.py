@@ -0,0 +1,146 @@
+"""
+Tests for the Automation Anywhere parsers.
+
+Covers A360 JSON bot exports (nested children / branches, variables),
+legacy .atmx XML tasks, the metrics-only path, and checks that the JSON
+parser's working memory stays flat as exports grow.
+
+Run with:  python test_automation_anywhere_parser.py   (or via pytest)
+"""
+
+import json
+import os
+import tempfile
+import tracemalloc
+
+from app.services.analysis.metrics import calculate_metrics
+from app.services.analysis.parser import parse_workflow
+from app.services.analysis.platform_detector import detect_platform
+from app.services.analysis.summary_parser import parse_workflow_summary
+
+A360_BOT = {
+    "triggers": [],
+    "nodes": [
+        {"uid": "1", "commandName": "messageBox", "packageName": "MessageBox", "disabled": False,
+         "attributes": [{"name": "content", "value": {"type": "STRING", "string": "Hi"}}]},
+        {"uid": "2", "commandName": "if", "packageName": "If",
+         "children": [
+             {"uid": "3", "commandName": "loop.commands.start", "packageName": "Loop",
+              "children": [{"uid": "4", "commandName": "runTask", "packageName": "TaskBot"}]},
+         ],
+         "branches": [
+             {"uid": "5", "commandName": "else", "packageName": "If",
+              "children": [{"uid": "6", "commandName": "messageBox", "packageName": "MessageBox"}]},
+         ]},
+        {"uid": "7", "commandName": "executeScript", "packageName": "VBScript"},
+    ],
+    "variables": [
+        {"name": "prompt-assignment", "type": "STRING", "readOnly": False},
+        {"name": "counter", "type": "NUMBER", "defaultValue": {"type": "NUMBER", "number": "0"}},
+    ],
+    "packages": [{"name": "MessageBox", "version": "2.4.0"}],
+}
+
+ATMX_TASK = """<?xml version="1.0" encoding="utf-8"?>
+<ScriptFile Version="11.3.0.0">
+  <Variables>
+    <Variable Name="vFile" Type="Value" />
+    <Variable Name="vList" Type="List" />
+  </Variables>
+  <Commands>
+    <Command Name="OpenProgram" Description="Open Excel" />
+    <Command Name="IfCondition">
+      <Command Name="LoopList">
+        <Command Name="RunScript" />
+      </Command>
+    </Command>
+    <Command Name="MessageBox" />
+  </Commands>
+</ScriptFile>
+"""
+
+
+def _write(content: str, suffix: str) -> str:
+    with tempfile.NamedTemporaryFile("w", suffix=suffix, delete=False, encoding="utf-8") as f:
+        f.write(content)
+    return f.name
+
+
+def test_a360_json_bot():
+    path = _write(json.dumps(A360_BOT, indent=2), ".json")
+    try:
+        assert detect_platform(path) == "Automation Anywhere"
+        parsed = parse_workflow(path, "Automation Anywhere")
+
+        assert list(parsed.activities) == [
+            "MessageBox.messageBox", "If.if", "Loop.loop.commands.start",
+            "TaskBot.runTask", "If.else", "MessageBox.messageBox", "VBScript.executeScript",
+        ], list(parsed.activities)
+        assert list(parsed.variables) == ["prompt-assignment", "counter"]
+        assert parsed.nesting_depth == 3
+        assert [v["type"] for v in parsed.raw_variable_dicts()] == ["STRING", "NUMBER"]
+
+        metrics = calculate_metrics(parsed)
+        assert metrics.activity_count == 7 and metrics.has_custom_code
+
+        summary = parse_workflow_summary(path, "Automation Anywhere")
+        assert summary.activity_counts() == parsed.activity_counts()
+        assert summary.nesting_depth == 3 and summary.variable_count == 2
+    finally:
+        os.unlink(path)
+    print("✅ A360 JSON bot parsed with nested children and branches")
+
+
+def test_legacy_atmx_task():
+    path = _write(ATMX_TASK, ".atmx")
+    try:
+        parsed = parse_workflow(path, "Automation Anywhere")
+        assert list(parsed.activities) == ["OpenProgram", "IfCondition", "LoopList", "RunScript", "MessageBox"]
+        assert [a["displayName"] for a in parsed.raw_activity_dicts()][0] == "Open Excel"
+        assert list(parsed.variables) == ["vFile", "vList"]
+        assert parsed.nesting_depth == 3
+        assert calculate_metrics(parsed).has_custom_code
+    finally:
+        os.unlink(path)
+    print("✅ Legacy .atmx task parsed")
+
+
+def _write_large_bot(path: str, blocks: int):
+    node = {"commandName": "if", "packageName": "If", "children": [
+        {"commandName": "messageBox", "packageName": "MessageBox",
+         "attributes": [{"name": "content", "value": {"type": "STRING", "string": "x" * 64}}]},
+    ]}
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"nodes": [')
+        for i in range(blocks):
+            if i:
+                f.write(",")
+            f.write(json.dumps(node))
+        f.write('], "variables": []}')
+
+
+def test_json_parse_memory_is_bounded():
+    sizes = [2_000, 8_000, 32_000]
+    working = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for blocks in sizes:
+            path = os.path.join(tmp, f"bot_{blocks}.json")
+            _write_large_bot(path, blocks)
+            tracemalloc.start()
+            try:
+                parsed = parse_workflow(path, "Automation Anywhere")
+                current, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            assert len(parsed.activities) == 2 * blocks
+            working.append(peak - current)
+
+    # Working memory must not scale with the export (16x more nodes)
+    assert working[-1] < working[0] * 1.5 + 256 * 1024, working
+    print(f"✅ JSON working memory stays flat: {[w // 1024 for w in working]} KB")
+
+
+if __name__ == "__main__":
+    test_a360_json_bot()
+    test_legacy_atmx_task()
+    test_json_parse_memory_is_bounded()
@@ -0,0 +1,252 @@
+"""
+Tests for multi-file batch uploads streamed as NDJSON.
+
+Streams a batch of workflows and checks that every file gets one line
+between the "batch" and "summary" lines, that each completed file is
+stored as its own analysis under one default Project, that an upload
+that cannot be read fails alone, that a repeated batch is answered with
+the cached bytes, and that the quota is checked for the batch as a whole.
+Project archives go through the same pipeline: their workflow lines
+carry the fields of a single upload, and an archive over the quota is
+refused before anything is extracted.
+
+Run with:  python test_batch_upload.py   (or via pytest)
+"""
+
+import io
+import os
+import asyncio
+import uuid
+import datetime
+import tempfile
+import zipfile
+from pathlib import Path
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  (registers every table)
+from app.core import json_codec
+from app.core.database import Base
+from app.core.quota_check import check_quota
+from app.models.analysis_history import AnalysisHistory, AnalysisStatus
+from app.models.project import Project
+from app.models.usage_tracking import UsageTracking
+from app.models.workflow import Workflow
+from app.routes import analysis_project
+from app.services.analysis import upload_pipeline
+from app.services.analysis.upload_pipeline import UploadAnalysisPipeline
+from app.services.analysis.upload_store import UploadStore
+
+XAML = """<Activity xmlns="http://schemas.microsoft.com/netfx/2009/xaml/activities"
+  xmlns:ui="http://schemas.uipath.com/workflow/activities">
+<Sequence DisplayName="{name}">
+  <Assign DisplayName="Set name" />
+  <ui:LogMessage Message="[name]" />
+  <ui:InvokeWorkflowFile WorkflowFileName="{invokes}" />
+</Sequence>
+</Activity>
+"""
+
+
+def _context():
+    return {
+        "user": SimpleNamespace(user_id=uuid.uuid4()),
+        "api_key": SimpleNamespace(api_key_id=uuid.uuid4()),
+        "subscription": SimpleNamespace(subscription_id=uuid.uuid4(), plan=SimpleNamespace(max_file_size_mb=None)),
+    }
+
+
+class _DroppedUpload(io.RawIOBase):
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        raise OSError("Connection reset while reading the upload")
+
+
+def _uploads() -> list[tuple[str, io.IOBase]]:
+    return [
+        ("Main.xaml", io.BytesIO(XAML.format(name="Main", invokes="Process.xaml").encode())),
+        ("Process.xaml", io.BytesIO(XAML.format(name="Process", invokes="Close.xaml").encode())),
+        ("Dropped.xaml", _DroppedUpload()),
+    ]
+
+
+def _sessions(tmp: str):
+    engine = create_engine(
+        f"sqlite:///{os.path.join(tmp, 'batch.db')}",
+        json_serializer=json_codec.dumps_str,
+        json_deserializer=json_codec.loads,
+    )
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, autoflush=False)
+
+
+def _stream(tmp: str, context: dict) -> tuple[list[bytes], object]:
+    Session = _sessions(tmp)
+    store = upload_pipeline.upload_store
+    upload_pipeline.upload_store = UploadStore(os.path.join(tmp, "store"), spool_bytes=1024 * 1024)
+    try:
+        db = Session()
+        lines = list(UploadAnalysisPipeline("full").stream_batch(db, _uploads(), context, session_factory=Session))
+        db.close()
+    finally:
+        upload_pipeline.upload_store = store
+    return lines, Session
+
+
+def test_batch_streams_one_line_per_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        context = _context()
+        lines, Session = _stream(tmp, context)
+        assert all(line.endswith(b"\n") for line in lines)
+        payloads = [json_codec.loads(line) for line in lines]
+
+        assert payloads[0] == {"type": "batch", "fileCount": 3, "analysisMode": "full"}
+        assert payloads[-1]["type"] == "summary"
+        assert (payloads[-1]["completed"], payloads[-1]["cached"], payloads[-1]["failed"]) == (2, 0, 1)
+
+        files = {payload["fileName"]: payload for payload in payloads[1:-1]}
+        assert sorted(payload["index"] for payload in files.values()) == [0, 1, 2]
+        assert files["Dropped.xaml"]["status"] == "failed" and "analysisId" not in files["Dropped.xaml"]
+        main = files["Main.xaml"]
+        assert main["status"] == "completed" and main["result"]["workflowName"] == "Main.xaml"
+
+        db = Session()
+        assert db.query(Project).count() == 1
+        assert db.query(Workflow).count() == 2
+        statuses = {row.file_name: row.status for row in db.query(AnalysisHistory)}
+        assert statuses["Main.xaml"] == statuses["Process.xaml"] == AnalysisStatus.COMPLETED
+        assert db.get(AnalysisHistory, uuid.UUID(main["analysisId"])).result["id"] == main["result"]["id"]
+        db.close()
+    print("✅ Every file gets a line, and completed files share one default Project")
+
+
+def test_repeat_batch_is_served_from_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        context = _context()
+        first, _ = _stream(tmp, context)
+        second, Session = _stream(tmp, context)
+
+        completed = {
+            payload["fileName"]: payload
+            for payload in map(json_codec.loads, first[1:-1])
+            if payload["status"] == "completed"
+        }
+        cached = [json_codec.loads(line) for line in second[1:-1]]
+        cached = {payload["fileName"]: payload for payload in cached if payload["status"] == "completed"}
+        assert cached.keys() == completed.keys()
+        for file_name, payload in cached.items():
+            assert payload["result"] == {**completed[file_name]["result"], "cached": True}
+        assert json_codec.loads(second[-1])["cached"] == 2
+
+        db = Session()
+        assert db.query(Workflow).count() == 2
+        db.close()
+    print("✅ A repeated batch is answered with the cached results")
+
+
+def test_quota_is_checked_for_the_whole_batch():
+    engine = create_engine("sqlite://")
+    UsageTracking.__table__.create(engine)
+    db = sessionmaker(bind=engine)()
+    api_key = SimpleNamespace(api_key_id=uuid.uuid4())
+    db.add(UsageTracking(
+        usage_id=uuid.uuid4(),
+        user_id=uuid.uuid4(),
+        api_key_id=api_key.api_key_id,
+        request_timestamp=datetime.datetime.utcnow(),
+    ))
+    db.commit()
+
+    subscription = SimpleNamespace(plan=SimpleNamespace(max_analyses_per_month=5))
+    check_quota(subscription, api_key, db)
+    check_quota(subscription, api_key, db, requested=4)
+    try:
+        check_quota(subscription, api_key, db, requested=5)
+        assert False, "the batch does not fit"
+    except HTTPException as e:
+        assert e.status_code == 403
+
+    check_quota(SimpleNamespace(plan=SimpleNamespace(max_analyses_per_month=None)), api_key, db, requested=1000)
+    print("✅ The quota is checked for every file of the batch")
+
+
+async def _collect(response) -> list[dict]:
+    return [json_codec.loads(line) async for line in response.body_iterator]
+
+
+def _upload_project(tmp: str, context: dict, Session) -> list[dict]:
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("Demo/project.json", '{"name": "Demo", "main": "Main.xaml"}')
+        zf.writestr("Demo/Main.xaml", XAML.format(name="Main", invokes="Process.xaml"))
+        zf.writestr("Demo/Process.xaml", XAML.format(name="Process", invokes="Close.xaml"))
+    archive.seek(0)
+
+    saved = analysis_project.SessionLocal, analysis_project.upload_store, os.getcwd()
+    analysis_project.SessionLocal = Session
+    analysis_project.upload_store = UploadStore(os.path.join(tmp, "store"), spool_bytes=1024 * 1024)
+    os.chdir(tmp)
+    db = Session()
+    try:
+        upload = SimpleNamespace(filename="Demo.zip", file=archive)
+        response = analysis_project.upload_and_analyze_project(upload, context, db)
+        return asyncio.run(_collect(response))
+    finally:
+        db.close()
+        analysis_project.SessionLocal, analysis_project.upload_store = saved[:2]
+        os.chdir(saved[2])
+
+
+def test_project_archive_matches_single_uploads():
+    with tempfile.TemporaryDirectory() as tmp:
+        context = _context()
+        context["subscription"].plan.max_analyses_per_month = None
+        lines, Session = _stream(tmp, context)
+        single = next(
+            payload["result"] for payload in map(json_codec.loads, lines[1:-1])
+            if payload["fileName"] == "Main.xaml"
+        )
+
+        payloads = _upload_project(tmp, context, Session)
+        assert [payload["type"] for payload in payloads] == ["project", "workflow", "workflow", "summary"]
+        assert payloads[-1]["committed"] and payloads[-1]["completed"] == 2
+
+        workflows = {payload["workflowName"]: payload for payload in payloads[1:-1]}
+        assert workflows["Main.xaml"]["isMain"] and not workflows["Process.xaml"]["isMain"]
+        main = workflows["Main.xaml"]
+        assert set(single) <= set(main), set(single) - set(main)
+        for field in ("riskIndicators", "suggestions", "complexityScore", "estimatedEffortHours"):
+            assert main[field] == single[field], field
+
+        db = Session()
+        assert db.query(Workflow).filter(Workflow.workflow_name == "Main.xaml").one().suggestions == main["suggestions"]
+        db.close()
+    print("✅ Archive workflows carry the same fields as single uploads")
+
+
+def test_project_archive_quota_is_checked_before_extracting():
+    with tempfile.TemporaryDirectory() as tmp:
+        context = _context()
+        context["subscription"].plan.max_analyses_per_month = 1
+        try:
+            _upload_project(tmp, context, _sessions(tmp))
+            assert False, "two workflows do not fit a quota of one"
+        except HTTPException as e:
+            assert e.status_code == 403
+        store = Path(tmp) / "store"
+        assert not store.exists() or not any(path.is_file() for path in store.rglob("*"))
+        assert not any((Path(tmp) / "uploads").iterdir())
+    print("✅ An archive over the quota is refused before anything is extracted")
+
+
+if __name__ == "__main__":
+    test_batch_streams_one_line_per_file()
+    test_repeat_batch_is_served_from_cache()
+    test_quota_is_checked_for_the_whole_batch()
+    test_project_archive_matches_single_uploads()
+    test_project_archive_quota_is_checked_before_extracting()
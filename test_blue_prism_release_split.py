@@ -0,0 +1,145 @@
+"""
+Tests for splitting Blue Prism releases into per-process workflows.
+
+Builds a release bundling processes and business objects (one of them in
+a default namespace), splits it, and checks every unit parses exactly like
+the same subtree inside the release, with its own nesting depth. Also
+stores a release in metrics mode and checks every unit is rolled up.
+
+Run with:  python test_blue_prism_release_split.py   (or via pytest)
+"""
+
+import io
+import os
+import uuid
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+from lxml import etree
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  (registers every table)
+from app.core import json_codec
+from app.core.database import Base
+from app.models.workflow import Workflow
+from app.services.analysis import upload_pipeline
+from app.services.analysis.parser import parse_workflow
+from app.services.analysis.platform_detector import detect_platform
+from app.services.analysis.release_splitter import split_blue_prism_release
+from app.services.analysis.upload_pipeline import UploadAnalysisPipeline
+from app.services.analysis.upload_store import UploadStore
+
+PROCESS = """<{kind} id="{i}" name="{name}"{ns}><process name="{name}" version="1.0">
+<stage stageid="a" name="Start" type="Start" />
+<stage stageid="b" name="Work" type="Action"><action name="Go" /></stage>
+{extra}
+<stage stageid="z" name="End" type="End" />
+</process></{kind}>"""
+
+
+def _release() -> str:
+    units = [
+        PROCESS.format(kind="process", i=0, name="Invoice Intake", ns="", extra=""),
+        PROCESS.format(
+            kind="process", i=1, name="Payments/Run", ns="",
+            extra='<stage name="Loop"><stage name="Inner"><stage name="Deep" /></stage></stage>'
+                  '<variable name="Amount" type="number" />',
+        ),
+        PROCESS.format(
+            kind="object", i=2, name="SAP Object",
+            ns=' xmlns="http://www.blueprism.co.uk/product/process"', extra="",
+        ),
+    ]
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<bpr:release xmlns:bpr="http://www.blueprism.co.uk/product/release">'
+        '<bpr:name>Finance</bpr:name><bpr:contents count="3">'
+        + "".join(units)
+        + "</bpr:contents></bpr:release>"
+    )
+
+
+def test_release_is_split_per_process():
+    with tempfile.TemporaryDirectory() as tmp:
+        release = os.path.join(tmp, "finance.bprelease")
+        Path(release).write_text(_release(), encoding="utf-8")
+        units = split_blue_prism_release(release, Path(tmp) / "units")
+
+        assert [(u.name, u.kind) for u in units] == [
+            ("Invoice Intake", "process"), ("Payments/Run", "process"), ("SAP Object", "object"),
+        ]
+        assert [Path(u.file_path).name for u in units] == [
+            "000_Invoice_Intake.bpprocess", "001_Payments_Run.bpprocess", "002_SAP_Object.bpobject",
+        ]
+
+        # Each unit parses exactly like the same subtree inside the release
+        tree = etree.parse(release)
+        subtrees = tree.getroot()[1]
+        for unit, subtree in zip(units, subtrees):
+            assert detect_platform(unit.file_path) == "Blue Prism"
+            expected = os.path.join(tmp, "expected.xml")
+            Path(expected).write_bytes(etree.tostring(subtree))
+            parsed = parse_workflow(unit.file_path, "Blue Prism")
+            reference = parse_workflow(expected, "Blue Prism")
+            assert parsed.raw_activity_dicts() == reference.raw_activity_dicts()
+            assert parsed.raw_variable_dicts() == reference.raw_variable_dicts()
+            assert parsed.nesting_depth == reference.nesting_depth
+
+        depths = [parse_workflow(u.file_path, "Blue Prism").nesting_depth for u in units]
+        assert depths == [3, 4, 3], depths
+        # The namespaced object keeps its stages out of exact-tag matches
+        assert len(parse_workflow(units[2].file_path, "Blue Prism").activities) == 0
+    print(f"✅ Release split into {len(units)} units with per-unit depths {depths}")
+
+
+def test_single_process_export_is_not_split():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "intake.bpprocess")
+        Path(path).write_text(
+            PROCESS.format(kind="process", i=0, name="Intake", ns="", extra=""), encoding="utf-8"
+        )
+        assert split_blue_prism_release(path, Path(tmp) / "units") == []
+        assert not (Path(tmp) / "units").exists()
+    print("✅ Single-process exports are left whole")
+
+
+def test_metrics_release_units_are_rolled_up():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(tmp, 'release.db')}",
+            json_serializer=json_codec.dumps_str,
+            json_deserializer=json_codec.loads,
+        )
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        context = {
+            "user": SimpleNamespace(user_id=uuid.uuid4()),
+            "api_key": SimpleNamespace(api_key_id=uuid.uuid4()),
+            "subscription": SimpleNamespace(subscription_id=uuid.uuid4(), plan=SimpleNamespace(max_file_size_mb=None)),
+        }
+
+        store = upload_pipeline.upload_store
+        upload_pipeline.upload_store = UploadStore(os.path.join(tmp, "store"), spool_bytes=1024 * 1024)
+        try:
+            db = Session()
+            uploads = [("finance.bprelease", io.BytesIO(_release().encode()))]
+            list(UploadAnalysisPipeline("metrics").stream_batch(db, uploads, context, session_factory=Session))
+            db.close()
+        finally:
+            upload_pipeline.upload_store = store
+
+        db = Session()
+        workflows = db.query(Workflow).all()
+        assert len(workflows) == 3
+        # No unit invokes another, so each one's roll-up is its own score
+        assert all(w.transitive_complexity_score == w.complexity_score for w in workflows)
+        db.close()
+    print("✅ Metrics-mode release units get roll-ups")
+
+
+if __name__ == "__main__":
+    test_release_is_split_per_process()
+    test_single_process_export_is_not_split()
+    test_metrics_release_units_are_rolled_up()
@@ -0,0 +1,94 @@
+"""
+Tests for cache hits served as stored JSON bytes.
+
+Stores completed analyses and checks that a hit returns the stored JSON
+with "cached": true spliced in, that a metrics-only result never answers
+a full request, and that legacy rows (workflow_id instead of id, or no
+result) are still rewritten correctly.
+
+Run with:  python test_cached_response.py   (or via pytest)
+"""
+
+import uuid
+import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  (resolves the analysis_history foreign keys)
+from app.core import json_codec
+from app.models.analysis_history import AnalysisHistory, AnalysisStatus
+from app.services.analysis.upload_pipeline import find_cached_response
+
+FILE_HASH = "cd" * 32
+
+
+def _session():
+    engine = create_engine("sqlite://", json_serializer=json_codec.dumps_str, json_deserializer=json_codec.loads)
+    AnalysisHistory.__table__.create(engine)
+    return sessionmaker(bind=engine, autoflush=False)()
+
+
+def _add(db, user_id, result, minutes_ago: int = 0):
+    db.add(AnalysisHistory(
+        analysis_id=uuid.uuid4(),
+        user_id=user_id,
+        file_name="Main.xaml",
+        file_hash=FILE_HASH,
+        status=AnalysisStatus.COMPLETED,
+        result=result,
+        created_at=datetime.datetime(2026, 1, 1, 12, 0) - datetime.timedelta(minutes=minutes_ago),
+    ))
+    db.commit()
+
+
+def test_hit_is_the_stored_json_marked_cached():
+    db = _session()
+    user_id = uuid.uuid4()
+    result = {
+        "id": str(uuid.uuid4()),
+        "analysisMode": "full",
+        "suggestions": [{"id": i, "title": "Reduce nesting", "impact": "Medium"} for i in range(200)],
+    }
+    _add(db, user_id, result)
+
+    raw = find_cached_response(db, user_id, FILE_HASH, "full")
+    assert isinstance(raw, bytes) and raw.startswith(b'{"cached":true,')
+    assert json_codec.loads(raw) == {**result, "cached": True}
+    assert find_cached_response(db, uuid.uuid4(), FILE_HASH, "full") is None
+    print("✅ A hit is the stored JSON with the cached flag spliced in")
+
+
+def test_metrics_result_never_answers_full_request():
+    db = _session()
+    user_id = uuid.uuid4()
+    _add(db, user_id, {"id": "full", "analysisMode": "full"}, minutes_ago=10)
+    _add(db, user_id, {"id": "metrics", "analysisMode": "metrics"})
+
+    assert json_codec.loads(find_cached_response(db, user_id, FILE_HASH, "full"))["id"] == "full"
+    assert json_codec.loads(find_cached_response(db, user_id, FILE_HASH, "metrics"))["id"] == "metrics"
+
+    other = uuid.uuid4()
+    _add(db, other, {"id": "metrics", "analysisMode": "metrics"})
+    assert find_cached_response(db, other, FILE_HASH, "full") is None
+    print("✅ A metrics-only result never answers a full request")
+
+
+def test_legacy_rows():
+    db = _session()
+    user_id = uuid.uuid4()
+    _add(db, user_id, {"workflow_id": "w-1", "cached": True})
+    assert json_codec.loads(find_cached_response(db, user_id, FILE_HASH, "full")) == {
+        "workflow_id": "w-1", "id": "w-1", "cached": True,
+    }
+
+    empty = uuid.uuid4()
+    _add(db, empty, None)
+    assert find_cached_response(db, empty, FILE_HASH, "full") == b'{"cached":true}'
+    print("✅ Legacy rows are rewritten")
+
+
+if __name__ == "__main__":
+    test_hit_is_the_stored_json_marked_cached()
+    test_metrics_result_never_answers_full_request()
+    test_legacy_rows()
@@ -0,0 +1,113 @@
+"""
+Tests for the invoke graph roll-ups.
+
+Builds small graphs and checks that cycles are reported (including a
+workflow that invokes itself) and that transitive scores count shared
+callees and cycle members once. Also re-analyzes a changed workflow file
+and checks that its review, risk indicators and suggestions are rebuilt.
+
+Run with:  python test_dependency_graph.py   (or via pytest)
+"""
+
+import os
+import uuid
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  (registers every table)
+from app.core import json_codec
+from app.core.database import Base
+from app.models.code_review import CodeReview
+from app.models.project import Project
+from app.models.workflow import Workflow
+from app.services.projects.dependency_graph import DependencyGraph, analyze_graph
+from app.services.projects.project_service import reanalyze_workflow_file
+
+NESTED_XAML = """<Activity xmlns="http://schemas.microsoft.com/netfx/2009/xaml/activities">
+{open}<Assign DisplayName="Deep" />{close}
+</Activity>
+"""
+
+
+def _ids(count: int) -> list[uuid.UUID]:
+    return [uuid.uuid4() for _ in range(count)]
+
+
+def test_cycles_include_self_invocation():
+    a, b, c, d = _ids(4)
+    graph = DependencyGraph(
+        weights={a: 1, b: 2, c: 4, d: 8},
+        edges={a: [b], b: [a, c], d: [d]},
+    )
+    rollup = analyze_graph(graph)
+
+    cycles = sorted(sorted(map(str, cycle)) for cycle in rollup.cycles)
+    assert cycles == sorted([sorted([str(a), str(b)]), [str(d)]])
+    # c is invoked but does not invoke anything: not a cycle
+    assert all(c not in cycle for cycle in rollup.cycles)
+    assert [rollup.in_cycle(w) for w in (a, b, c, d)] == [True, True, False, True]
+    assert rollup.transitive_scores[d] == 8 and rollup.reachable_counts[d] == 0
+    print("✅ Cycles are reported, including a workflow that invokes itself")
+
+
+def test_shared_callees_are_counted_once():
+    main, left, right, shared = _ids(4)
+    graph = DependencyGraph(
+        weights={main: 1, left: 2, right: 4, shared: 8},
+        edges={main: [left, right], left: [shared], right: [shared]},
+    )
+    rollup = analyze_graph(graph)
+
+    assert rollup.transitive_scores[main] == 15
+    assert rollup.reachable_counts[main] == 3
+    assert rollup.cycles == []
+    print("✅ A callee shared by two branches is counted once")
+
+
+def test_reanalysis_rebuilds_the_review():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(tmp, 'graph.db')}",
+            json_serializer=json_codec.dumps_str,
+            json_deserializer=json_codec.loads,
+        )
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine, autoflush=False)()
+
+        project = Project(user_id=uuid.uuid4(), name="Graph", platform="UiPath")
+        db.add(project)
+        db.flush()
+        workflow = Workflow(
+            project_id=project.project_id,
+            workflow_name="Main.xaml",
+            platform="UiPath",
+            risk_indicators=["Stale issue"],
+            suggestions=[{"id": 1, "title": "Stale suggestion"}],
+        )
+        db.add(workflow)
+        db.flush()
+        db.add(CodeReview(workflow_id=workflow.workflow_id, overall_score=10, grade="F", total_issues=3, findings=[]))
+        db.commit()
+
+        path = os.path.join(tmp, "Main.xaml")
+        with open(path, "w") as f:
+            f.write(NESTED_XAML.format(open="<Sequence>" * 6, close="</Sequence>" * 6))
+        reanalyze_workflow_file(db, project, workflow, path, uuid.uuid4().hex)
+
+        reviews = db.query(CodeReview).filter(CodeReview.workflow_id == workflow.workflow_id).all()
+        assert len(reviews) == 1 and reviews[0].total_issues == 1
+        assert reviews[0].findings[0]["rule_id"] == "CR-001"
+        db.refresh(workflow)
+        assert "Stale issue" not in workflow.risk_indicators
+        assert "High nesting depth detected" in workflow.risk_indicators
+        assert [s["title"] for s in workflow.suggestions] == ["High nesting depth detected"]
+        db.close()
+    print("✅ Re-analysis rebuilds the code review, risk indicators and suggestions")
+
+
+if __name__ == "__main__":
+    test_cycles_include_self_invocation()
+    test_shared_callees_are_counted_once()
+    test_reanalysis_rebuilds_the_review()
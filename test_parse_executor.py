@@ -0,0 +1,81 @@
+"""
+Tests for the parse process pool's time limits.
+
+Queues more tasks than there are workers and checks that time spent
+waiting in the queue does not count against a task's wall-clock limit,
+and that a worker which ignores its timer is terminated and replaced.
+
+Run with:  python test_parse_executor.py   (or via pytest)
+"""
+
+import time
+import signal
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.analysis import parse_executor as parse_executor_module
+from app.services.analysis.parse_executor import ParseExecutor, ParseTimeoutError, _call_with_limits
+
+
+def _sleep_task(seconds: float, cpu_seconds: float, wall_seconds: float) -> float:
+    return _call_with_limits(time.sleep, (seconds,), cpu_seconds, wall_seconds) or seconds
+
+
+def _stuck_task(seconds: float, cpu_seconds: float, wall_seconds: float):
+    # Stands in for a worker stuck in C code: the timer signal never arrives
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM, signal.SIGPROF})
+    try:
+        return _call_with_limits(time.sleep, (seconds,), cpu_seconds, wall_seconds)
+    finally:
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGALRM, signal.SIGPROF})
+
+
+def _executor() -> ParseExecutor:
+    executor = ParseExecutor(workers=1, max_tasks_per_child=0, cpu_timeout_seconds=1, wall_timeout_seconds=1)
+    # Start the worker before the clock matters
+    assert executor._run(_sleep_task, (0,), "warm-up") == 0
+    return executor
+
+
+def test_queued_tasks_are_not_timed_out():
+    executor = _executor()
+    grace = parse_executor_module._WALL_GRACE_SECONDS
+    parse_executor_module._WALL_GRACE_SECONDS = 0.2
+    try:
+        # Four 0.6s tasks on one worker: the last one waits 1.8s in the queue
+        with ThreadPoolExecutor(4) as callers:
+            results = list(callers.map(lambda i: executor._run(_sleep_task, (0.6,), f"task {i}"), range(4)))
+        assert results == [0.6] * 4
+    finally:
+        parse_executor_module._WALL_GRACE_SECONDS = grace
+        executor.shutdown()
+    print("✅ Time in the queue does not count against the wall-clock limit")
+
+
+def test_stuck_worker_is_replaced():
+    executor = _executor()
+    grace = parse_executor_module._WALL_GRACE_SECONDS
+    parse_executor_module._WALL_GRACE_SECONDS = 0.2
+    try:
+        stuck_pool = executor._pool
+        started = time.perf_counter()
+        try:
+            executor._run(_stuck_task, (30,), "stuck")
+            assert False, "the stuck task must time out"
+        except ParseTimeoutError:
+            pass
+        assert time.perf_counter() - started < 5
+    finally:
+        parse_executor_module._WALL_GRACE_SECONDS = grace
+
+    try:
+        # The next task gets a fresh pool
+        assert executor._run(_sleep_task, (0.1,), "after recycle") == 0.1
+        assert executor._pool is not stuck_pool
+    finally:
+        executor.shutdown()
+    print("✅ A worker that ignores its timer is terminated and replaced")
+
+
+if __name__ == "__main__":
+    test_queued_tasks_are_not_timed_out()
+    test_stuck_worker_is_replaced()
@@ -0,0 +1,238 @@
+"""
+Tests for the parse limits.
+
+Feeds deeply nested, oversized and node-heavy documents through every
+streaming entry point (tree parser in both modes, metrics-only parser,
+canonicalizer, release splitter, A360 JSON, project archives) and checks
+that each stops with ParseLimitExceeded, early, without leaving the file
+open, and that limits follow the plan's max_file_size_mb.
+
+Run with:  python test_parse_limits.py   (or via pytest)
+"""
+
+import io
+import json
+import os
+import pickle
+import tempfile
+import time
+import zipfile
+from dataclasses import replace
+from pathlib import Path
+from types import SimpleNamespace
+
+from app.core.config import settings
+from app.services.analysis.canonicalizer import canonicalize_xaml
+from app.services.analysis.parse_limits import (
+    ParseLimitExceeded,
+    default_parse_limits,
+    parse_limits_for_plan,
+)
+from app.services.analysis.parser import parse_workflow
+from app.services.analysis.project_archive import copy_and_hash, inspect_project_archive
+from app.services.analysis.release_splitter import split_blue_prism_release
+from app.services.analysis.summary_parser import parse_workflow_summary
+
+UIPATH_HEAD = (
+    '<Activity xmlns="http://schemas.microsoft.com/netfx/2009/xaml/activities" '
+    'xmlns:ui="http://schemas.uipath.com/workflow/activities">'
+)
+
+
+def _write(content, suffix: str) -> str:
+    mode = "wb" if isinstance(content, bytes) else "w"
+    with tempfile.NamedTemporaryFile(mode, suffix=suffix, delete=False) as f:
+        f.write(content)
+    return f.name
+
+
+def _expect_limit(fn, limit: str):
+    try:
+        fn()
+    except ParseLimitExceeded as e:
+        assert e.limit == limit, (e.limit, limit)
+        return e
+    raise AssertionError(f"expected the {limit} limit to be hit")
+
+
+def _is_open(path: str) -> bool:
+    fd_dir = "/proc/self/fd"
+    if not os.path.isdir(fd_dir):
+        return False
+    target = os.path.realpath(path)
+    for fd in os.listdir(fd_dir):
+        try:
+            if os.readlink(os.path.join(fd_dir, fd)) == target:
+                return True
+        except OSError:
+            continue
+    return False
+
+
+def _flat(count: int) -> str:
+    body = "".join(f'<ui:LogMessage DisplayName="log {i}" />' for i in range(count))
+    return f"{UIPATH_HEAD}<Sequence>{body}</Sequence></Activity>"
+
+
+def test_limits_follow_the_plan():
+    small = parse_limits_for_plan(SimpleNamespace(max_file_size_mb=5))
+    assert small.max_file_bytes == 5 * 1024 * 1024
+    assert small.max_nodes == 5 * settings.parse_max_nodes_per_mb
+    assert small.max_text_chars == small.max_file_bytes
+
+    unlimited = parse_limits_for_plan(SimpleNamespace(max_file_size_mb=None))
+    assert unlimited == parse_limits_for_plan(None) == default_parse_limits()
+    assert unlimited.max_file_bytes == settings.parse_max_file_size_mb * 1024 * 1024
+
+    # The error survives the trip back from a parse pool worker
+    error = pickle.loads(pickle.dumps(ParseLimitExceeded("node count", 10)))
+    assert (error.limit, error.maximum, str(error)) == (
+        "node count", 10, "Workflow exceeds the node count limit (10)"
+    )
+    print("✅ Limits scale with the plan's max_file_size_mb")
+
+
+def test_deep_nesting_is_rejected_everywhere():
+    limits = replace(default_parse_limits(), max_depth=50)
+    depth = 200
+    xaml = UIPATH_HEAD + "<Sequence>" * depth + "</Sequence>" * depth + "</Activity>"
+    path = _write(xaml, ".xaml")
+    try:
+        for low_memory in (False, True):
+            _expect_limit(lambda: parse_workflow(path, "UiPath", low_memory, limits), "nesting depth")
+        _expect_limit(lambda: parse_workflow_summary(path, "UiPath", limits), "nesting depth")
+        _expect_limit(lambda: parse_workflow_summary(path, "Blue Prism", limits), "nesting depth")
+        _expect_limit(
+            lambda: canonicalize_xaml(io.BytesIO(xaml.encode()), io.BytesIO(), limits), "nesting depth"
+        )
+    finally:
+        os.unlink(path)
+
+    bot = {"nodes": [{"commandName": "if", "packageName": "If", "children": []}]}
+    node = bot["nodes"][0]
+    for _ in range(depth):
+        child = {"commandName": "if", "packageName": "If", "children": []}
+        node["children"].append(child)
+        node = child
+    path = _write(json.dumps(bot), ".json")
+    try:
+        _expect_limit(lambda: parse_workflow(path, "Automation Anywhere", limits=limits), "nesting depth")
+    finally:
+        os.unlink(path)
+    print("✅ Deep nesting stops every parser")
+
+
+def test_node_limit_stops_the_stream_early():
+    path = _write(_flat(200_000), ".xaml")
+    try:
+        start = time.perf_counter()
+        parse_workflow(path, "UiPath", low_memory=True)
+        full = time.perf_counter() - start
+
+        limits = replace(default_parse_limits(), max_nodes=5_000)
+        start = time.perf_counter()
+        error = _expect_limit(lambda: parse_workflow(path, "UiPath", True, limits), "node count")
+        stopped = time.perf_counter() - start
+        # The traceback keeps the parser's frame alive; the file must be closed anyway
+        assert error.__traceback__ is not None and not _is_open(path)
+        _expect_limit(lambda: parse_workflow_summary(path, "UiPath", limits), "node count")
+    finally:
+        os.unlink(path)
+
+    assert stopped < full / 4, (stopped, full)
+    print(f"✅ Node limit stopped the parse after {stopped * 1000:.0f} ms (full parse {full * 1000:.0f} ms)")
+
+
+def test_size_limits():
+    limits = replace(default_parse_limits(), max_file_bytes=64 * 1024, max_attribute_chars=1024)
+
+    # Bytes read are capped for every walker, even those that never look at attributes
+    path = _write(_flat(5_000), ".xaml")
+    try:
+        _expect_limit(lambda: parse_workflow(path, "UiPath", limits=limits), "file size (bytes)")
+        _expect_limit(lambda: parse_workflow_summary(path, "UiPath", limits), "file size (bytes)")
+    finally:
+        os.unlink(path)
+
+    huge = f'{UIPATH_HEAD}<ui:LogMessage Message="{"x" * 4096}" /></Activity>'
+    _expect_limit(
+        lambda: canonicalize_xaml(io.BytesIO(huge.encode()), io.BytesIO(), limits), "attribute size"
+    )
+    path = _write(huge, ".xaml")
+    try:
+        for low_memory in (False, True):
+            _expect_limit(lambda: parse_workflow(path, "UiPath", low_memory, limits), "attribute size")
+        for platform in ("UiPath", "Blue Prism", "Unknown"):
+            _expect_limit(lambda: parse_workflow_summary(path, platform, limits), "attribute size")
+    finally:
+        os.unlink(path)
+
+    # Entities are not expanded into text
+    bomb = (
+        '<?xml version="1.0"?><!DOCTYPE r [<!ENTITY a "' + "x" * 1000 + '">]>'
+        "<r>" + "&a;" * 50 + "</r>"
+    )
+    path = _write(bomb, ".xml")
+    try:
+        tight = replace(default_parse_limits(), max_text_chars=10_000)
+        parsed = parse_workflow(path, "Unknown", limits=tight)
+        assert parsed.raw_tree.text is None
+    finally:
+        os.unlink(path)
+    print("✅ File, attribute and text size limits hold")
+
+
+def test_release_split_is_limited():
+    release = (
+        '<bpr:release xmlns:bpr="http://www.blueprism.co.uk/product/release"><bpr:contents>'
+        + '<process name="P"><process name="P">' + "<stage />" * 10_000 + "</process></process>"
+        + "</bpr:contents></bpr:release>"
+    )
+    path = _write(release, ".bprelease")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            limits = replace(default_parse_limits(), max_nodes=1_000)
+            error = _expect_limit(lambda: split_blue_prism_release(path, Path(tmp) / "units", limits), "node count")
+            assert error.__traceback__ is not None and not _is_open(path)
+    finally:
+        os.unlink(path)
+    print("✅ Release splitting is held to the same limits")
+
+
+def test_project_archives_are_limited():
+    limits = replace(default_parse_limits(), max_file_bytes=64 * 1024)
+    with tempfile.TemporaryDirectory() as tmp:
+        _expect_limit(
+            lambda: copy_and_hash(io.BytesIO(b"x" * 100_000), Path(tmp) / "a.zip", limits), "file size (bytes)"
+        )
+
+        # A small archive declaring a large payload is refused from its central directory
+        path = Path(tmp) / "bomb.zip"
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("project.json", "{}")
+            archive.writestr("Main.xaml", _flat(1))
+            archive.writestr("padding.bin", b"\0" * (3 * 1024 * 1024))
+        assert path.stat().st_size < 64 * 1024
+
+        saved = (settings.project_archive_max_entries, settings.project_archive_max_uncompressed_mb)
+        try:
+            settings.project_archive_max_uncompressed_mb = 2
+            _expect_limit(lambda: inspect_project_archive(str(path)), "archive uncompressed size (bytes)")
+            settings.project_archive_max_uncompressed_mb = 4
+            settings.project_archive_max_entries = 2
+            _expect_limit(lambda: inspect_project_archive(str(path)), "archive entry count")
+            settings.project_archive_max_entries = 3
+            project = inspect_project_archive(str(path))
+        finally:
+            settings.project_archive_max_entries, settings.project_archive_max_uncompressed_mb = saved
+        assert [relative for relative, _ in project.members] == ["Main.xaml"] and not project.workflows
+    print("✅ Project archives are capped before anything is extracted")
+
+
+if __name__ == "__main__":
+    test_limits_follow_the_plan()
+    test_deep_nesting_is_rejected_everywhere()
+    test_node_limit_stops_the_stream_early()
+    test_size_limits()
+    test_release_split_is_limited()
+    test_project_archives_are_limited()
@@ -0,0 +1,189 @@
+"""
+Regression test for the single-pass Blue Prism and generic XML parsers.
+
+The previous tree-based implementation (findall per kind plus an
+ancestor:: XPath per element) is kept below as an oracle and run against
+a corpus of generated Blue Prism releases and generic XML files; the new
+parser must produce identical activities, variables, raw records and
+nesting depth in both the default and the low-memory mode. The
+metrics-only parse is checked against the full parse on the same corpus.
+
+Run with:  python test_parser_regression.py   (or via pytest)
+"""
+
+import os
+import random
+import tempfile
+
+from lxml import etree
+
+from app.services.analysis.parser import parse_workflow
+from app.services.analysis.summary_parser import parse_workflow_summary
+from app.services.analysis.metrics import calculate_metrics
+
+STAGE_TYPES = ["Action", "Decision", "Calculation", "Data", "Exception", "Start", "End", "Recover"]
+
+
+def legacy_parse(file_path: str, platform: str) -> dict:
+    parser = etree.XMLParser(recover=True, remove_blank_text=True)
+    root = etree.parse(file_path, parser).getroot()
+
+    raw_activities = []
+    raw_variables = []
+
+    if platform == "Blue Prism":
+        activities_data = root.findall(".//stage") + root.findall(".//action")
+        activities = [el.get("name") or el.tag for el in activities_data]
+        raw_activities = [
+            {"type": el.tag, "displayName": el.get("name") or el.tag}
+            for el in activities_data
+        ]
+
+        variables_data = root.findall(".//variable")
+        variables = [el.get("name") for el in variables_data if el.get("name")]
+        raw_variables = [
+            {"name": el.get("name"), "type": el.get("type")}
+            for el in variables_data
+        ]
+    else:
+        activities = [el.tag for el in root.findall(".//*")]
+        variables = [
+            el.get("Name") or el.get("name")
+            for el in root.findall(".//*[@Name]") + root.findall(".//*[@name]")
+            if el.get("Name") or el.get("name")
+        ]
+
+    nesting_depth = max(
+        (len(el.xpath("ancestor::*")) for el in root.findall(".//*")),
+        default=0
+    )
+
+    return {
+        "activities": activities,
+        "variables": variables,
+        "nesting_depth": nesting_depth,
+        "raw_activities": raw_activities,
+        "raw_variables": raw_variables,
+    }
+
+
+def _release(seed: int, stages: int, namespaced: bool = False) -> str:
+    rnd = random.Random(seed)
+    out = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<bpr:release xmlns:bpr="http://www.blueprism.co.uk/product/release">'
+        '<bpr:name>Release</bpr:name><bpr:contents count="3">',
+    ]
+    for p in range(3):
+        kind = "process" if p < 2 else "object"
+        # A default namespace on one process must hide its stages from exact-tag matches
+        ns = ' xmlns="http://www.blueprism.co.uk/product/process"' if namespaced and p == 1 else ""
+        out.append(f'<{kind} id="p{p}" name="Proc {p}"{ns}><process name="Proc {p}" version="1.0">')
+        out.append('<subsheet subsheetid="s" type="Normal"><name>Main</name></subsheet>')
+        for i in range(stages):
+            stage_type = rnd.choice(STAGE_TYPES)
+            name = rnd.choice([f'name="{stage_type} {i}"', "", 'name=""'])
+            out.append(f'<stage stageid="{i}" {name} type="{stage_type}"><subsheetid>s</subsheetid>')
+            if stage_type == "Action":
+                out.append(
+                    '<resource object="Utility" action="Go" />'
+                    '<inputs><input type="text" name="x" expr="&quot;a&quot;" /></inputs>'
+                    f'<action name="act{i}" />'
+                )
+            if stage_type == "Data":
+                var_name = rnd.choice(["Password", "temp", "Customer Name", ""])
+                out.append(
+                    f'<variable name="{var_name}" type="text"><initialvalue>x</initialvalue></variable>'
+                    '<variable type="number" />'
+                )
+            if stage_type == "Decision" and rnd.random() < 0.3:
+                out.append('<stage name="Nested"><stage name="Deeper"><action /></stage></stage>')
+            out.append("</stage>")
+        out.append(f"</process></{kind}>")
+    out.append("</bpr:contents></bpr:release>")
+    return "\n".join(out)
+
+
+def _generic(seed: int, elements: int) -> str:
+    rnd = random.Random(seed)
+    out = ['<root xmlns:x="urn:example">']
+    open_tags = ["root"]
+    for i in range(elements):
+        tag = rnd.choice(["task", "x:step", "group", "item"])
+        attrs = rnd.choice(["", f' Name="N{i}"', f' name="n{i}"', f' Name="N{i}" name="n{i}"', ' Name="" name="fallback"'])
+        if len(open_tags) < 40 and rnd.random() < 0.3:
+            out.append(f"<{tag}{attrs}>")
+            open_tags.append(tag)
+        else:
+            out.append(f"<{tag}{attrs} />")
+        if len(open_tags) > 1 and rnd.random() < 0.2:
+            out.append(f"</{open_tags.pop()}>")
+    out.extend(f"</{tag}>" for tag in reversed(open_tags))
+    return "".join(out)
+
+
+def _corpus():
+    releases = [
+        ("small.bprelease", _release(1, 20)),
+        ("medium.bprelease", _release(2, 400)),
+        ("namespaced.bprelease", _release(3, 200, namespaced=True)),
+        ("truncated.bprelease", _release(4, 300)[:-2500]),
+    ]
+    generic = [
+        ("generic_small.xml", _generic(5, 50)),
+        ("generic_large.xml", _generic(6, 3000)),
+        ("generic_truncated.xml", _generic(7, 500)[:-400]),
+    ]
+    return [(name, body, "Blue Prism") for name, body in releases] + [
+        (name, body, "Unknown") for name, body in generic
+    ]
+
+
+def _actual(parsed) -> dict:
+    return {
+        "activities": list(parsed.activities),
+        "variables": list(parsed.variables),
+        "nesting_depth": parsed.nesting_depth,
+        "raw_activities": parsed.raw_activity_dicts(),
+        "raw_variables": parsed.raw_variable_dicts(),
+    }
+
+
+def test_single_pass_matches_tree_parser():
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, body, platform in _corpus():
+            path = os.path.join(tmp, name)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(body)
+
+            expected = legacy_parse(path, platform)
+            for low_memory in (False, True):
+                parsed = parse_workflow(path, platform, low_memory=low_memory)
+                actual = _actual(parsed)
+                for key in expected:
+                    assert actual[key] == expected[key], (
+                        f"{name} ({platform}, low_memory={low_memory}): {key} differs"
+                    )
+                assert (parsed.raw_tree is None) == low_memory
+            print(f"  {name}: {len(expected['activities'])} activities, depth {expected['nesting_depth']}")
+
+
+def test_metrics_only_parse_matches_full_parse():
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, body, platform in _corpus():
+            path = os.path.join(tmp, name)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(body)
+
+            for as_platform in (platform, "UiPath"):
+                full = parse_workflow(path, as_platform)
+                summary = parse_workflow_summary(path, as_platform)
+                assert summary.activity_counts() == full.activity_counts(), f"{name} ({as_platform})"
+                assert calculate_metrics(summary) == calculate_metrics(full), f"{name} ({as_platform})"
+
+
+if __name__ == "__main__":
+    test_single_pass_matches_tree_parser()
+    print("✅ Single-pass parser output matches the tree-based parser")
+    test_metrics_only_parse_matches_full_parse()
+    print("✅ Metrics-only parse matches the full parse")
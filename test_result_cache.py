@@ -0,0 +1,111 @@
+"""
+Tests for the cross-tenant analysis result cache.
+
+Analyzes a workflow once, then checks that the same content is served
+from the cache without parsing, that a full analysis answers a metrics
+request (but not the other way round), and that entries written by
+another analyzer version are ignored but kept, so versions running side
+by side during a deploy do not evict each other.
+
+Run with:  python test_result_cache.py   (or via pytest)
+"""
+
+import os
+import hashlib
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.analysis_result_cache import AnalysisResultCache
+from app.services.analysis import result_cache
+from app.services.analysis.result_cache import get_cached_analysis
+from app.services.analysis.upload_pipeline import UploadAnalysisPipeline
+
+XAML = """<Activity xmlns="http://schemas.microsoft.com/netfx/2009/xaml/activities"
+  xmlns:ui="http://schemas.uipath.com/workflow/activities">
+<Sequence DisplayName="Main">
+  <If><If.Then><Sequence><Sequence><Sequence><Sequence>
+    <ui:LogMessage Message="[name]" />
+  </Sequence></Sequence></Sequence></Sequence></If.Then></If>
+  <ui:InvokeWorkflowFile WorkflowFileName="Process.xaml" />
+</Sequence>
+</Activity>
+"""
+
+
+def _session():
+    engine = create_engine("sqlite://")
+    AnalysisResultCache.__table__.create(engine)
+    return sessionmaker(bind=engine, autoflush=False)()
+
+
+def _analyze(db, path: str, platform: str, mode: str, content_hash: str):
+    return UploadAnalysisPipeline(mode).analyze_content(db, path, platform, content_hash)
+
+
+def _workflow(tmp: str) -> tuple[str, str]:
+    path = os.path.join(tmp, "Main.xaml")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(XAML)
+    return path, hashlib.sha256(XAML.encode()).hexdigest()
+
+
+def test_second_upload_is_served_from_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        path, content_hash = _workflow(tmp)
+        db = _session()
+
+        first = _analyze(db, path, "UiPath", "full", content_hash)
+        db.commit()
+        os.remove(path)  # a hit must not read the file
+        second = _analyze(db, path, "UiPath", "full", content_hash)
+
+        assert second == first
+        assert second.review["findings"][0]["rule_id"] == "CR-001"
+        assert second.invoked_files == ["Process.xaml"]
+        assert db.query(AnalysisResultCache).count() == 1
+    print("✅ Identical content is analyzed once")
+
+
+def test_full_result_answers_metrics_request():
+    with tempfile.TemporaryDirectory() as tmp:
+        path, content_hash = _workflow(tmp)
+        db = _session()
+
+        assert _analyze(db, path, "UiPath", "metrics", content_hash).review is None
+        db.commit()
+        assert get_cached_analysis(db, content_hash, "UiPath", "full") is None
+
+        full = _analyze(db, path, "UiPath", "full", content_hash)
+        db.commit()
+        assert get_cached_analysis(db, content_hash, "UiPath", "metrics").metrics == full.metrics
+    print("✅ A full analysis answers a metrics request")
+
+
+def test_analyzer_versions_live_side_by_side():
+    with tempfile.TemporaryDirectory() as tmp:
+        path, content_hash = _workflow(tmp)
+        db = _session()
+        _analyze(db, path, "UiPath", "full", content_hash)
+        db.commit()
+
+        current = result_cache.ANALYZER_VERSION
+        result_cache.ANALYZER_VERSION = current + ".next"
+        try:
+            assert get_cached_analysis(db, content_hash, "UiPath", "full") is None
+            _analyze(db, path, "UiPath", "full", content_hash)
+            db.commit()
+            versions = sorted(row.analyzer_version for row in db.query(AnalysisResultCache))
+            assert versions == [current, current + ".next"]
+        finally:
+            result_cache.ANALYZER_VERSION = current
+        # The previous version still finds its own entry
+        assert get_cached_analysis(db, content_hash, "UiPath", "full") is not None
+    print("✅ Entries of another analyzer version are ignored but kept")
+
+
+if __name__ == "__main__":
+    test_second_upload_is_served_from_cache()
+    test_full_result_answers_metrics_request()
+    test_analyzer_versions_live_side_by_side()
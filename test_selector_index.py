@@ -0,0 +1,110 @@
+"""
+Tests for the UI selector index.
+
+Parses a workflow mixing classic Target selectors, modern TargetAnchorable
+selectors, a Selector attribute on the activity itself, a VB-built
+selector and {x:Null} placeholders, and checks the owning activities, the
+tokenized nodes, the idx / wildcard / dynamic flags and the UP-PERF-003
+findings derived from them.
+
+Run with:  python test_selector_index.py   (or via pytest)
+"""
+
+import os
+import tempfile
+
+from app.domain.analysis_contracts import ParsedWorkflow
+from app.domain.compact_workflow import CompactWorkflow
+from app.services.analysis.parser import parse_workflow
+from app.services.analysis.selectors import build_selector_index, summarize_selector_index
+from app.services.code_review.comprehensive_rules import check_selector_optimization
+
+WORKFLOW = """<?xml version="1.0" encoding="utf-8"?>
+<Activity x:Class="Main" xmlns="http://schemas.microsoft.com/netfx/2009/xaml/activities" xmlns:ui="http://schemas.uipath.com/workflow/activities" xmlns:uix="http://schemas.uipath.com/workflow/activities/uix" xmlns:x="http://schemas.microsoft.com/winfx/2006/xaml">
+  <Sequence DisplayName="Main">
+    <ui:OpenApplication DisplayName="Open Notepad" FileName="notepad.exe" Selector="&lt;wnd app='notepad.exe' /&gt;" />
+    <ui:Click DisplayName="Click OK">
+      <ui:Click.Target>
+        <ui:Target Element="{x:Null}" Selector="&lt;wnd app='notepad.exe' title='*Notepad' /&gt;&lt;ctrl name='OK' role='push button' idx='2' /&gt;" />
+      </ui:Click.Target>
+    </ui:Click>
+    <ui:TypeInto DisplayName="Type Name">
+      <ui:TypeInto.Target>
+        <ui:Target Selector="[&quot;&lt;html app='chrome.exe' title='&quot; + strTitle + &quot;' /&gt;&lt;webctrl tag='INPUT' id='name' /&gt;&quot;]" />
+      </ui:TypeInto.Target>
+    </ui:TypeInto>
+    <uix:NClick DisplayName="Click Submit">
+      <uix:NClick.Target>
+        <uix:TargetAnchorable FullSelectorArgument="&lt;webctrl tag='BUTTON' aaname='Submit' /&gt;" FuzzySelectorArgument="{x:Null}" ScopeSelectorArgument="&lt;html app='chrome.exe' /&gt;" />
+      </uix:NClick.Target>
+    </uix:NClick>
+    <ui:LogMessage DisplayName="Log" Message="[&quot;done&quot;]" />
+  </Sequence>
+</Activity>
+"""
+
+
+def _parse(text):
+    with tempfile.NamedTemporaryFile("w", suffix=".xaml", delete=False, encoding="utf-8") as f:
+        f.write(text)
+    try:
+        return parse_workflow(f.name, "UiPath"), parse_workflow(f.name, "UiPath", low_memory=True)
+    finally:
+        os.unlink(f.name)
+
+
+def test_selectors_are_attributed_to_their_activities():
+    parsed, streamed = _parse(WORKFLOW)
+    index = build_selector_index(parsed)
+    assert build_selector_index(streamed) == index
+
+    owners = [(entry["activity"], entry["attribute"]) for entry in index]
+    assert owners == [
+        ("Open Notepad", "Selector"),
+        ("Click OK", "Selector"),
+        ("Type Name", "Selector"),
+        ("Click Submit", "FullSelectorArgument"),
+        ("Click Submit", "ScopeSelectorArgument"),
+    ], owners
+
+    click = index[1]
+    assert click["activityType"] == "Click"
+    assert click["tags"] == ["wnd", "ctrl"]
+    assert click["nodes"][1]["attributes"] == {"name": "OK", "role": "push button", "idx": "2"}
+    assert click["usesIdx"] and click["usesWildcards"] and not click["dynamic"]
+
+    typed = index[2]
+    assert typed["dynamic"] and typed["tags"] == ["html", "webctrl"] and not typed["usesIdx"]
+    print(f"✅ {len(index)} selectors indexed and attributed to their activities")
+
+
+def test_selector_index_survives_worker_state():
+    parsed, _ = _parse(WORKFLOW)
+    restored = ParsedWorkflow.from_compact(CompactWorkflow.from_state(parsed.compact.to_state()))
+    assert build_selector_index(restored) == build_selector_index(parsed)
+    print("✅ Selector entries survive the compact state round trip")
+
+
+def test_selector_rule_uses_the_index():
+    parsed, _ = _parse(WORKFLOW)
+    index = build_selector_index(parsed)
+
+    findings = check_selector_optimization({"selectorIndex": index}, [])
+    assert [(f.severity, f.activity_name) for f in findings] == [("Minor", "Click OK")]
+
+    summary = summarize_selector_index(index)
+    assert summary == {
+        "total": 5, "usesIdx": 1, "usesWildcards": 1, "dynamic": 1,
+        "rootTags": {"wnd": 2, "html": 2, "webctrl": 1},
+    }, summary
+
+    # Older workflows without an index keep the type-name heuristic
+    legacy = check_selector_optimization({}, [{"type": "Click", "displayName": "Click"}] * 11)
+    assert len(legacy) == 1 and legacy[0].severity == "Info"
+    print("✅ UP-PERF-003 reports idx selectors from the index")
+
+
+if __name__ == "__main__":
+    test_selectors_are_attributed_to_their_activities()
+    test_selector_index_survives_worker_state()
+    test_selector_rule_uses_the_index()
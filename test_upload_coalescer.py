@@ -0,0 +1,106 @@
+"""
+Tests for single-flight coalescing of identical uploads.
+
+Starts several concurrent "uploads" of the same content and checks that
+only one of them analyzes while the others wait for it, that followers
+beyond the per-key cap analyze on their own instead of holding a thread,
+that a failing leader still releases its followers, and that different
+content is not serialized.
+
+Run with:  python test_upload_coalescer.py   (or via pytest)
+"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.analysis.upload_coalescer import UploadCoalescer
+
+
+def _upload(coalescer: UploadCoalescer, key: str, analyzed: list, started: threading.Barrier) -> str:
+    started.wait()
+    with coalescer.flight(key) as waited:
+        if waited:
+            return "cache"
+        time.sleep(0.2)
+        analyzed.append(key)
+        return "analyzed"
+
+
+def test_identical_uploads_are_analyzed_once():
+    coalescer = UploadCoalescer(redis=None, lock_seconds=60, wait_seconds=10)
+    key = UploadCoalescer.key("ab" * 32, "UiPath", "full")
+    analyzed = []
+    started = threading.Barrier(5)
+
+    with ThreadPoolExecutor(5) as pool:
+        outcomes = list(pool.map(lambda _: _upload(coalescer, key, analyzed, started), range(5)))
+
+    assert sorted(outcomes) == ["analyzed"] + ["cache"] * 4
+    assert analyzed == [key]
+    stats = coalescer.stats()
+    assert stats["leaders"] == 1 and stats["coalesced"] == 4 and stats["in_flight"] == 0
+    print("✅ Concurrent identical uploads are analyzed once")
+
+
+def test_followers_over_the_cap_do_not_wait():
+    coalescer = UploadCoalescer(redis=None, lock_seconds=60, wait_seconds=10, max_followers=2)
+    key = UploadCoalescer.key("cd" * 32, "UiPath", "full")
+    analyzed = []
+    started = threading.Barrier(5)
+
+    with ThreadPoolExecutor(5) as pool:
+        outcomes = list(pool.map(lambda _: _upload(coalescer, key, analyzed, started), range(5)))
+
+    assert sorted(outcomes) == ["analyzed"] * 3 + ["cache"] * 2
+    stats = coalescer.stats()
+    assert stats["leaders"] == 1 and stats["coalesced"] == 2 and stats["followers_over_cap"] == 2
+    assert stats["in_flight"] == 0 and coalescer._followers == {}
+    print("✅ Followers over the per-key cap analyze without waiting")
+
+
+def test_failed_leader_releases_followers():
+    coalescer = UploadCoalescer(redis=None, lock_seconds=60, wait_seconds=10)
+    entered = threading.Event()
+
+    def leader():
+        with coalescer.flight("k"):
+            entered.set()
+            time.sleep(0.1)
+            raise ValueError("parse failed")
+
+    with ThreadPoolExecutor(2) as pool:
+        failed = pool.submit(leader)
+        entered.wait()
+        follower = pool.submit(lambda: coalescer.flight("k").__enter__())
+        assert follower.result(timeout=5) is True
+        assert isinstance(failed.exception(), ValueError)
+
+    # The next upload leads again
+    with coalescer.flight("k") as waited:
+        assert waited is False
+    print("✅ A failed leader releases its followers")
+
+
+def test_different_content_is_not_serialized():
+    coalescer = UploadCoalescer(redis=None, lock_seconds=60, wait_seconds=10)
+    analyzed = []
+    started = threading.Barrier(3)
+
+    with ThreadPoolExecutor(3) as pool:
+        outcomes = list(pool.map(lambda i: _upload(coalescer, f"k{i}", analyzed, started), range(3)))
+
+    assert outcomes == ["analyzed"] * 3
+    assert coalescer.stats()["coalesced"] == 0
+
+    disabled = UploadCoalescer(redis=None, lock_seconds=60, wait_seconds=10, enabled=False)
+    with disabled.flight("k") as outer, disabled.flight("k") as inner:
+        assert outer is False and inner is False
+    print("✅ Different content, or a disabled coalescer, runs independently")
+
+
+if __name__ == "__main__":
+    test_identical_uploads_are_analyzed_once()
+    test_followers_over_the_cap_do_not_wait()
+    test_failed_leader_releases_followers()
+    test_different_content_is_not_serialized()
@@ -0,0 +1,146 @@
+"""
+Tests for the staged upload analysis pipeline.
+
+Runs the content stages on a small workflow and checks that every stage
+is timed, that a second run is served from the result cache, that
+skipped stages are reported (and their incomplete result is not shared),
+that the timings render as a Server-Timing header (sent only when
+enabled), and that analyses a restart left unfinished are failed at
+startup.
+
+Run with:  python test_upload_pipeline.py   (or via pytest)
+"""
+
+import uuid
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  (registers every table)
+from app.core.config import settings
+from app.models.analysis_history import AnalysisHistory, AnalysisStatus
+from app.models.analysis_result_cache import AnalysisResultCache
+from app.services.analysis.upload_pipeline import (
+    AnalysisRun,
+    PipelineStats,
+    StageTiming,
+    UploadAnalysisPipeline,
+    fail_stale_analyses,
+)
+# The result cache tests' in-memory database and sample workflow
+from test_result_cache import _session, _workflow
+
+
+def _statuses(timings: list[StageTiming]) -> dict[str, str]:
+    return {timing.stage: timing.status for timing in timings}
+
+
+def test_stages_are_timed_then_cached():
+    with tempfile.TemporaryDirectory() as tmp:
+        path, content_hash = _workflow(tmp)
+        db = _session()
+        pipeline = UploadAnalysisPipeline("full")
+
+        timings = []
+        analysis = pipeline.analyze_content(db, path, "UiPath", content_hash, None, timings)
+        db.commit()
+        statuses = _statuses(timings)
+        for stage in ("parse", "metrics", "complexity", "rules", "mappings", "breakdown", "extract"):
+            assert statuses[stage] == "ran", stage
+        assert analysis.migration_stats["totalActivities"] == sum(analysis.activity_counts.values())
+        assert analysis.review is not None and analysis.raw_activities
+
+        timings = []
+        assert pipeline.analyze_content(db, path, "UiPath", content_hash, None, timings) == analysis
+        statuses = _statuses(timings)
+        assert statuses["cache"] == "ran"
+        assert all(statuses[stage] == "cached" for stage in ("parse", "metrics", "complexity", "rules", "mappings"))
+    print("✅ Every stage is timed, and a repeat run is served from the cache")
+
+
+def test_skipped_stages_are_reported_and_not_shared():
+    with tempfile.TemporaryDirectory() as tmp:
+        path, content_hash = _workflow(tmp)
+        db = _session()
+
+        timings = []
+        analysis = UploadAnalysisPipeline("full", skip={"mappings"}).analyze_content(
+            db, path, "UiPath", content_hash, None, timings,
+        )
+        assert _statuses(timings)["mappings"] == "skipped"
+        assert analysis.migration_stats == {} and analysis.review is not None
+        assert db.query(AnalysisResultCache).count() == 0
+
+        timings = []
+        metrics_only = UploadAnalysisPipeline("metrics").analyze_content(db, path, "UiPath", content_hash, None, timings)
+        assert _statuses(timings)["rules"] == "skipped"
+        assert metrics_only.review is None and metrics_only.raw_activities is None
+
+        try:
+            UploadAnalysisPipeline("full", skip={"parse"})
+            assert False, "parse cannot be skipped"
+        except ValueError:
+            pass
+    print("✅ Skipped stages are reported and their results are not shared")
+
+
+def test_server_timing_and_stats():
+    run = AnalysisRun(user_id=None, api_key_id=None, subscription_id=None, file_name="Main.xaml", limits=None)
+    run.timings = [StageTiming("parse", 12.345), StageTiming("rules", 0.0, "skipped")]
+    assert run.server_timing() == 'parse;dur=12.3, rules;dur=0.0;desc="skipped"'
+
+    enabled = settings.server_timing_enabled
+    try:
+        settings.server_timing_enabled = False
+        assert run.timing_headers() == {} and run.timing_fields() == {}
+        settings.server_timing_enabled = True
+        assert run.timing_headers() == {"Server-Timing": run.server_timing()}
+        assert run.timing_fields() == {"serverTiming": run.server_timing()}
+    finally:
+        settings.server_timing_enabled = enabled
+
+    stats = PipelineStats()
+    stats.record(run.timings)
+    stats.record([StageTiming("parse", 7.655)])
+    parse = stats.stats()["parse"]
+    assert parse["ran"] == 2 and parse["max_ms"] == 12.345 and parse["mean_ms"] == 10.0
+    assert stats.stats()["rules"]["skipped"] == 1
+    print("✅ Timings render as Server-Timing and aggregate per stage")
+
+
+def test_stale_analyses_are_failed():
+    engine = create_engine("sqlite://")
+    AnalysisHistory.__table__.create(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+
+    now = datetime.now(timezone.utc)
+    ages = {
+        "old pending": (AnalysisStatus.PENDING, timedelta(hours=2)),
+        "old running": (AnalysisStatus.IN_PROGRESS, timedelta(hours=2)),
+        "live running": (AnalysisStatus.IN_PROGRESS, timedelta(minutes=1)),
+        "old completed": (AnalysisStatus.COMPLETED, timedelta(hours=2)),
+    }
+    for name, (status, age) in ages.items():
+        db.add(AnalysisHistory(analysis_id=uuid.uuid4(), file_name=name, status=status, created_at=now - age))
+    db.commit()
+
+    assert fail_stale_analyses(db, timedelta(minutes=30)) == 2
+    statuses = {row.file_name: row.status for row in db.query(AnalysisHistory)}
+    assert statuses == {
+        "old pending": AnalysisStatus.FAILED,
+        "old running": AnalysisStatus.FAILED,
+        "live running": AnalysisStatus.IN_PROGRESS,
+        "old completed": AnalysisStatus.COMPLETED,
+    }
+    failed = db.query(AnalysisHistory).filter(AnalysisHistory.file_name == "old pending").one()
+    assert failed.result["error_type"] == "AnalysisInterrupted"
+    print("✅ Analyses a restart left unfinished are failed, live ones are kept")
+
+
+if __name__ == "__main__":
+    test_stages_are_timed_then_cached()
+    test_skipped_stages_are_reported_and_not_shared()
+    test_server_timing_and_stats()
+    test_stale_analyses_are_failed()
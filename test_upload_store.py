@@ -0,0 +1,140 @@
+"""
+Tests for the content-addressed upload store.
+
+Stores the same workflow several times, with and without designer
+layout, and checks that one blob is kept, that uploads larger than the
+spool size are published from their temp file, that adopted files are
+linked rather than copied, and that the collector only removes blobs that
+are unreferenced and past their grace period.
+
+Run with:  python test_upload_store.py   (or via pytest)
+"""
+
+import io
+import os
+import time
+import hashlib
+import tempfile
+from pathlib import Path
+
+from app.services.analysis.upload_store import UploadStore
+
+XAML = """<?xml version="1.0" encoding="utf-8"?>
+<Activity xmlns="http://schemas.microsoft.com/netfx/2009/xaml/activities"
+          xmlns:sap2010="http://schemas.microsoft.com/netfx/2010/xaml/activities/presentation">
+  <Sequence DisplayName="Main"{hint}>
+    <WriteLine Text="hello" />
+  </Sequence>
+</Activity>"""
+
+
+def _blobs(store: UploadStore) -> list[Path]:
+    return list(store.blob_dir.glob("*/*/*"))
+
+
+def test_identical_uploads_share_one_blob():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UploadStore(tmp, spool_bytes=1024 * 1024)
+        first = store.save(io.BytesIO(XAML.format(hint="").encode()), "UiPath", name="Main.xaml")
+        # Differs only in designer metadata, so it canonicalizes to the same bytes
+        second = store.save(
+            io.BytesIO(XAML.format(hint=' sap2010:WorkflowViewState.IdRef="Sequence_1"').encode()),
+            "UiPath",
+            name="Copy of Main.xaml",
+        )
+
+        assert not first.deduplicated
+        assert second.deduplicated
+        assert first.path == second.path == store.blob_path(first.content_hash)
+        assert first.path.relative_to(store.blob_dir).parts[:2] == (first.content_hash[:2], first.content_hash[2:4])
+        assert hashlib.sha256(first.path.read_bytes()).hexdigest() == first.content_hash
+        assert len(_blobs(store)) == 1
+        assert list(store.tmp_dir.iterdir()) == []
+    print("✅ Identical uploads are stored once")
+
+
+def test_large_upload_spills_and_publishes():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UploadStore(tmp, spool_bytes=64)
+        data = b"<process>" + b"<stage />" * 5000 + b"</process>"
+        stored = store.save(io.BytesIO(data), "Blue Prism", name="big.bpprocess")
+        again = store.save(io.BytesIO(data), "Blue Prism", name="big.bpprocess")
+
+        assert stored.path.read_bytes() == data
+        assert stored.content_hash == hashlib.sha256(data).hexdigest()
+        assert again.deduplicated
+        assert list(store.tmp_dir.iterdir()) == []
+    print("✅ Uploads over the spool size are published from their temp file")
+
+
+def test_blob_collected_during_a_save_is_published_again():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UploadStore(tmp, spool_bytes=1024 * 1024)
+        data = XAML.format(hint="").encode()
+        first = store.save(io.BytesIO(data), "UiPath", name="Main.xaml")
+
+        # The collector removes the blob between the existence check and the touch
+        utime = os.utime
+
+        def collected_first(path, *args, **kwargs):
+            os.utime = utime
+            Path(path).unlink()
+            return utime(path, *args, **kwargs)
+
+        os.utime = collected_first
+        try:
+            again = store.save(io.BytesIO(data), "UiPath", name="Main.xaml")
+        finally:
+            os.utime = utime
+
+        assert again.path == first.path and not again.deduplicated
+        assert hashlib.sha256(again.path.read_bytes()).hexdigest() == first.content_hash
+    print("✅ A blob collected mid-save is published again")
+
+
+def test_adopt_links_instead_of_copying():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UploadStore(os.path.join(tmp, "store"), spool_bytes=1024)
+        source = Path(tmp) / "unit.bpprocess"
+        source.write_bytes(b"<process />")
+        inode = source.stat().st_ino
+
+        stored = store.adopt(str(source))
+
+        assert not source.exists()
+        assert stored.path.read_bytes() == b"<process />"
+        assert stored.path.stat().st_ino == inode
+    print("✅ Adopted files are hardlinked into the store")
+
+
+def test_collector_keeps_referenced_and_recent_blobs():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UploadStore(tmp, spool_bytes=1024)
+        kept = store.save(io.BytesIO(b"<a />"), None)
+        orphan = store.save(io.BytesIO(b"<b />"), None)
+        recent = store.save(io.BytesIO(b"<c />"), None)
+
+        old = time.time() - 7200
+        for stored in (kept, orphan):
+            os.utime(stored.path, (old, old))
+
+        stats = store.collect_garbage({kept.content_hash}, grace_seconds=3600)
+
+        assert stats == {"removed": 1, "kept": 2, "freed_bytes": orphan.size}
+        assert kept.path.exists() and recent.path.exists()
+        assert not orphan.path.exists()
+
+        # Re-uploading a blob restarts its grace period
+        os.utime(recent.path, (old, old))
+        assert store.save(io.BytesIO(b"<c />"), None).deduplicated
+        assert store.collect_garbage(set(), grace_seconds=3600)["removed"] == 1
+        assert recent.path.exists()
+    print("✅ Only unreferenced blobs past their grace period are collected")
+
+
+if __name__ == "__main__":
+    test_identical_uploads_share_one_blob()
+    test_large_upload_spills_and_publishes()
+    test_blob_collected_during_a_save_is_published_again()
+    test_adopt_links_instead_of_copying()
+    test_collector_keeps_referenced_and_recent_blobs()
@@ -0,0 +1,222 @@
+"""
+Tests for the XAML canonicalizer.
+
+Checks that two files differing only in designer metadata, indentation
+and attribute order canonicalize to identical bytes, that canonicalizing
+is idempotent, that parsing the canonical form yields the same
+activities (except those inside designer view state), variables, depth
+and invoke targets as parsing the original, and that uploads are stored atomically and abandoned mid-stream once they
+pass the size limit.
+
+Run with:  python test_xaml_canonicalizer.py   (or via pytest)
+"""
+
+import io
+import os
+import hashlib
+import tempfile
+from dataclasses import replace
+from pathlib import Path
+
+from lxml import etree
+
+from app.services.analysis.canonicalizer import canonicalize_xaml, save_workflow_file
+from app.services.analysis.parse_limits import ParseLimitExceeded, default_parse_limits
+from app.services.analysis.parser import parse_workflow
+
+NAMESPACES = (
+    'xmlns="http://schemas.microsoft.com/netfx/2009/xaml/activities" '
+    'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006" '
+    'xmlns:sap="http://schemas.microsoft.com/netfx/2009/xaml/activities/presentation" '
+    'xmlns:sap2010="http://schemas.microsoft.com/netfx/2010/xaml/activities/presentation" '
+    'xmlns:sco="clr-namespace:System.Collections.ObjectModel;assembly=mscorlib" '
+    'xmlns:av="http://schemas.microsoft.com/winfx/2006/xaml/presentation" '
+    'xmlns:ui="http://schemas.uipath.com/workflow/activities" '
+    'xmlns:x="http://schemas.microsoft.com/winfx/2006/xaml"'
+)
+
+DESIGNER_FILE = f"""<?xml version="1.0" encoding="utf-8"?>
+<Activity mc:Ignorable="sap sap2010" x:Class="Main" sap2010:WorkflowViewState.IdRef="Main_1" {NAMESPACES}>
+  <TextExpression.NamespacesForImplementation>
+    <sco:Collection x:TypeArguments="x:String">
+      <x:String>System</x:String>
+      <x:String>System.Data</x:String>
+    </sco:Collection>
+  </TextExpression.NamespacesForImplementation>
+  <TextExpression.ReferencesForImplementation>
+    <sco:Collection x:TypeArguments="AssemblyReference">
+      <AssemblyReference>System</AssemblyReference>
+    </sco:Collection>
+  </TextExpression.ReferencesForImplementation>
+  <!-- designer comment -->
+  <Sequence DisplayName="Main" sap:VirtualizedContainerService.HintSize="400,300" sap2010:WorkflowViewState.IdRef="Sequence_1">
+    <Sequence.Variables>
+      <Variable x:TypeArguments="x:String" Name="strPath" Default="in.xlsx" />
+    </Sequence.Variables>
+    <sap:WorkflowViewStateService.ViewState>
+      <scg:Dictionary xmlns:scg="clr-namespace:System.Collections.Generic;assembly=mscorlib" x:TypeArguments="x:String, x:Object">
+        <x:Boolean x:Key="IsExpanded">True</x:Boolean>
+        <av:Point x:Key="ShapeLocation">300,2.5</av:Point>
+        <av:Size x:Key="ShapeSize">200,22</av:Size>
+        <x:Double x:Key="Width">40</x:Double>
+      </scg:Dictionary>
+    </sap:WorkflowViewStateService.ViewState>
+    <ui:LogMessage DisplayName="Log start" Level="Info" Message="[&quot;start&quot;]" sap2010:WorkflowViewState.IdRef="LogMessage_1" />
+    <If Condition="[strPath &lt;&gt; &quot;&quot;]" DisplayName="Check">
+      <If.Then>
+        <ui:InvokeWorkflowFile DisplayName="Process" WorkflowFileName="Framework\\Process.xaml" sap2010:WorkflowViewState.IdRef="Invoke_1" />
+      </If.Then>
+    </If>
+    <ui:Comment Text="keep  this  text" />
+    <InArgument x:TypeArguments="x:String">literal  value</InArgument>
+    <InArgument x:TypeArguments="x:String"> </InArgument>
+    <InArgument x:TypeArguments="x:String" xml:space="preserve"> </InArgument>
+  </Sequence>
+  <sap2010:WorkflowViewState.ViewStateManager>
+    <sap2010:ViewStateManager>
+      <sap2010:ViewStateData Id="Sequence_1" sap:VirtualizedContainerService.HintSize="400,300" />
+    </sap2010:ViewStateManager>
+  </sap2010:WorkflowViewState.ViewStateManager>
+</Activity>
+"""
+
+# Same workflow: no designer data, other indentation and attribute order
+PLAIN_FILE = f"""<?xml version="1.0" encoding="utf-8"?>
+<Activity x:Class="Main" mc:Ignorable="sap sap2010" {NAMESPACES}><Sequence DisplayName="Main"><Sequence.Variables><Variable Default="in.xlsx" Name="strPath" x:TypeArguments="x:String"/></Sequence.Variables>
+<ui:LogMessage Message="[&quot;start&quot;]" Level="Info" DisplayName="Log start"/>
+<If DisplayName="Check" Condition="[strPath &lt;&gt; &quot;&quot;]"><If.Then><ui:InvokeWorkflowFile WorkflowFileName="Framework\\Process.xaml" DisplayName="Process"/></If.Then></If>
+<ui:Comment Text="keep  this  text"/><InArgument x:TypeArguments="x:String">literal  value</InArgument>
+<InArgument x:TypeArguments="x:String"/><InArgument xml:space="preserve" x:TypeArguments="x:String"> </InArgument>
+</Sequence></Activity>"""
+
+
+def _canonical(text: str) -> bytes:
+    out = io.BytesIO()
+    canonicalize_xaml(io.BytesIO(text.encode("utf-8")), out)
+    return out.getvalue()
+
+
+def _parse_text(text, platform="UiPath"):
+    with tempfile.NamedTemporaryFile("wb", suffix=".xaml", delete=False) as f:
+        f.write(text if isinstance(text, bytes) else text.encode("utf-8"))
+    try:
+        return parse_workflow(f.name, platform)
+    finally:
+        os.unlink(f.name)
+
+
+def test_layout_only_differences_canonicalize_identically():
+    designer = _canonical(DESIGNER_FILE)
+    plain = _canonical(PLAIN_FILE)
+    assert designer == plain, (designer, plain)
+
+    text = designer.decode("utf-8")
+    for noise in ("ViewState", "HintSize", "NamespacesForImplementation", "AssemblyReference", "<!--"):
+        assert noise not in text, noise
+    # Significant whitespace inside text and attribute values is preserved;
+    # whitespace-only text only under xml:space="preserve", as in XAML
+    assert "literal  value" in text and "keep  this  text" in text
+    assert '<InArgument x:TypeArguments="x:String"/>' in text
+    assert '<InArgument x:TypeArguments="x:String" xml:space="preserve"> </InArgument>' in text
+    assert len(designer) < len(DESIGNER_FILE.encode("utf-8")) // 2
+    print(f"✅ Layout-only variants canonicalize identically ({len(DESIGNER_FILE)} -> {len(designer)} bytes)")
+
+
+def test_canonicalization_is_idempotent():
+    once = _canonical(DESIGNER_FILE)
+    assert _canonical(once.decode("utf-8")) == once
+    print("✅ Canonicalization is idempotent")
+
+
+def test_canonical_form_parses_the_same():
+    original = _parse_text(DESIGNER_FILE)
+    canonical = _parse_text(_canonical(DESIGNER_FILE))
+
+    # Intentional difference (PARSER_VERSION 7): the view state manager and
+    # the elements inside designer view state were counted as activities
+    # and no longer are
+    view_state = ["Point", "Size", "Double"]
+    assert [a for a in original.activities if a in view_state] == view_state
+    assert list(canonical.activities) == [
+        a for a in original.activities if a not in view_state and "ViewState" not in a
+    ]
+    assert list(canonical.variables) == list(original.variables)
+    assert canonical.nesting_depth == original.nesting_depth
+    assert canonical.invoked_workflow_files() == original.invoked_workflow_files() == ["Framework\\Process.xaml"]
+    print("✅ Canonical form parses the same, minus designer view state")
+
+
+def test_save_workflow_file_falls_back_for_non_xml():
+    with tempfile.TemporaryDirectory() as tmp:
+        destination = Path(tmp) / "broken.xaml"
+        size, content_hash = save_workflow_file(io.BytesIO(b""), destination, "UiPath")
+        assert size == 0 and destination.read_bytes() == b""
+
+        # Malformed XAML is never repaired into a different document
+        for broken in (b"<Activity><Sequence></Activity>", b'<Activity a="1" a="2" />', b"<Activity>&undefined;</Activity>"):
+            size, content_hash = save_workflow_file(io.BytesIO(broken), destination, "UiPath")
+            assert destination.read_bytes() == broken and content_hash == hashlib.sha256(broken).hexdigest()
+
+        destination = Path(tmp) / "main.xaml"
+        size, content_hash = save_workflow_file(io.BytesIO(DESIGNER_FILE.encode("utf-8")), destination, "UiPath")
+        assert destination.read_bytes() == _canonical(PLAIN_FILE) and size == destination.stat().st_size
+    print("✅ save_workflow_file stores canonical XAML and copies unparseable input verbatim")
+
+
+def test_redeclared_prefixes_keep_their_namespaces():
+    xaml = (
+        '<Activity xmlns="urn:root" xmlns:a="urn:one" xmlns:b="urn:one">'
+        '<a:Outer a:Flag="1"><Scope xmlns:a="urn:two"><a:Inner b:Flag="2" /><b:Other /></Scope>'
+        '<a:After /></a:Outer></Activity>'
+    )
+    canonical = _canonical(xaml)
+    assert [(el.tag, dict(el.attrib)) for el in etree.fromstring(canonical).iter()] == [
+        (el.tag, dict(el.attrib)) for el in etree.fromstring(xaml.encode()).iter()
+    ]
+    assert _canonical(canonical.decode("utf-8")) == canonical
+    print("✅ Redeclared prefixes keep every element and attribute in its namespace")
+
+
+class _CountingStream(io.BytesIO):
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def test_save_workflow_file_stops_at_the_size_limit():
+    limits = replace(default_parse_limits(), max_file_bytes=256 * 1024)
+    release = b"<release>" + b"<process name='p' />" * 200_000 + b"</release>"
+    xaml = f"<Activity {NAMESPACES}>".encode() + b"<ui:LogMessage />" * 200_000 + b"</Activity>"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        destination = Path(tmp) / "upload"
+        size, content_hash = save_workflow_file(io.BytesIO(b"<release />"), destination, "Blue Prism", limits)
+        assert content_hash == hashlib.sha256(b"<release />").hexdigest() and size == 11
+
+        for data, platform in ((release, "Blue Prism"), (xaml, "UiPath")):
+            source = _CountingStream(data)
+            try:
+                save_workflow_file(source, destination, platform, limits)
+                raise AssertionError("expected the file size limit to be hit")
+            except ParseLimitExceeded as e:
+                assert e.limit == "file size (bytes)"
+            # Abandoned right after the limit, the previous file is untouched
+            # and no partial file is left behind
+            assert source.bytes_read < 2 * limits.max_file_bytes < len(data)
+            assert destination.read_bytes() == b"<release />"
+            assert os.listdir(tmp) == ["upload"]
+    print("✅ Uploads over the size limit are abandoned mid-stream and never replace the stored file")
+
+
+if __name__ == "__main__":
+    test_layout_only_differences_canonicalize_identically()
+    test_canonicalization_is_idempotent()
+    test_canonical_form_parses_the_same()
+    test_save_workflow_file_falls_back_for_non_xml()
+    test_redeclared_prefixes_keep_their_namespaces()
+    test_save_workflow_file_stops_at_the_size_limit()